@@ -1,40 +1,50 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify
 from flask_cors import CORS
-from flask.json.provider import DefaultJSONProvider
 import logging
 from datetime import datetime
 import os
-import numpy as np
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 from models.quiz_evaluator import QuizEvaluator
+from models.reference_index import ReferenceAnswerIndex
 from models.roadmap_generator import RoadmapGenerator
 from models.career_recommender import CareerRecommender
+from models.rate_limiter import RateLimiter
+from models.batch_processor import BatchProcessor
+from models.payload_validator import PayloadValidator, PayloadValidationError
+from models.json_provider import ResponseCompressor, select_json_provider
 
 
-# Custom JSON provider for NumPy types
-class NumpyJSONProvider(DefaultJSONProvider):
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        elif isinstance(obj, np.floating):
-            return float(obj)
-        elif isinstance(obj, np.ndarray):
-            return obj.tolist()
-        elif isinstance(obj, (np.bool_, bool)):
-            return bool(obj)
-        return super().default(obj)
+# Limit errors from app.json.loads reach the validate_json decorator unchanged
+class ValidatingRequest(Request):
+    def on_json_loading_failed(self, e):
+        if isinstance(e, PayloadValidationError):
+            raise e
+        return super().on_json_loading_failed(e)
 
 
 # Initialize Flask app
 app = Flask(__name__)
-app.json_provider_class = NumpyJSONProvider
+# orjson when installed (set JSON_PROVIDER=stdlib to use the standard library encoder)
+app.json_provider_class = select_json_provider()
 app.json = app.json_provider_class(app)
+# Request bodies are parsed with structural limits checked during decoding
+app.json.payload_validator = PayloadValidator.from_env()
+app.request_class = ValidatingRequest
+# Bodies over this size are rejected from Content-Length, or cut off mid-stream if chunked
+app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_REQUEST_BYTES', 50000))
 CORS(app)
 
+# Compress large JSON responses for clients that accept gzip/br
+compressor = ResponseCompressor.from_env()
+if compressor is not None:
+    @app.after_request
+    def compress_response(response):
+        return compressor.compress(response, request.accept_encodings)
+
 
 # Configure logging
 logging.basicConfig(
@@ -70,69 +80,51 @@ def require_api_key():
             "message": "Unauthorized"
         }), 401
 
-# Rate Limiting Logic (In-Memory)
-import time
+# Rate Limiting (per endpoint; set RATE_LIMIT_BACKEND=redis to share limits across workers)
+import math
 from functools import wraps
+from werkzeug.exceptions import BadRequest
 
-class RateLimiter:
-    def __init__(self, limit=60, window=60):
-        self.limit = limit
-        self.window = window
-        self.requests = {}
-
-    def is_allowed(self, ip):
-        current = time.time()
-        # Clean old requests
-        self.requests = {k: v for k, v in self.requests.items() if current - v['start'] < self.window}
-        
-        if ip not in self.requests:
-            self.requests[ip] = {'count': 1, 'start': current}
-            return True
-        
-        if self.requests[ip]['count'] < self.limit:
-            self.requests[ip]['count'] += 1
-            return True
-        
-        # Reset if window passed (handled by cleanup logic mostly, but explicit check)
-        if current - self.requests[ip]['start'] > self.window:
-             self.requests[ip] = {'count': 1, 'start': current}
-             return True
-             
-        return False
-
-limiter_instance = RateLimiter(limit=60, window=60) # 60 req/min/IP
+limiter_instance = RateLimiter.from_env()
 
 def limit_rate(f):
     @wraps(f)
     def wrapped(*args, **kwargs):
-        # Allow localhost bypass if needed, but safer to enforce global
-        if not limiter_instance.is_allowed(request.remote_addr):
-            logger.warning(f"Rate limit exceeded for {request.remote_addr}")
-            return jsonify({
+        allowed, retry_after = limiter_instance.check(request.endpoint, request.remote_addr)
+        if not allowed:
+            logger.warning(f"Rate limit exceeded for {request.remote_addr} on {request.endpoint}")
+            response = jsonify({
                 "status": "fail",
                 "message": "Too many requests. Please try again later."
-            }), 429
+            })
+            response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+            return response, 429
+        return f(*args, **kwargs)
+    return wrapped
+
+def validate_json(f):
+    """Parse the JSON body once, rejecting malformed or oversized payloads"""
+    @wraps(f)
+    def wrapped(*args, **kwargs):
+        if request.is_json:
+            try:
+                request.get_json()
+            except PayloadValidationError as e:
+                return jsonify({"status": "fail", "message": str(e)}), 400
+            except BadRequest:
+                return jsonify({"status": "fail", "message": "Invalid JSON payload"}), 400
         return f(*args, **kwargs)
     return wrapped
 
-def validate_payload_size(data, max_keys=20, max_str_len=5000):
-    """Defense against massive payloads causing DoS"""
-    if len(str(data)) > 50000: # Rough total size bytes
-        return False, "Payload too large"
-    if isinstance(data, dict):
-        if len(data) > max_keys:
-             return False, "Too many fields"
-        for k, v in data.items():
-            if isinstance(v, str) and len(v) > max_str_len:
-                return False, f"Field '{k}' too long"
-            if isinstance(v, list) and len(v) > 50:
-                return False, f"List '{k}' too long"
-    return True, None
 
+# Batch analysis fan-out: one worker per concurrent sub-analysis
+analysis_pool = BatchProcessor(max_workers=int(os.getenv('BATCH_ANALYZE_WORKERS', 12)))
+BATCH_BRANCH_TIMEOUT = float(os.getenv('BATCH_BRANCH_TIMEOUT', 30))
 
 # Initialize AI models
 try:
     quiz_evaluator = QuizEvaluator()
+    quiz_evaluator.reference_index = ReferenceAnswerIndex.from_env(quiz_evaluator.preprocess_text)
     roadmap_generator = RoadmapGenerator()
     career_recommender = CareerRecommender()
     logger.info("All AI models initialized successfully")
@@ -148,12 +140,15 @@ def health_check():
         "status": "success",
         "message": "LearnMate AI service is running",
         "timestamp": datetime.utcnow().isoformat(),
-        "models_loaded": True
+        "models_loaded": True,
+        "llm_cache": career_recommender.llm.get_cache_stats(),
+        "rate_limiter": limiter_instance.stats()
     }), 200
 
 # Quiz Evaluation Endpoint
 @app.route('/ai/evaluate-quiz', methods=['POST'])
 @limit_rate
+@validate_json
 def evaluate_quiz():
     """Evaluate quiz answers and provide detailed feedback"""
     try:
@@ -162,10 +157,6 @@ def evaluate_quiz():
         
         if not data:
             return jsonify({"status": "fail", "message": "No data provided"}), 400
-            
-        is_valid, err_msg = validate_payload_size(data)
-        if not is_valid:
-             return jsonify({"status": "fail", "message": err_msg}), 400
         
         if 'answers' not in data or 'correctAnswers' not in data:
             return jsonify({"status": "fail", "message": "Missing required fields"}), 400
@@ -186,6 +177,7 @@ def evaluate_quiz():
 # Roadmap Generation Endpoint
 @app.route('/ai/generate-roadmap', methods=['POST'])
 @limit_rate
+@validate_json
 def generate_roadmap():
     """Generate personalized learning roadmap"""
     try:
@@ -194,10 +186,6 @@ def generate_roadmap():
         
         if not data:
             return jsonify({"status": "fail", "message": "No data provided"}), 400
-            
-        is_valid, err_msg = validate_payload_size(data)
-        if not is_valid:
-             return jsonify({"status": "fail", "message": err_msg}), 400
         
         required_fields = ['userId', 'performance', 'semester']
         missing_fields = [field for field in required_fields if field not in data]
@@ -225,6 +213,7 @@ def generate_roadmap():
 # Career Recommendation Endpoint
 @app.route('/ai/recommend-career', methods=['POST'])
 @limit_rate
+@validate_json
 def recommend_career():
     """Recommend careers based on performance and interests"""
     try:
@@ -233,10 +222,6 @@ def recommend_career():
         
         if not data:
              return jsonify({"status": "fail", "message": "No data provided"}), 400
-
-        is_valid, err_msg = validate_payload_size(data)
-        if not is_valid:
-             return jsonify({"status": "fail", "message": err_msg}), 400
         
         if 'scores' not in data:
             return jsonify({"status": "fail", "message": "Missing required field: scores"}), 400
@@ -245,7 +230,8 @@ def recommend_career():
             scores=data['scores'],
             interests=data.get('interests', []),
             skills=data.get('skills', []),
-            semester=data.get('semester', 1)
+            semester=data.get('semester', 1),
+            mode=data.get('mode') or request.args.get('mode')
         )
         
         logger.info(f"Career recommendations generated: {len(result['recommendations'])} careers")
@@ -257,6 +243,8 @@ def recommend_career():
 
 # Batch Analysis Endpoint (Advanced Feature)
 @app.route('/ai/batch-analyze', methods=['POST'])
+@limit_rate
+@validate_json
 def batch_analyze():
     """
     Perform comprehensive analysis including quiz eval, roadmap, and career recommendations
@@ -268,6 +256,11 @@ def batch_analyze():
         "performanceData": {...},
         "semester": 3
     }
+    
+    The sub-analyses run concurrently, each bounded by BATCH_BRANCH_TIMEOUT
+    from when it starts running.
+    "branches" reports every one's status and time; "partial" is true when
+    some failed or timed out and "data" holds only those that succeeded.
     """
     try:
         logger.info("Received batch analysis request")
@@ -279,40 +272,52 @@ def batch_analyze():
                 "message": "Missing userId"
             }), 400
         
-        results = {}
+        # Sub-analyses are independent: run them concurrently
+        branches = {}
         
         # Quiz evaluation if provided
         if 'quizData' in data:
-            quiz_result = quiz_evaluator.evaluate(
-                answers=data['quizData'].get('answers', []),
-                correct_answers=data['quizData'].get('correctAnswers', []),
-                subject=data['quizData'].get('subject', 'General')
+            quiz_data = data['quizData']
+            branches['quizEvaluation'] = lambda: quiz_evaluator.evaluate(
+                answers=quiz_data.get('answers', []),
+                correct_answers=quiz_data.get('correctAnswers', []),
+                subject=quiz_data.get('subject', 'General')
             )
-            results['quizEvaluation'] = quiz_result
         
-        # Roadmap generation if performance data provided
+        # Roadmap generation and career recommendation if performance data provided
         if 'performanceData' in data:
-            roadmap_result = roadmap_generator.generate(
+            performance_data = data['performanceData']
+            branches['roadmap'] = lambda: roadmap_generator.generate(
                 user_id=data['userId'],
-                performance=data['performanceData'].get('scores', {}),
+                performance=performance_data.get('scores', {}),
                 semester=data.get('semester', 1),
-                interests=data['performanceData'].get('interests', [])
+                interests=performance_data.get('interests', [])
             )
-            results['roadmap'] = roadmap_result
-            
-            # Career recommendation
-            career_result = career_recommender.recommend(
-                scores=data['performanceData'].get('scores', {}),
-                interests=data['performanceData'].get('interests', []),
-                semester=data.get('semester', 1)
+            branches['careerRecommendations'] = lambda: career_recommender.recommend(
+                scores=performance_data.get('scores', {}),
+                interests=performance_data.get('interests', []),
+                semester=data.get('semester', 1),
+                mode=data.get('mode')
             )
-            results['careerRecommendations'] = career_result
         
-        logger.info(f"Batch analysis completed for user {data['userId']}")
+        results, report = analysis_pool.run_branches(branches, timeout=BATCH_BRANCH_TIMEOUT)
+        
+        if branches and not results:
+            logger.error(f"Batch analysis failed for user {data['userId']}: {report}")
+            return jsonify({
+                "status": "fail",
+                "message": "All analyses failed",
+                "branches": report
+            }), 500
+        
+        logger.info(f"Batch analysis completed for user {data['userId']}: "
+                    f"{len(results)}/{len(branches)} analyses succeeded")
         
         return jsonify({
             "status": "success",
-            "data": results
+            "data": results,
+            "partial": len(results) < len(branches),
+            "branches": report
         }), 200
         
     except Exception as e:
@@ -323,6 +328,13 @@ def batch_analyze():
         }), 500
 
 # Error handlers
+@app.errorhandler(413)
+def payload_too_large(error):
+    return jsonify({
+        "status": "fail",
+        "message": "Payload too large"
+    }), 413
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({
@@ -0,0 +1,114 @@
+"""
+Career Assignment Benchmark
+Compares the vectorized improve_career_assignments rules with the original row-by-row loop
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from data.improved_processor import ImprovedDataProcessor
+
+
+def legacy_assign_careers(df):
+    """Original iterrows implementation, kept as the reference"""
+    improved_careers = []
+
+    for idx, row in df.iterrows():
+        ai_strength = row['avg_ai_score']
+        prog_strength = row['avg_programming_score']
+        math_strength = row['avg_math_score']
+        ds_strength = row['avg_datascience_score']
+        web_strength = row['avg_webdev_score']
+
+        if row['interest_research'] == 1 and ai_strength > 80 and math_strength > 80:
+            career = 'Research Scientist'
+        elif ai_strength > 78 and prog_strength > 78 and row['skill_ml'] == 1:
+            if prog_strength > ai_strength:
+                career = 'Machine Learning Engineer'
+            else:
+                career = 'AI Engineer'
+        elif ds_strength > 75 and math_strength > 72:
+            if prog_strength > 75:
+                career = 'Data Scientist'
+            else:
+                career = 'Data Analyst'
+        elif web_strength > 75 and row['interest_web'] == 1:
+            career = 'Full Stack Developer'
+        elif prog_strength > 78:
+            if ai_strength > 70:
+                career = 'Software Engineer'
+            elif web_strength > 70:
+                career = 'DevOps Engineer'
+            else:
+                career = 'Software Engineer'
+        elif ds_strength > 70 and math_strength > 65:
+            career = 'Business Intelligence Analyst'
+        elif prog_strength > 72 and math_strength > 70:
+            career = 'Cybersecurity Analyst'
+        else:
+            scores = {
+                'AI Engineer': ai_strength,
+                'Software Engineer': prog_strength,
+                'Data Analyst': ds_strength,
+                'Full Stack Developer': web_strength
+            }
+            career = max(scores, key=scores.get)
+
+        improved_careers.append(career)
+
+    return np.array(improved_careers, dtype=object)
+
+
+def synthetic_rows(n, seed=42):
+    """Random assessment rows shaped like real_training_data.csv"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        column: rng.uniform(40, 100, n).round(rng.integers(0, 2))  # Rounding adds exact ties
+        for column in ['avg_ai_score', 'avg_programming_score', 'avg_math_score',
+                       'avg_datascience_score', 'avg_webdev_score']
+    })
+    for column in ['interest_ai', 'interest_data', 'interest_web', 'interest_research',
+                   'skill_python', 'skill_web_tech', 'skill_ml']:
+        df[column] = rng.integers(0, 2, n, dtype=np.int8)
+    df['semester'] = rng.integers(1, 9, n, dtype=np.uint8)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark career assignment relabelling')
+    parser.add_argument('--rows', default='10000,1000000,10000000',
+                        help='Comma-separated dataset sizes')
+    parser.add_argument('--legacy-max-rows', type=int, default=1000000,
+                        help='Largest size to also time (and check) the row-by-row loop on')
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'vectorized':>12} {'row loop':>12} {'speedup':>9}  match")
+    for n in [int(size) for size in args.rows.split(',')]:
+        df = synthetic_rows(n)
+
+        started = time.perf_counter()
+        vectorized = ImprovedDataProcessor.assign_careers(df)
+        vectorized_seconds = time.perf_counter() - started
+
+        if n > args.legacy_max_rows:
+            print(f"{n:>12,} {vectorized_seconds:>11.3f}s {'skipped':>12} {'-':>9}  -")
+            continue
+
+        started = time.perf_counter()
+        legacy = legacy_assign_careers(df)
+        legacy_seconds = time.perf_counter() - started
+
+        match = bool((vectorized == legacy).all())
+        print(f"{n:>12,} {vectorized_seconds:>11.3f}s {legacy_seconds:>11.3f}s "
+              f"{legacy_seconds / vectorized_seconds:>8.0f}x  {match}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Class Balancing Strategies for LearnMate AI
+SMOTE with exact or approximate parallel neighbour search, random oversampling or class weights
+"""
+
+import logging
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.metrics.pairwise import euclidean_distances, pairwise_distances_argmin
+from sklearn.neighbors import NearestNeighbors
+
+try:
+    from sklearn.neighbors import KNeighborsMixin
+except ImportError:  # Not re-exported by sklearn.neighbors in current releases
+    from sklearn.neighbors._base import KNeighborsMixin
+
+logger = logging.getLogger(__name__)
+
+# smote: exact neighbours, queried in parallel
+# smote_approx: neighbours from a clustered index (ClusteredNeighbors)
+# random: duplicate minority rows (no neighbour search)
+# class_weight: no resampling; the model weights classes instead
+BALANCING_STRATEGIES = ('smote', 'smote_approx', 'random', 'class_weight')
+
+
+class ClusteredNeighbors(KNeighborsMixin, BaseEstimator):
+    """
+    Approximate k-nearest neighbours through a clustered (IVF) index
+
+    fit() partitions the points with mini-batch k-means into about
+    sqrt(n) clusters. A query searches only the points of the n_probe
+    clusters nearest to its own cluster's centroid, adding clusters
+    until there are at least n_neighbors candidates, so each query costs
+    O(n_probe * sqrt(n)) distances instead of O(n). Queries are grouped
+    by cluster and the groups are searched in parallel threads. Small
+    inputs use a single cluster, which makes the search exact.
+
+    Usable wherever scikit-learn or imbalanced-learn accept a
+    KNeighborsMixin, e.g. SMOTE(k_neighbors=ClusteredNeighbors(6)).
+    """
+
+    def __init__(self, n_neighbors=6, n_clusters=None, n_probe=4, n_jobs=None, random_state=42):
+        self.n_neighbors = n_neighbors
+        self.n_clusters = n_clusters
+        self.n_probe = n_probe
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y=None):
+        X = np.asarray(X, dtype=np.float64)
+        self._fit_X = X
+
+        n_clusters = self.n_clusters or (int(np.sqrt(len(X))) if len(X) >= 1000 else 1)
+        n_clusters = max(1, min(n_clusters, len(X) // max(self.n_neighbors, 1)))
+        if n_clusters == 1:
+            labels = np.zeros(len(X), dtype=np.intp)
+            self.centroids_ = X.mean(axis=0, keepdims=True)
+        else:
+            kmeans = MiniBatchKMeans(
+                n_clusters=n_clusters,
+                batch_size=max(1024, 4 * n_clusters),
+                n_init=1,
+                random_state=self.random_state
+            ).fit(X)
+            labels = kmeans.labels_
+            self.centroids_ = kmeans.cluster_centers_
+
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(len(self.centroids_) + 1))
+        self.members_ = [order[bounds[c]:bounds[c + 1]] for c in range(len(self.centroids_))]
+        # Clusters by centroid distance from each cluster (itself first)
+        self.probe_order_ = np.argsort(euclidean_distances(self.centroids_, squared=True), axis=1)
+        self.n_samples_fit_ = len(X)
+        return self
+
+    def _search(self, queries, cluster, k):
+        """Exact k nearest candidates for queries assigned to one cluster"""
+        candidates = []
+        found = 0
+        for probe, other in enumerate(self.probe_order_[cluster]):
+            if probe >= self.n_probe and found >= k:
+                break
+            candidates.append(self.members_[other])
+            found += len(self.members_[other])
+        candidates = np.concatenate(candidates)
+
+        distances = euclidean_distances(queries, self._fit_X[candidates], squared=True)
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+        ranking = np.argsort(nearest_distances, axis=1, kind='stable')
+        nearest = np.take_along_axis(nearest, ranking, axis=1)
+        return candidates[nearest], np.sqrt(np.maximum(np.take_along_axis(nearest_distances, ranking, axis=1), 0))
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        k = n_neighbors or self.n_neighbors
+        exclude_self = X is None
+        queries = self._fit_X if exclude_self else np.asarray(X, dtype=np.float64)
+        if exclude_self:
+            k += 1
+        if k > self.n_samples_fit_:
+            raise ValueError(f"Expected n_neighbors <= n_samples_fit, got {k} > {self.n_samples_fit_}")
+
+        assigned = pairwise_distances_argmin(queries, self.centroids_)
+        groups = [(cluster, np.flatnonzero(assigned == cluster)) for cluster in np.unique(assigned)]
+        results = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(self._search)(queries[rows], cluster, k) for cluster, rows in groups
+        )
+
+        indices = np.empty((len(queries), k), dtype=np.intp)
+        distances = np.empty((len(queries), k))
+        for (_, rows), (group_indices, group_distances) in zip(groups, results):
+            indices[rows] = group_indices
+            distances[rows] = group_distances
+        if exclude_self:
+            # Drop each point's own index; with exact duplicates it need not be
+            # ranked first, and a row that missed it drops its farthest neighbour
+            own = indices == np.arange(len(queries))[:, None]
+            own[~own.any(axis=1), -1] = True
+            keep = ~own
+            indices = indices[keep].reshape(len(queries), k - 1)
+            distances = distances[keep].reshape(len(queries), k - 1)
+        return (distances, indices) if return_distance else indices
+
+
+def _sampler(strategy, sampling_strategy, k_neighbors, n_jobs, random_state):
+    from imblearn.over_sampling import SMOTE, RandomOverSampler
+
+    if strategy == 'random':
+        return RandomOverSampler(sampling_strategy=sampling_strategy, random_state=random_state)
+    if strategy == 'smote_approx':
+        neighbors = ClusteredNeighbors(n_neighbors=k_neighbors + 1, n_jobs=n_jobs, random_state=random_state)
+    else:
+        neighbors = NearestNeighbors(n_neighbors=k_neighbors + 1, n_jobs=n_jobs)
+    return SMOTE(sampling_strategy=sampling_strategy, k_neighbors=neighbors, random_state=random_state)
+
+
+def balance(X, y, strategy='smote', sampling_strategy='auto', n_jobs=-1, random_state=42):
+    """
+    Balance classes with one of BALANCING_STRATEGIES, measuring its cost
+
+    Args:
+        X: Features
+        y: Labels
+        strategy: Balancing strategy
+        sampling_strategy: imbalanced-learn sampling_strategy
+        n_jobs: Parallel workers for neighbour search (-1 = all cores)
+        random_state: Seed
+
+    Returns:
+        tuple: (X, y, report) where report holds the strategy, elapsed
+            seconds, peak traced memory in MB and row counts
+    """
+    if strategy not in BALANCING_STRATEGIES:
+        raise ValueError(f"Unknown balancing strategy '{strategy}', expected one of {BALANCING_STRATEGIES}")
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    X_balanced, y_balanced = X, y
+    if strategy != 'class_weight':
+        min_samples = min(Counter(y).values())
+        if min_samples > 1 or strategy == 'random':
+            k_neighbors = max(1, min(5, min_samples - 1))
+            sampler = _sampler(strategy, sampling_strategy, k_neighbors, n_jobs, random_state)
+            X_balanced, y_balanced = sampler.fit_resample(X, y)
+        else:
+            logger.warning("Not enough samples for SMOTE. Using original data.")
+
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    if not tracing:
+        tracemalloc.stop()
+
+    report = {
+        'strategy': strategy,
+        'seconds': round(elapsed, 3),
+        'peak_memory_mb': round(peak / 2 ** 20, 1),
+        'rows_before': len(y),
+        'rows_after': len(y_balanced)
+    }
+    return X_balanced, y_balanced, report
+
+
+def compare_strategies(X, y, strategies=BALANCING_STRATEGIES, **kwargs):
+    """Run each strategy on the same data and return their reports"""
+    reports = []
+    for strategy in strategies:
+        _, _, report = balance(X, y, strategy=strategy, **kwargs)
+        logger.info(f"{strategy:>13}: {report['seconds']:.3f}s, {report['peak_memory_mb']:.1f} MB, "
+                    f"{report['rows_before']} → {report['rows_after']} rows")
+        reports.append(report)
+    return reports
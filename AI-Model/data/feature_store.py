@@ -0,0 +1,288 @@
+"""
+Columnar Feature Store for LearnMate AI
+Out-of-core feature storage and streaming quantile sketches
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+
+
+class QuantileSketch:
+    """
+    Mergeable approximate quantiles in bounded memory (KLL-style)
+
+    Values enter level 0 with weight 1. When a level holds more than k
+    items it is sorted and every other item (alternating offsets) moves
+    up a level with double the weight. Memory stays around 2k per level,
+    log2(n / k) levels, and rank error is a small fraction of n. While
+    nothing has been compacted the sketch is exact. Exact running sums
+    are kept alongside for the mean and standard deviation.
+    """
+
+    def __init__(self, k=8192):
+        self.k = k
+        self.count = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.levels = [np.empty(0)]
+        self._offset = 0
+
+    def update(self, values):
+        """Add a batch of values (NaN is ignored)"""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.sum_sq += float(np.dot(values, values))
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """Fold another sketch into this one"""
+        for level, items in enumerate(other.levels):
+            if level == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.sum += other.sum
+        self.sum_sq += other.sum_sq
+        self._compress()
+
+    def mean(self):
+        return self.sum / self.count if self.count else np.nan
+
+    def std(self):
+        """Sample standard deviation (ddof=1, as pandas)"""
+        if self.count < 2:
+            return np.nan
+        variance = (self.sum_sq - self.sum * self.sum / self.count) / (self.count - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                keep = len(items) % 2  # An odd item out stays at this level
+                promoted = items[keep + self._offset::2]
+                self._offset ^= 1
+                self.levels[level] = items[:keep]
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def reference(self, points=2001):
+        """
+        Sorted sample whose ranks approximate the full distribution
+
+        Suitable as a percentile_rank() reference. Exact (every value)
+        while the sketch has not compacted; otherwise `points` evenly
+        spaced quantiles.
+        """
+        if len(self.levels) == 1:
+            return np.sort(self.levels[0])
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([
+            np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)
+        ])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        targets = (np.arange(points) + 0.5) / points * cumulative[-1]
+        return values[np.minimum(np.searchsorted(cumulative, targets), len(values) - 1)]
+
+
+class ColumnarFeatureStore:
+    """
+    Append-only columnar storage for engineered feature frames
+
+    Each column is a raw binary file of fixed dtype, appended chunk by
+    chunk and read back as a read-only np.memmap, so datasets larger than
+    memory can be written and sliced without loading every column.
+    String columns are stored as int16 codes with their labels in the
+    manifest. The manifest is written last, so a store without one is
+    incomplete and is never read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = None
+        manifest_file = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest_file):
+            with open(manifest_file, 'r') as f:
+                self.manifest = json.load(f)
+        self._pending = None
+
+    @classmethod
+    def create(cls, path):
+        """Start an empty store, replacing anything at path"""
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.makedirs(path)
+        store = cls(path)
+        store._pending = {'rows': 0, 'columns': {}, 'labels': {}}
+        return store
+
+    @property
+    def complete(self):
+        return self.manifest is not None
+
+    @property
+    def rows(self):
+        return self.manifest['rows']
+
+    @property
+    def columns(self):
+        return list(self.manifest['columns'])
+
+    @property
+    def metadata(self):
+        return self.manifest.get('metadata', {})
+
+    def _column_file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def append(self, df):
+        """Append a chunk; the first chunk fixes the columns and dtypes"""
+        pending = self._pending
+        if not pending['columns']:
+            for name, dtype in df.dtypes.items():
+                if pd.api.types.is_string_dtype(dtype):
+                    pending['columns'][name] = 'int16'
+                    pending['labels'][name] = []
+                else:
+                    pending['columns'][name] = np.dtype(dtype).str
+        elif list(df.columns) != list(pending['columns']):
+            raise ValueError("Chunk columns do not match the feature store")
+
+        for name, dtype in pending['columns'].items():
+            values = df[name].to_numpy()
+            if name in pending['labels']:
+                values = self._encode(pending['labels'][name], values)
+            with open(self._column_file(name), 'ab') as f:
+                f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        pending['rows'] += len(df)
+
+    @staticmethod
+    def _encode(labels, values):
+        """Map strings to codes, extending labels with unseen values"""
+        uniques, inverse = np.unique(values.astype(str), return_inverse=True)
+        index = {label: code for code, label in enumerate(labels)}
+        for label in uniques:
+            if label not in index:
+                index[label] = len(labels)
+                labels.append(label)
+        return np.array([index[label] for label in uniques], dtype=np.int16)[inverse]
+
+    def finalize(self, **metadata):
+        """Write the manifest, making the store readable"""
+        manifest = dict(self._pending, metadata=metadata)
+        tmp_file = os.path.join(self.path, MANIFEST_FILE + '.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f, indent=2, default=str)
+        os.replace(tmp_file, os.path.join(self.path, MANIFEST_FILE))
+        self.manifest = manifest
+        self._pending = None
+        return self
+
+    def column(self, name):
+        """One column as a read-only memmap (decoded if it holds strings)"""
+        dtype = np.dtype(self.manifest['columns'][name])
+        if self.rows == 0:
+            values = np.empty(0, dtype=dtype)
+        else:
+            values = np.memmap(self._column_file(name), dtype=dtype, mode='r', shape=(self.rows,))
+        labels = self.manifest['labels'].get(name)
+        if labels is not None:
+            return np.array(labels, dtype=object)[values]
+        return values
+
+    def to_frame(self, columns=None):
+        """Load columns into a DataFrame (all columns by default)"""
+        return pd.DataFrame({name: self.column(name) for name in (columns or self.columns)})
+
+
+def file_fingerprint(path, block_size=1 << 20):
+    """SHA-1 of a file's contents"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_fingerprint(functions):
+    """SHA-1 of the source code of the functions implementing a stage"""
+    digest = hashlib.sha1()
+    for function in functions:
+        digest.update(inspect.getsource(function).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Pipeline stage outputs cached as ColumnarFeatureStores
+
+    A stage's key hashes its parent's key, its parameters and the source
+    of the code that implements it, and the first key is the input file's
+    fingerprint. Any change to the data, a parameter or a stage's code
+    therefore changes that stage's key and every key after it. Stages
+    before the change keep theirs and are loaded instead of recomputed.
+    Only the newest `keep` entries of each stage are retained.
+    """
+
+    def __init__(self, cache_dir='data/feature_cache', keep=3):
+        self.cache_dir = cache_dir
+        self.keep = keep
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def stage_key(parent_key, name, params=None, code=''):
+        payload = json.dumps([parent_key, name, params or {}, code], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key[:16]}")
+
+    def has(self, name, key):
+        return ColumnarFeatureStore(self._path(name, key)).complete
+
+    def load(self, name, key):
+        """Cached stage output as a DataFrame, or None"""
+        store = ColumnarFeatureStore(self._path(name, key))
+        if not store.complete:
+            return None
+        os.utime(store.path)  # Mark as recently used for pruning
+        return store.to_frame()
+
+    def save(self, name, key, df):
+        """Persist a stage output and prune old entries of the stage"""
+        store = ColumnarFeatureStore.create(self._path(name, key))
+        store.append(df.reset_index(drop=True))
+        store.finalize(stage=name, key=key)
+        self._prune(name)
+        return store
+
+    def _prune(self, name):
+        entries = sorted(
+            (entry.path for entry in os.scandir(self.cache_dir)
+             if entry.is_dir() and entry.name.rsplit('-', 1)[0] == name),
+            key=os.path.getmtime,
+            reverse=True
+        )
+        for path in entries[self.keep:]:
+            shutil.rmtree(path, ignore_errors=True)
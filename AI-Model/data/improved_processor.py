@@ -6,13 +6,72 @@ Handles imbalanced data and creates better features
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import StandardScaler
-from imblearn.over_sampling import SMOTE
 from collections import Counter
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 
+# Raw columns expected by engineer_features (same layout as real_training_data.csv)
+SCORE_COLUMNS = [
+    'avg_ai_score', 'avg_programming_score', 'avg_math_score',
+    'avg_datascience_score', 'avg_webdev_score'
+]
+
+# Request subject name (lowercased, alphanumerics only) -> score column
+SUBJECT_ALIASES = {
+    'ai': 'avg_ai_score',
+    'artificialintelligence': 'avg_ai_score',
+    'machinelearning': 'avg_ai_score',
+    'programming': 'avg_programming_score',
+    'coding': 'avg_programming_score',
+    'math': 'avg_math_score',
+    'maths': 'avg_math_score',
+    'mathematics': 'avg_math_score',
+    'datascience': 'avg_datascience_score',
+    'data': 'avg_datascience_score',
+    'webdev': 'avg_webdev_score',
+    'webdevelopment': 'avg_webdev_score',
+    'web': 'avg_webdev_score'
+}
+
+# Flag column -> keywords matched against lowercased interests/skills
+INTEREST_KEYWORDS = {
+    'interest_ai': ['ai', 'artificial intelligence', 'machine learning', 'deep learning'],
+    'interest_data': ['data'],
+    'interest_web': ['web', 'frontend', 'backend', 'full stack'],
+    'interest_research': ['research']
+}
+
+SKILL_KEYWORDS = {
+    'skill_python': ['python'],
+    'skill_web_tech': ['html', 'css', 'javascript', 'react', 'node', 'web'],
+    'skill_ml': ['machine learning', 'ml', 'tensorflow', 'pytorch', 'scikit', 'deep learning', 'keras']
+}
+
+# 0/1 columns: raw interest/skill flags and engineered indicators
+FLAG_COLUMNS = list(INTEREST_KEYWORDS) + list(SKILL_KEYWORDS)
+DERIVED_FLAG_COLUMNS = [
+    'research_oriented', 'engineering_oriented', 'web_oriented', 'data_oriented',
+    'is_beginner', 'is_intermediate', 'is_advanced'
+]
+
+OUTLIER_METHODS = ('zscore', 'mad', 'iqr')
+
+# When more than half the values equal the median, the MAD is 0. The mean
+# absolute deviation stands in for it, scaled so the mad rule becomes the
+# modified z-score (x - median) / (1.253314 * MeanAD)
+MEAN_AD_AS_MAD = 1.253314 * 0.6745
+
+# Compact dtypes for reading training CSVs in chunks
+RAW_DTYPES = {
+    **{column: np.float32 for column in SCORE_COLUMNS},
+    **{column: np.int8 for column in FLAG_COLUMNS},
+    'semester': np.uint8
+}
+
+
 class ImprovedDataProcessor:
     """
     Advanced data processing with feature engineering and balancing
@@ -20,10 +79,67 @@ class ImprovedDataProcessor:
     
     def __init__(self):
         self.scaler = StandardScaler()
+        self.balance_report = None
+
+    @staticmethod
+    def _matches(terms, keywords):
+        """Check whether any term contains (or equals) one of the keywords"""
+        for term in terms:
+            for keyword in keywords:
+                if term == keyword or (len(keyword) > 2 and keyword in term):
+                    return 1
+        return 0
+
+    def profile_to_frame(self, scores, interests=None, skills=None, semester=1):
+        """
+        Convert an API student profile into a single raw-feature row
+
+        Subjects missing from the request are filled with the student's
+        average score so they do not bias the prediction either way.
+        """
+        row = {}
+        for subject, score in (scores or {}).items():
+            key = ''.join(ch for ch in str(subject).lower() if ch.isalnum())
+            column = SUBJECT_ALIASES.get(key)
+            if column:
+                row[column] = float(score)
+
+        fill = float(np.mean(list(row.values()))) if row else 50.0
+        for column in SCORE_COLUMNS:
+            row.setdefault(column, fill)
+
+        interest_terms = [str(i).strip().lower() for i in (interests or [])]
+        skill_terms = [str(s).strip().lower() for s in (skills or [])]
+        for column, keywords in INTEREST_KEYWORDS.items():
+            row[column] = self._matches(interest_terms, keywords)
+        for column, keywords in SKILL_KEYWORDS.items():
+            row[column] = self._matches(skill_terms, keywords)
+
+        row['semester'] = int(semester or 1)
+        return pd.DataFrame([row])
+
+    @staticmethod
+    def percentile_rank(values, reference):
+        """
+        Percentile rank of values within a sorted reference sample
+
+        Matches pandas rank(pct=True) (average method) for values that
+        occur in the reference.
+        """
+        reference = np.asarray(reference)
+        left = np.searchsorted(reference, values, side='left')
+        right = np.searchsorted(reference, values, side='right')
+        return np.clip((left + right + 1) / 2 / len(reference), 0.0, 1.0)
         
-    def engineer_features(self, df):
+    def engineer_features(self, df, percentile_reference=None):
         """
         Create advanced features from raw data
+
+        Args:
+            df: Raw data
+            percentile_reference: Optional {score column: sorted training
+                values}; percentiles are then ranked against the training
+                distribution instead of within df (needed for inference)
         """
         logger.info("Engineering advanced features...")
         
@@ -82,138 +198,416 @@ class ImprovedDataProcessor:
         
         # 7. Percentile rankings (relative performance)
         for col in score_columns:
-            df[f'{col}_percentile'] = df[col].rank(pct=True)
+            if percentile_reference and col in percentile_reference:
+                df[f'{col}_percentile'] = self.percentile_rank(df[col].values, percentile_reference[col])
+            else:
+                df[f'{col}_percentile'] = df[col].rank(pct=True)
         
         logger.info(f"✓ Created {len(df.columns) - len(score_columns) - 8} new features")
         
         return df
     
-    def balance_dataset(self, X, y, strategy='auto'):
+    def balance_dataset(self, X, y, strategy='auto', method='smote', n_jobs=-1):
         """
-        Balance dataset using SMOTE (Synthetic Minority Over-sampling)
+        Balance dataset with one of data.balancing.BALANCING_STRATEGIES
+        
+        Args:
+            X: Features
+            y: Labels
+            strategy: imbalanced-learn sampling_strategy
+            method: 'smote' (exact parallel neighbours), 'smote_approx'
+                (clustered approximate neighbours), 'random' (oversample
+                duplicates) or 'class_weight' (no resampling; train with
+                class weights instead)
+            n_jobs: Parallel workers for neighbour search
+        
+        The time and memory the method took are kept in self.balance_report.
         """
-        logger.info("Balancing dataset with SMOTE...")
+        from .balancing import balance
+        
+        logger.info(f"Balancing dataset ({method})...")
         
         # Check class distribution
         class_counts = Counter(y)
         logger.info(f"Original distribution: {dict(class_counts)}")
         
-        # Calculate minimum samples needed for SMOTE (at least 2)
-        min_samples = min(class_counts.values())
-        k_neighbors = min(5, min_samples - 1) if min_samples > 1 else 1
-        
-        if min_samples > 1:
-            try:
-                # Apply SMOTE
-                smote = SMOTE(
-                    sampling_strategy=strategy,
-                    k_neighbors=max(1, k_neighbors),
-                    random_state=42
-                )
-                X_balanced, y_balanced = smote.fit_resample(X, y)
-                
-                # Check new distribution
-                new_counts = Counter(y_balanced)
-                logger.info(f"Balanced distribution: {dict(new_counts)}")
-                logger.info(f"✓ Dataset balanced: {len(X)} → {len(X_balanced)} samples")
-                
-                return X_balanced, y_balanced
-            except Exception as e:
-                logger.warning(f"SMOTE failed: {e}. Using original data.")
-                return X, y
-        else:
-            logger.warning("Not enough samples for SMOTE. Using original data.")
+        try:
+            X_balanced, y_balanced, self.balance_report = balance(
+                X, y, strategy=method, sampling_strategy=strategy, n_jobs=n_jobs, random_state=42
+            )
+        except Exception as e:
+            logger.warning(f"{method} balancing failed: {e}. Using original data.")
             return X, y
+        
+        report = self.balance_report
+        logger.info(f"Balanced distribution: {dict(Counter(y_balanced))}")
+        logger.info(f"✓ Dataset balanced: {len(X)} → {len(X_balanced)} samples "
+                    f"in {report['seconds']:.2f}s, peak {report['peak_memory_mb']:.1f} MB")
+        
+        return X_balanced, y_balanced
     
-    def remove_outliers(self, df, columns, n_std=3):
+    def remove_outliers(self, df, columns, n_std=3, method='zscore', sequential=True,
+                        stats=None, iqr_k=1.5):
         """
-        Remove outliers using z-score method
+        Remove outliers column by column, or in one pass over all columns
+        
+        By default each column is filtered in turn, with its statistics
+        computed on the rows earlier columns kept (the original behaviour).
+        With sequential=False, statistics are computed once on the input
+        and a single combined mask drops every row that is an outlier in
+        any column; this can keep a slightly different set of rows.
+        
+        Args:
+            df: Data
+            columns: Columns to check (missing ones are ignored)
+            n_std: Cut-off for the zscore and mad methods
+            method: 'zscore' (mean/std), 'mad' (robust median/MAD z-score)
+                or 'iqr' (outside Q1 - iqr_k*IQR .. Q3 + iqr_k*IQR)
+            sequential: Filter column by column (False: one pass)
+            stats: Precomputed outlier_stats() for filtering a chunk of a
+                larger dataset with whole-dataset statistics (one pass)
+            iqr_k: Fence multiplier for the iqr method
         """
+        if method not in OUTLIER_METHODS:
+            raise ValueError(f"Unknown outlier method '{method}', expected one of {OUTLIER_METHODS}")
+        
         logger.info("Removing outliers...")
         original_len = len(df)
+        columns = [col for col in columns if col in df.columns]
         
-        for col in columns:
-            if col in df.columns:
-                z_scores = np.abs((df[col] - df[col].mean()) / df[col].std())
-                df = df[z_scores < n_std]
+        if sequential and stats is None:
+            for col in columns:
+                df = df[self.outlier_mask(df, self.outlier_stats(df, [col], method), method, n_std, iqr_k)]
+        elif columns:
+            stats = stats or self.outlier_stats(df, columns, method)
+            df = df[self.outlier_mask(df, stats, method, n_std, iqr_k)]
         
         removed = original_len - len(df)
-        logger.info(f"✓ Removed {removed} outliers ({removed/original_len*100:.1f}%)")
+        logger.info(f"✓ Removed {removed} outliers ({removed/max(original_len, 1)*100:.1f}%)")
         
         return df
     
+    @staticmethod
+    def outlier_stats(df, columns, method='zscore'):
+        """
+        Per-column outlier statistics
+        
+        Returns:
+            dict: {column: (mean, std)} for zscore, (median, MAD) for mad
+                (see MEAN_AD_AS_MAD when the MAD is 0), (Q1, Q3) for iqr
+        """
+        values = df[columns]
+        if method == 'zscore':
+            first, second = values.mean(), values.std()
+        elif method == 'mad':
+            first = values.median()
+            deviations = (values - first).abs()
+            second = deviations.median()
+            second = second.where(second > 0, deviations.mean() * MEAN_AD_AS_MAD)
+        else:
+            first, second = values.quantile(0.25), values.quantile(0.75)
+        return {col: (float(first[col]), float(second[col])) for col in columns}
+    
+    @staticmethod
+    def outlier_stats_from_sketches(sketches, method='zscore'):
+        """
+        outlier_stats() of a whole dataset from first-pass QuantileSketches
+        
+        Mean and std are exact; median, MAD and quartiles come from the
+        sketched distribution (exact while the sketch has not compacted).
+        """
+        stats = {}
+        for col, sketch in sketches.items():
+            if method == 'zscore':
+                stats[col] = (sketch.mean(), sketch.std())
+                continue
+            reference = sketch.reference()
+            if method == 'mad':
+                median = float(np.median(reference))
+                deviations = np.abs(reference - median)
+                mad = float(np.median(deviations)) or float(np.mean(deviations)) * MEAN_AD_AS_MAD
+                stats[col] = (median, mad)
+            else:
+                q1, q3 = np.quantile(reference, [0.25, 0.75])
+                stats[col] = (float(q1), float(q3))
+        return stats
+    
+    @staticmethod
+    def outlier_mask(df, stats, method='zscore', n_std=3, iqr_k=1.5):
+        """
+        Boolean mask of rows that are not outliers in any column of stats
+        
+        A column with no spread (std or MAD of 0) only keeps rows equal to
+        its centre instead of dividing by zero and dropping every row.
+        """
+        values = df[list(stats)].to_numpy(dtype=np.float64)
+        first = np.array([stat[0] for stat in stats.values()])
+        second = np.array([stat[1] for stat in stats.values()])
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if method in ('zscore', 'mad'):
+                # 0.6745 scales the MAD to the standard deviation of a normal distribution
+                scale = 1.0 if method == 'zscore' else 0.6745
+                keep = np.where(second > 0, np.abs(scale * (values - first) / second) < n_std,
+                                values == first)
+            else:
+                spread = iqr_k * (second - first)
+                keep = (values >= first - spread) & (values <= second + spread)
+        return keep.all(axis=1)
+    
     def improve_career_assignments(self, df):
         """
         Improve career assignments using better logic
         """
         logger.info("Improving career assignments...")
         
-        improved_careers = []
-        
-        for idx, row in df.iterrows():
-            # Calculate domain strengths
-            ai_strength = row['avg_ai_score']
-            prog_strength = row['avg_programming_score']
-            math_strength = row['avg_math_score']
-            ds_strength = row['avg_datascience_score']
-            web_strength = row['avg_webdev_score']
-            
-            # Decision tree for better career matching
-            if row['interest_research'] == 1 and ai_strength > 80 and math_strength > 80:
-                career = 'Research Scientist'
-            
-            elif ai_strength > 78 and prog_strength > 78 and row['skill_ml'] == 1:
-                if prog_strength > ai_strength:
-                    career = 'Machine Learning Engineer'
-                else:
-                    career = 'AI Engineer'
-            
-            elif ds_strength > 75 and math_strength > 72:
-                if prog_strength > 75:
-                    career = 'Data Scientist'
-                else:
-                    career = 'Data Analyst'
-            
-            elif web_strength > 75 and row['interest_web'] == 1:
-                if prog_strength > 75:
-                    career = 'Full Stack Developer'
-                else:
-                    career = 'Full Stack Developer'
-            
-            elif prog_strength > 78:
-                if ai_strength > 70:
-                    career = 'Software Engineer'
-                elif web_strength > 70:
-                    career = 'DevOps Engineer'
-                else:
-                    career = 'Software Engineer'
-            
-            elif ds_strength > 70 and math_strength > 65:
-                career = 'Business Intelligence Analyst'
-            
-            elif prog_strength > 72 and math_strength > 70:
-                career = 'Cybersecurity Analyst'
-            
-            else:
-                # Default assignment based on highest score
-                scores = {
-                    'AI Engineer': ai_strength,
-                    'Software Engineer': prog_strength,
-                    'Data Analyst': ds_strength,
-                    'Full Stack Developer': web_strength
-                }
-                career = max(scores, key=scores.get)
-            
-            improved_careers.append(career)
-        
-        df['career'] = improved_careers
+        df['career'] = self.assign_careers(df)
         
         logger.info("✓ Career assignments improved")
         logger.info(f"Career distribution:\n{df['career'].value_counts()}")
         
         return df
     
-    def process_full_pipeline(self, df, balance_data=True, remove_outliers_flag=True):
+    @staticmethod
+    def assign_careers(df):
+        """
+        Career label for every row, evaluated column-wise
+        
+        The decision tree is a list of boolean masks in priority order;
+        np.select picks the first rule that holds for each row. Rows that
+        match no rule take the career of their highest score.
+        
+        Returns:
+            np.ndarray: Career names (object dtype), aligned with df
+        """
+        ai = df['avg_ai_score'].to_numpy()
+        prog = df['avg_programming_score'].to_numpy()
+        math = df['avg_math_score'].to_numpy()
+        ds = df['avg_datascience_score'].to_numpy()
+        web = df['avg_webdev_score'].to_numpy()
+        interest_research = df['interest_research'].to_numpy() == 1
+        interest_web = df['interest_web'].to_numpy() == 1
+        skill_ml = df['skill_ml'].to_numpy() == 1
+        
+        ml_track = (ai > 78) & (prog > 78) & skill_ml
+        data_track = (ds > 75) & (math > 72)
+        prog_track = prog > 78
+        rules = [
+            (interest_research & (ai > 80) & (math > 80), 'Research Scientist'),
+            (ml_track & (prog > ai), 'Machine Learning Engineer'),
+            (ml_track, 'AI Engineer'),
+            (data_track & (prog > 75), 'Data Scientist'),
+            (data_track, 'Data Analyst'),
+            ((web > 75) & interest_web, 'Full Stack Developer'),
+            (prog_track & (ai > 70), 'Software Engineer'),
+            (prog_track & (web > 70), 'DevOps Engineer'),
+            (prog_track, 'Software Engineer'),
+            ((ds > 70) & (math > 65), 'Business Intelligence Analyst'),
+            ((prog > 72) & (math > 70), 'Cybersecurity Analyst')
+        ]
+        
+        # Default: highest score, first listed wins ties (same as max() over a dict)
+        fallback = [('AI Engineer', ai), ('Software Engineer', prog),
+                    ('Data Analyst', ds), ('Full Stack Developer', web)]
+        best = fallback[0][1]
+        default = np.full(len(df), fallback[0][0], dtype=object)
+        for career, values in fallback[1:]:
+            higher = values > best
+            best = np.where(higher, values, best)
+            default[higher] = career
+        
+        return np.select(
+            [mask for mask, _ in rules],
+            [np.array(career, dtype=object) for _, career in rules],
+            default=default
+        )
+    
+    @staticmethod
+    def compact_features(df):
+        """Downcast an engineered frame: int8 flags, uint8 semester, float32 otherwise"""
+        dtypes = {}
+        for column, dtype in df.dtypes.items():
+            if column in FLAG_COLUMNS or column in DERIVED_FLAG_COLUMNS:
+                dtypes[column] = np.int8
+            elif column == 'semester':
+                dtypes[column] = np.uint8
+            elif pd.api.types.is_numeric_dtype(dtype):
+                dtypes[column] = np.float32
+        return df.astype(dtypes)
+    
+    @staticmethod
+    def read_chunks(csv_path, chunk_size=100000):
+        """Iterate over a training CSV in chunks with compact dtypes"""
+        return pd.read_csv(csv_path, dtype=RAW_DTYPES, chunksize=chunk_size)
+    
+    def sketch_scores(self, csv_path, chunk_size=100000, sketch_k=8192):
+        """
+        First pass: quantile sketches of every score column
+        
+        Returns:
+            dict: {score column: QuantileSketch}
+        """
+        from .feature_store import QuantileSketch
+        
+        sketches = {column: QuantileSketch(sketch_k) for column in SCORE_COLUMNS}
+        for chunk in self.read_chunks(csv_path, chunk_size):
+            for column, sketch in sketches.items():
+                sketch.update(chunk[column].to_numpy())
+        return sketches
+    
+    def process_streaming(self, csv_path, store_dir, chunk_size=100000,
+                          sketch_k=8192, reference_points=2001,
+                          remove_outliers_flag=True, outlier_method='zscore', n_std=3):
+        """
+        Out-of-core pipeline: relabel and engineer features chunk by chunk
+        
+        A first pass sketches the score distributions, so the _percentile
+        columns rank each row against the whole dataset (approximately,
+        once it outgrows the sketch) rather than against its chunk, and
+        outliers are judged by whole-dataset statistics. The second pass
+        writes compact feature chunks to a columnar store. Peak memory of
+        this preprocessing is bounded by chunk_size, not by the dataset;
+        balancing and training then need the stored features in memory.
+        
+        Args:
+            csv_path: Raw training CSV
+            store_dir: Directory of the ColumnarFeatureStore to (re)create
+            chunk_size: Rows per chunk
+            sketch_k: Quantile sketch capacity per level
+            reference_points: Quantiles kept per score column
+            remove_outliers_flag: Drop score outliers (see remove_outliers)
+            outlier_method: 'zscore', 'mad' or 'iqr'
+            n_std: Outlier cut-off for zscore and mad
+        
+        Returns:
+            tuple: (ColumnarFeatureStore, {score column: sorted reference})
+        """
+        from .feature_store import ColumnarFeatureStore, StageCache, code_fingerprint, file_fingerprint
+        
+        logger.info("="*60)
+        logger.info("STREAMING DATA PROCESSING PIPELINE")
+        logger.info("="*60)
+        
+        # Reuse the store if it was built from the same data, settings and code
+        key = StageCache.stage_key(
+            file_fingerprint(csv_path),
+            'streaming',
+            {'chunk_size': chunk_size, 'sketch_k': sketch_k, 'reference_points': reference_points,
+             'outliers': [remove_outliers_flag, outlier_method, n_std]},
+            code_fingerprint([self.process_streaming, self.sketch_scores, self.assign_careers,
+                              self.outlier_stats_from_sketches, self.remove_outliers,
+                              self.outlier_mask, self.engineer_features, self.compact_features])
+        )
+        store = ColumnarFeatureStore(store_dir)
+        if store.complete and store.metadata.get('key') == key:
+            with np.load(os.path.join(store_dir, 'percentile_reference.npz')) as saved:
+                references = {column: saved[column] for column in saved.files}
+            logger.info(f"✓ Feature store is up to date: {store.rows} rows, {len(store.columns)} columns")
+            return store, references
+        
+        sketches = self.sketch_scores(csv_path, chunk_size, sketch_k)
+        references = {column: sketch.reference(reference_points) for column, sketch in sketches.items()}
+        logger.info(f"✓ Sketched score distributions of {sketches[SCORE_COLUMNS[0]].count} rows")
+        outlier_stats = self.outlier_stats_from_sketches(sketches, outlier_method)
+        
+        store = ColumnarFeatureStore.create(store_dir)
+        for chunk in self.read_chunks(csv_path, chunk_size):
+            chunk['career'] = self.assign_careers(chunk)
+            if remove_outliers_flag:
+                chunk = self.remove_outliers(chunk, SCORE_COLUMNS, n_std=n_std, method=outlier_method,
+                                             sequential=False, stats=outlier_stats)
+            features = self.engineer_features(chunk, percentile_reference=references)
+            store.append(self.compact_features(features))
+        
+        np.savez(os.path.join(store_dir, 'percentile_reference.npz'), **references)
+        store.finalize(source=os.path.abspath(csv_path), chunk_size=chunk_size, key=key)
+        
+        logger.info(f"✓ Feature store written: {store.rows} rows, {len(store.columns)} columns")
+        return store, references
+    
+    def process_cached(self, csv_path, cache_dir='data/feature_cache',
+                       balance_data=True, remove_outliers_flag=True, outlier_method='zscore',
+                       balance_method='smote', one_pass_outliers=False):
+        """
+        process_full_pipeline with every stage cached on disk
+        
+        Stages are keyed by the CSV's content fingerprint, their parameters
+        and their own source code, so a rerun on unchanged data loads the
+        latest valid stage and only recomputes what changed (see StageCache).
+        
+        Returns:
+            tuple: (X, y, processed_df) as process_full_pipeline
+        """
+        from . import balancing
+        from .feature_store import StageCache, code_fingerprint, file_fingerprint
+        
+        def remove_score_outliers(df):
+            score_columns = [col for col in df.columns if 'score' in col and 'avg' in col]
+            return self.remove_outliers(df, score_columns, method=outlier_method,
+                                        sequential=not one_pass_outliers)
+        
+        def balance_classes(df):
+            X, y = self.balance_dataset(df.drop('career', axis=1), df['career'],
+                                        strategy='auto', method=balance_method)
+            return X.assign(career=np.asarray(y))
+        
+        # (name, parameters, implementing code, function)
+        stages = [('labels', {}, [self.improve_career_assignments, self.assign_careers],
+                   self.improve_career_assignments)]
+        if remove_outliers_flag:
+            stages.append(('outliers', {'n_std': 3, 'method': outlier_method, 'one_pass': one_pass_outliers},
+                           [self.remove_outliers, self.outlier_stats, self.outlier_mask, remove_score_outliers],
+                           remove_score_outliers))
+        stages.append(('features', {}, [self.engineer_features, self.percentile_rank],
+                       self.engineer_features))
+        if balance_data:
+            stages.append(('balanced', {'strategy': 'auto', 'method': balance_method},
+                           [self.balance_dataset, balance_classes, balancing.balance, balancing._sampler,
+                            balancing.ClusteredNeighbors],
+                           balance_classes))
+        
+        cache = StageCache(cache_dir)
+        keys = []
+        key = file_fingerprint(csv_path)
+        for name, params, code, _ in stages:
+            key = StageCache.stage_key(key, name, params, code_fingerprint(code))
+            keys.append(key)
+        
+        # Resume after the last cached stage (the features stage is also returned,
+        # so it must be cached too before it can be skipped)
+        features_index = [name for name, *_ in stages].index('features')
+        start = -1
+        for index in reversed(range(len(stages))):
+            if cache.has(stages[index][0], keys[index]) and (
+                    index <= features_index or cache.has('features', keys[features_index])):
+                start = index
+                break
+        
+        if start >= 0:
+            df = cache.load(stages[start][0], keys[start])
+            logger.info(f"✓ Loaded cached '{stages[start][0]}' stage ({len(df)} rows)")
+        else:
+            df = pd.read_csv(csv_path)
+            logger.info(f"✓ Loaded {len(df)} records from {csv_path}")
+        
+        if start > features_index:
+            processed_df = cache.load('features', keys[features_index])
+        else:
+            processed_df = df if start == features_index else None
+        for index in range(start + 1, len(stages)):
+            name, _, _, function = stages[index]
+            df = function(df).reset_index(drop=True)
+            cache.save(name, keys[index], df)
+            logger.info(f"✓ Stage '{name}' computed and cached")
+            if index == features_index:
+                processed_df = df
+        
+        X = df.drop('career', axis=1)
+        y = df['career']
+        return X, y, processed_df
+    
+    def process_full_pipeline(self, df, balance_data=True, remove_outliers_flag=True,
+                              outlier_method='zscore', balance_method='smote', one_pass_outliers=False):
         """
         Complete data processing pipeline
         """
@@ -227,7 +621,8 @@ class ImprovedDataProcessor:
         # Step 2: Remove outliers
         if remove_outliers_flag:
             score_columns = [col for col in df.columns if 'score' in col and 'avg' in col]
-            df = self.remove_outliers(df, score_columns)
+            df = self.remove_outliers(df, score_columns, method=outlier_method,
+                                      sequential=not one_pass_outliers)
         
         # Step 3: Feature engineering
         df = self.engineer_features(df)
@@ -238,7 +633,7 @@ class ImprovedDataProcessor:
         
         # Step 5: Balance dataset
         if balance_data:
-            X, y = self.balance_dataset(X, y, strategy='auto')
+            X, y = self.balance_dataset(X, y, strategy='auto', method=balance_method)
         
         logger.info("="*60)
         logger.info(f"✓ Processing complete: {len(X)} samples ready for training")
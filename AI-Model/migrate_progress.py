@@ -0,0 +1,52 @@
+"""
+Progress Data Migration
+Imports JSON progress data (legacy single file or per-user shards) into the SQLite ProgressStore
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from models.progress_store import ProgressStore, ShardedProgressStore
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import JSON progress data into SQLite')
+    parser.add_argument('--legacy-file', default='logs/progress_data.json',
+                        help='Single-file progress JSON (all users)')
+    parser.add_argument('--shard-dir', default='logs/progress',
+                        help='Directory of per-user progress JSON files')
+    parser.add_argument('--db', default=os.getenv('PROGRESS_DB_PATH', 'logs/progress.db'),
+                        help='Target SQLite database')
+    args = parser.parse_args()
+
+    store = ProgressStore(args.db)
+    imported = 0
+
+    if os.path.exists(args.legacy_file):
+        users = store.import_legacy(args.legacy_file)
+        os.replace(args.legacy_file, args.legacy_file + '.migrated')
+        logger.info(f"✓ Imported {users} users from {args.legacy_file}")
+        imported += users
+
+    if os.path.isdir(args.shard_dir):
+        users = store.import_records(ShardedProgressStore(args.shard_dir).iter_users())
+        os.replace(args.shard_dir, args.shard_dir + '.migrated')
+        logger.info(f"✓ Imported {users} users from {args.shard_dir}")
+        imported += users
+
+    if not imported:
+        logger.info("Nothing to migrate")
+    else:
+        logger.info(f"📦 {imported} user records now in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Incremental Analytics Aggregates for LearnMate AI
+Hourly per-type counters and running sums folded in from the event log
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Latency histogram: log-spaced buckets growing by 2% from 0.1ms, so any
+# reported percentile is within ~1% of the true value. Seconds up to an
+# hour need ~880 buckets at most, whatever the number of events.
+HISTOGRAM_MIN = 1e-4
+HISTOGRAM_GROWTH = 1.02
+_LOG_GROWTH = math.log(HISTOGRAM_GROWTH)
+
+LATENCY_PERCENTILES = (('p50', 0.5), ('p90', 0.9), ('p99', 0.99), ('p999', 0.999))
+
+
+def new_bucket():
+    """Empty counters for one hour of events"""
+    return {
+        'total': 0,
+        'by_type': {},
+        'quiz': {'count': 0, 'score_sum': 0.0, 'percentage_sum': 0.0, 'grades': {}, 'subjects': {}},
+        'career': {'count': 0, 'recommendations': 0, 'confidence_sum': 0.0, 'careers': {}},
+        'roadmap': {'count': 0, 'milestones_sum': 0, 'hours_sum': 0.0, 'subjects': {}},
+        'response': {'count': 0, 'sum': 0.0, 'min': None, 'max': None},
+        'latency': {}  # event type -> {bucket index: count}
+    }
+
+
+def _increment(counter, key, amount=1):
+    counter[key] = counter.get(key, 0) + amount
+
+
+def histogram_index(value):
+    """Histogram bucket of a latency in seconds"""
+    if value <= HISTOGRAM_MIN:
+        return 0
+    return int(math.log(value / HISTOGRAM_MIN) / _LOG_GROWTH) + 1
+
+
+def histogram_percentiles(histogram):
+    """
+    Estimate latency percentiles from a (merged) histogram
+
+    Returns the geometric midpoint of the bucket holding each rank.
+    """
+    buckets = sorted((int(index), count) for index, count in histogram.items())
+    total = sum(count for _, count in buckets)
+    if not total:
+        return {}
+
+    percentiles = {}
+    for name, quantile in LATENCY_PERCENTILES:
+        rank = max(1, math.ceil(quantile * total))
+        seen = 0
+        for index, count in buckets:
+            seen += count
+            if seen >= rank:
+                break
+        value = HISTOGRAM_MIN if index == 0 else HISTOGRAM_MIN * HISTOGRAM_GROWTH ** (index - 0.5)
+        percentiles[name] = round(value, 4)
+    return percentiles
+
+
+def fold_event(bucket, event):
+    """Add one event to a bucket"""
+    event_type = event.get('type')
+    data = event.get('data') or {}
+
+    bucket['total'] += 1
+    _increment(bucket['by_type'], event_type)
+
+    if event_type == 'quiz_evaluation':
+        quiz = bucket['quiz']
+        quiz['count'] += 1
+        quiz['score_sum'] += data.get('score', 0)
+        quiz['percentage_sum'] += data.get('percentage', 0)
+        _increment(quiz['grades'], data.get('grade', 'N/A'))
+        _increment(quiz['subjects'], data.get('subject', 'Unknown'))
+
+    elif event_type == 'career_recommendation':
+        career = bucket['career']
+        career['count'] += 1
+        for rec in data.get('recommendations', [])[:3]:  # Top 3
+            career['recommendations'] += 1
+            career['confidence_sum'] += rec.get('confidence', 0)
+            _increment(career['careers'], rec.get('career', 'Unknown'))
+
+    elif event_type == 'roadmap_generation':
+        roadmap = bucket['roadmap']
+        stats = data.get('statistics', {})
+        roadmap['count'] += 1
+        roadmap['milestones_sum'] += stats.get('totalMilestones', 0)
+        roadmap['hours_sum'] += stats.get('estimatedTotalHours', 0)
+        for milestone in data.get('roadmap', []):
+            _increment(roadmap['subjects'], milestone.get('subject', 'Unknown'))
+
+    response_time = data.get('response_time')
+    if response_time:
+        response = bucket['response']
+        response['count'] += 1
+        response['sum'] += response_time
+        response['min'] = response_time if response['min'] is None else min(response['min'], response_time)
+        response['max'] = response_time if response['max'] is None else max(response['max'], response_time)
+        latency = bucket.setdefault('latency', {})  # Absent in pre-histogram state
+        _increment(latency.setdefault(event_type, {}), str(histogram_index(response_time)))
+
+
+def merge_buckets(target, source):
+    """Add the counters of source into target"""
+    for key, value in source.items():
+        if isinstance(value, dict):
+            merge_buckets(target.setdefault(key, {}), value)
+        elif key == 'min':
+            if value is not None:
+                target[key] = value if target.get(key) is None else min(target[key], value)
+        elif key == 'max':
+            if value is not None:
+                target[key] = value if target.get(key) is None else max(target[key], value)
+        else:
+            target[key] = target.get(key, 0) + value
+    return target
+
+
+class AnalyticsAggregates:
+    """
+    Hourly aggregates per event log segment
+
+    Each segment's aggregates remember the byte offset they cover, so a
+    query only parses events appended since the previous query (by any
+    worker, since all workers share the segments). The state is persisted
+    next to the segments, so restarts do not re-read the log either.
+    Queries then merge O(hours in window) buckets. Latency histograms are
+    plain bucket counts, so merging hours, days or workers is addition.
+    """
+
+    def __init__(self, event_log, state_file=None):
+        self.event_log = event_log
+        self.state_file = state_file or os.path.join(event_log.log_dir, 'aggregates.json')
+        self._lock = threading.Lock()
+        self._segments = self._load_state()
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not load analytics aggregates, rebuilding: {e}")
+        return {}
+
+    def _save_state(self):
+        tmp_path = f"{self.state_file}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._segments, f)
+        os.replace(tmp_path, self.state_file)
+
+    def refresh(self):
+        """Fold newly appended events into the per-segment aggregates"""
+        self.event_log.flush()
+        with self._lock:
+            changed = False
+            present = set()
+
+            for _, _, path in self.event_log.segments():
+                name = os.path.basename(path)
+                present.add(name)
+                state = self._segments.setdefault(name, {'offset': 0, 'buckets': {}})
+                try:
+                    if os.path.getsize(path) > state['offset']:
+                        self._fold_tail(path, state)
+                        changed = True
+                except FileNotFoundError:
+                    present.discard(name)
+
+            # Drop aggregates of segments removed by retention
+            for name in set(self._segments) - present:
+                del self._segments[name]
+                changed = True
+
+            if changed:
+                try:
+                    self._save_state()
+                except Exception as e:
+                    logger.warning(f"Could not persist analytics aggregates: {e}")
+
+    def _fold_tail(self, path, state):
+        """
+        Parse complete lines after the stored offset (lock held)
+
+        Each event is folded into a scratch bucket first and merged only if
+        that succeeded, so a malformed event cannot leave an hour
+        half-updated; the offset moves past a line once it is merged or
+        skipped.
+        """
+        with open(path, 'rb') as f:
+            f.seek(state['offset'])
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break  # Partially written; picked up next time
+                try:
+                    event = json.loads(line)
+                    hour = event.get('timestamp', '')[:13]
+                    folded = new_bucket()
+                    fold_event(folded, event)
+                except ValueError:
+                    pass  # Torn line from a crashed writer
+                except Exception as e:
+                    logger.warning(f"Skipping malformed analytics event in {os.path.basename(path)}: {e}")
+                else:
+                    merge_buckets(state['buckets'].setdefault(hour, new_bucket()), folded)
+                state['offset'] += len(line)
+
+    def collect(self, since):
+        """
+        Merge hourly buckets from the hour containing `since` onwards
+
+        Returns:
+            tuple: (merged bucket, {date: per-day bucket})
+        """
+        self.refresh()
+        since_hour = since.isoformat()[:13]
+        since_date = since_hour[:10]
+        merged = new_bucket()
+        daily = {}
+
+        with self._lock:
+            for name, state in self._segments.items():
+                # Segment names carry their date: skip whole days outside the window
+                if name[7:17] < since_date:
+                    continue
+                for hour, bucket in state['buckets'].items():
+                    if hour < since_hour:
+                        continue
+                    merge_buckets(merged, bucket)
+                    merge_buckets(daily.setdefault(hour[:10], new_bucket()), bucket)
+
+        return merged, daily
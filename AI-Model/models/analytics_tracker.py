@@ -6,9 +6,12 @@ Tracks usage, performance, and generates insights
 import json
 import os
 from datetime import datetime, timedelta
-from collections import defaultdict
 import logging
 
+from .analytics_aggregates import AnalyticsAggregates, histogram_percentiles, merge_buckets
+from .event_log import EventLog
+from .write_behind import WriteBehindQueue, queue_stats
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,16 +20,42 @@ class AnalyticsTracker:
     Track and analyze AI system usage and performance
     """
     
-    def __init__(self, log_file='logs/analytics.json'):
+    def __init__(self, log_file='logs/analytics.json', log_dir='logs/analytics'):
+        """
+        Args:
+            log_file: Legacy JSON array log, imported once into the event log
+            log_dir: Directory of the append-only event log segments
+        """
         self.log_file = log_file
+        self.event_log = EventLog.from_env(log_dir)
+        self.aggregates = AnalyticsAggregates(self.event_log)
+        # Batches event log writes on a background thread (None: write inline)
+        self.write_queue = WriteBehindQueue.from_env('analytics', self.event_log.append_many)
         self.ensure_log_file()
     
     def ensure_log_file(self):
-        """Ensure analytics log file exists"""
-        os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
-        if not os.path.exists(self.log_file):
-            with open(self.log_file, 'w') as f:
-                json.dump([], f)
+        """
+        Import a legacy JSON array log into the event log (once)
+        
+        Each worker process runs this at startup. The log is first renamed
+        to a claim path, which only one process can do, and imported from
+        there; the others find no log and skip the import.
+        """
+        claim_file = self.log_file + '.importing'
+        try:
+            os.replace(self.log_file, claim_file)
+        except FileNotFoundError:
+            if os.path.exists(claim_file):
+                logger.info(f"Legacy analytics log {self.log_file} is being imported by another process")
+            return
+        try:
+            with open(claim_file, 'r') as f:
+                events = json.load(f)
+            self.event_log.import_events(events)
+            os.replace(claim_file, self.log_file + '.migrated')
+            logger.info(f"Imported {len(events)} analytics events from {self.log_file}")
+        except Exception as e:
+            logger.error(f"Error importing legacy analytics log {claim_file}: {e}")
     
     def log_event(self, event_type, data):
         """
@@ -34,7 +63,7 @@ class AnalyticsTracker:
         
         Args:
             event_type: Type of event (quiz, roadmap, career, etc.)
-            data: Event data dictionary
+            data: Event data dictionary (not copied; don't mutate it afterwards)
         """
         try:
             event = {
@@ -42,21 +71,10 @@ class AnalyticsTracker:
                 'type': event_type,
                 'data': data
             }
-            
-            # Read existing events
-            with open(self.log_file, 'r') as f:
-                events = json.load(f)
-            
-            # Append new event
-            events.append(event)
-            
-            # Keep only last 10,000 events (prevent file from growing too large)
-            if len(events) > 10000:
-                events = events[-10000:]
-            
-            # Write back
-            with open(self.log_file, 'w') as f:
-                json.dump(events, f)
+            if self.write_queue is not None:
+                self.write_queue.submit(event)
+            else:
+                self.event_log.append(event)
             
         except Exception as e:
             logger.error(f"Error logging analytics event: {e}")
@@ -65,57 +83,32 @@ class AnalyticsTracker:
         """
         Get analytics summary for last N days
         
+        Served from hourly aggregates, so the cost grows with the number
+        of hours in the window rather than the number of events. The
+        window starts at the beginning of the cutoff hour.
+        
         Returns:
             dict: Analytics summary
         """
         try:
-            # Read events
-            with open(self.log_file, 'r') as f:
-                events = json.load(f)
+            if self.write_queue is not None:
+                self.write_queue.flush()
             
-            # Filter by date
             cutoff_date = datetime.utcnow() - timedelta(days=days)
-            filtered_events = [
-                e for e in events 
-                if datetime.fromisoformat(e['timestamp']) > cutoff_date
-            ]
-            
-            # Calculate metrics
-            total_requests = len(filtered_events)
+            totals, daily = self.aggregates.collect(since=cutoff_date)
             
-            # Count by type
-            by_type = defaultdict(int)
-            for event in filtered_events:
-                by_type[event['type']] += 1
-            
-            # Quiz analytics
-            quiz_events = [e for e in filtered_events if e['type'] == 'quiz_evaluation']
-            quiz_stats = self._analyze_quiz_events(quiz_events)
-            
-            # Career analytics
-            career_events = [e for e in filtered_events if e['type'] == 'career_recommendation']
-            career_stats = self._analyze_career_events(career_events)
-            
-            # Roadmap analytics
-            roadmap_events = [e for e in filtered_events if e['type'] == 'roadmap_generation']
-            roadmap_stats = self._analyze_roadmap_events(roadmap_events)
-            
-            # Usage by day
-            daily_usage = self._calculate_daily_usage(filtered_events)
-            
-            # Performance metrics
-            performance = self._calculate_performance_metrics(filtered_events)
+            total_requests = totals['total']
             
             analytics = {
                 'period_days': days,
                 'total_requests': total_requests,
-                'requests_by_type': dict(by_type),
+                'requests_by_type': dict(totals['by_type']),
                 'daily_average': total_requests / days if days > 0 else 0,
-                'quiz_analytics': quiz_stats,
-                'career_analytics': career_stats,
-                'roadmap_analytics': roadmap_stats,
-                'daily_usage': daily_usage,
-                'performance_metrics': performance,
+                'quiz_analytics': self._analyze_quiz_events(totals['quiz']),
+                'career_analytics': self._analyze_career_events(totals['career']),
+                'roadmap_analytics': self._analyze_roadmap_events(totals['roadmap']),
+                'daily_usage': self._calculate_daily_usage(daily),
+                'performance_metrics': self._calculate_performance_metrics(totals, daily),
                 'generated_at': datetime.utcnow().isoformat()
             }
             
@@ -128,120 +121,92 @@ class AnalyticsTracker:
                 'total_requests': 0
             }
     
-    def _analyze_quiz_events(self, events):
-        """Analyze quiz evaluation events"""
-        if not events:
+    @staticmethod
+    def _top(counter, limit):
+        return dict(sorted(counter.items(), key=lambda x: x[1], reverse=True)[:limit])
+    
+    def _analyze_quiz_events(self, stats):
+        """Summarize quiz evaluation counters"""
+        count = stats['count']
+        if not count:
             return {'count': 0}
         
-        total_score = 0
-        total_percentage = 0
-        grades = defaultdict(int)
-        subjects = defaultdict(int)
-        
-        for event in events:
-            data = event.get('data', {})
-            total_score += data.get('score', 0)
-            total_percentage += data.get('percentage', 0)
-            grades[data.get('grade', 'N/A')] += 1
-            subjects[data.get('subject', 'Unknown')] += 1
-        
         return {
-            'count': len(events),
-            'avg_score': round(total_score / len(events), 2),
-            'avg_percentage': round(total_percentage / len(events), 2),
-            'grade_distribution': dict(grades),
-            'popular_subjects': dict(sorted(subjects.items(), key=lambda x: x[1], reverse=True)[:5])
+            'count': count,
+            'avg_score': round(stats['score_sum'] / count, 2),
+            'avg_percentage': round(stats['percentage_sum'] / count, 2),
+            'grade_distribution': dict(stats['grades']),
+            'popular_subjects': self._top(stats['subjects'], 5)
         }
     
-    def _analyze_career_events(self, events):
-        """Analyze career recommendation events"""
-        if not events:
+    def _analyze_career_events(self, stats):
+        """Summarize career recommendation counters"""
+        count = stats['count']
+        if not count:
             return {'count': 0}
         
-        recommended_careers = defaultdict(int)
-        avg_confidence = 0
-        
-        for event in events:
-            data = event.get('data', {})
-            recommendations = data.get('recommendations', [])
-            
-            for rec in recommendations[:3]:  # Top 3
-                recommended_careers[rec.get('career', 'Unknown')] += 1
-                avg_confidence += rec.get('confidence', 0)
-        
-        total_recs = sum(recommended_careers.values())
+        total_recs = stats['recommendations']
         
         return {
-            'count': len(events),
+            'count': count,
             'total_recommendations': total_recs,
-            'avg_confidence': round(avg_confidence / total_recs, 3) if total_recs > 0 else 0,
-            'most_recommended': dict(sorted(recommended_careers.items(), key=lambda x: x[1], reverse=True)[:10])
+            'avg_confidence': round(stats['confidence_sum'] / total_recs, 3) if total_recs > 0 else 0,
+            'most_recommended': self._top(stats['careers'], 10)
         }
     
-    def _analyze_roadmap_events(self, events):
-        """Analyze roadmap generation events"""
-        if not events:
+    def _analyze_roadmap_events(self, stats):
+        """Summarize roadmap generation counters"""
+        count = stats['count']
+        if not count:
             return {'count': 0}
         
-        total_milestones = 0
-        total_hours = 0
-        subjects = defaultdict(int)
-        
-        for event in events:
-            data = event.get('data', {})
-            stats = data.get('statistics', {})
-            total_milestones += stats.get('totalMilestones', 0)
-            total_hours += stats.get('estimatedTotalHours', 0)
-            
-            # Track subjects
-            roadmap = data.get('roadmap', [])
-            for milestone in roadmap:
-                subjects[milestone.get('subject', 'Unknown')] += 1
-        
         return {
-            'count': len(events),
-            'avg_milestones': round(total_milestones / len(events), 1) if len(events) > 0 else 0,
-            'avg_hours': round(total_hours / len(events), 1) if len(events) > 0 else 0,
-            'popular_subjects': dict(sorted(subjects.items(), key=lambda x: x[1], reverse=True)[:5])
+            'count': count,
+            'avg_milestones': round(stats['milestones_sum'] / count, 1),
+            'avg_hours': round(stats['hours_sum'] / count, 1),
+            'popular_subjects': self._top(stats['subjects'], 5)
         }
     
-    def _calculate_daily_usage(self, events):
+    def _calculate_daily_usage(self, daily):
         """Calculate daily usage statistics"""
-        daily_counts = defaultdict(int)
-        
-        for event in events:
-            date = datetime.fromisoformat(event['timestamp']).date()
-            daily_counts[str(date)] += 1
-        
         # Get last 7 days
         last_7_days = {}
         for i in range(7):
             date = (datetime.utcnow().date() - timedelta(days=i))
-            last_7_days[str(date)] = daily_counts.get(str(date), 0)
+            last_7_days[str(date)] = daily[str(date)]['total'] if str(date) in daily else 0
         
         return dict(sorted(last_7_days.items()))
     
-    def _calculate_performance_metrics(self, events):
-        """Calculate system performance metrics"""
-        if not events:
+    def _calculate_performance_metrics(self, totals, daily):
+        """Calculate system performance metrics, with latency percentiles"""
+        response = totals['response']
+        if not totals['total'] or not response['count']:
             return {}
         
-        response_times = []
-        
-        for event in events:
-            data = event.get('data', {})
-            response_time = data.get('response_time')
-            if response_time:
-                response_times.append(response_time)
+        overall = {}
+        for histogram in totals['latency'].values():
+            merge_buckets(overall, histogram)
+        
+        metrics = {
+            'avg_response_time': round(response['sum'] / response['count'], 3),
+            'min_response_time': round(response['min'], 3),
+            'max_response_time': round(response['max'], 3),
+            'response_time_percentiles': histogram_percentiles(overall),
+            'percentiles_by_type': {
+                event_type: histogram_percentiles(histogram)
+                for event_type, histogram in totals['latency'].items()
+            },
+            'percentiles_by_day': {}
+        }
         
-        if response_times:
-            return {
-                'avg_response_time': round(sum(response_times) / len(response_times), 3),
-                'min_response_time': round(min(response_times), 3),
-                'max_response_time': round(max(response_times), 3)
-            }
+        for date, bucket in sorted(daily.items()):
+            day_histogram = {}
+            for histogram in bucket['latency'].values():
+                merge_buckets(day_histogram, histogram)
+            if day_histogram:
+                metrics['percentiles_by_day'][date] = histogram_percentiles(day_histogram)
         
-        return {}
+        return metrics
     
     def get_system_health(self):
         """Get system health status"""
@@ -265,6 +230,7 @@ class AnalyticsTracker:
                 'requests_24h': total_requests,
                 'uptime': 'operational',
                 'models_loaded': True,
+                'write_queues': queue_stats(),
                 'last_check': datetime.utcnow().isoformat()
             }
             
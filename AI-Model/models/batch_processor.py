@@ -4,7 +4,7 @@ Process multiple requests efficiently
 """
 
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import List, Dict, Any
 import time
 
@@ -24,6 +24,9 @@ class BatchProcessor:
         """
         Evaluate multiple quizzes in batch
         
+        All quizzes are graded in one vectorized QuizEvaluator.evaluate_batch
+        pass instead of one thread-pool task per quiz.
+        
         Args:
             quiz_evaluator: QuizEvaluator instance
             quiz_list: List of quiz data dictionaries
@@ -34,33 +37,26 @@ class BatchProcessor:
         logger.info(f"Batch processing {len(quiz_list)} quizzes")
         start_time = time.time()
         
+        try:
+            evaluations = quiz_evaluator.evaluate_batch(quiz_list, return_exceptions=True)
+        except Exception as e:
+            logger.error(f"Error in batch quiz evaluation: {e}")
+            evaluations = [e] * len(quiz_list)
+        
         results = []
-        futures = []
-        
-        # Submit all tasks
-        for idx, quiz_data in enumerate(quiz_list):
-            future = self.executor.submit(
-                self._evaluate_single_quiz,
-                quiz_evaluator,
-                quiz_data,
-                idx
-            )
-            futures.append(future)
-        
-        # Collect results
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Error in batch quiz evaluation: {e}")
+        for idx, evaluation in enumerate(evaluations):
+            if isinstance(evaluation, Exception):
                 results.append({
+                    'index': idx,
                     'status': 'error',
-                    'error': str(e)
+                    'error': str(evaluation)
+                })
+            else:
+                results.append({
+                    'index': idx,
+                    'status': 'success',
+                    'data': evaluation
                 })
-        
-        # Sort by original index
-        results.sort(key=lambda x: x.get('index', 0))
         
         elapsed = time.time() - start_time
         logger.info(f"Batch quiz evaluation completed in {elapsed:.2f}s")
@@ -73,30 +69,13 @@ class BatchProcessor:
             'results': results
         }
     
-    def _evaluate_single_quiz(self, quiz_evaluator, quiz_data, index):
-        """Helper function to evaluate a single quiz"""
-        try:
-            result = quiz_evaluator.evaluate(
-                answers=quiz_data.get('answers', []),
-                correct_answers=quiz_data.get('correctAnswers', []),
-                subject=quiz_data.get('subject', 'General')
-            )
-            return {
-                'index': index,
-                'status': 'success',
-                'data': result
-            }
-        except Exception as e:
-            return {
-                'index': index,
-                'status': 'error',
-                'error': str(e)
-            }
-    
     def batch_generate_roadmaps(self, roadmap_generator, roadmap_requests):
         """
         Generate multiple roadmaps in batch
         
+        LLM calls are issued concurrently on the shared async client
+        (bounded by LLM_MAX_CONCURRENCY) instead of the thread pool.
+        
         Args:
             roadmap_generator: RoadmapGenerator instance
             roadmap_requests: List of roadmap request dictionaries
@@ -107,33 +86,38 @@ class BatchProcessor:
         logger.info(f"Batch processing {len(roadmap_requests)} roadmaps")
         start_time = time.time()
         
-        results = []
-        futures = []
-        
-        # Submit all tasks
-        for idx, request in enumerate(roadmap_requests):
-            future = self.executor.submit(
-                self._generate_single_roadmap,
-                roadmap_generator,
-                request,
-                idx
-            )
-            futures.append(future)
-        
-        # Collect results
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Error in batch roadmap generation: {e}")
-                results.append({
+        try:
+            roadmaps = roadmap_generator.generate_many([
+                {
+                    'user_id': request.get('userId'),
+                    'performance': request.get('performance', {}),
+                    'semester': request.get('semester', 1),
+                    'interests': request.get('interests', []),
+                    'target_career': request.get('targetCareer'),
+                    'time_available': request.get('timeAvailable', 15)
+                }
+                for request in roadmap_requests
+            ])
+            results = [
+                {
+                    'index': idx,
+                    'userId': request.get('userId'),
+                    'status': 'success',
+                    'data': roadmap
+                }
+                for idx, (request, roadmap) in enumerate(zip(roadmap_requests, roadmaps))
+            ]
+        except Exception as e:
+            logger.error(f"Error in batch roadmap generation: {e}")
+            results = [
+                {
+                    'index': idx,
+                    'userId': request.get('userId'),
                     'status': 'error',
                     'error': str(e)
-                })
-        
-        # Sort by original index
-        results.sort(key=lambda x: x.get('index', 0))
+                }
+                for idx, request in enumerate(roadmap_requests)
+            ]
         
         elapsed = time.time() - start_time
         logger.info(f"Batch roadmap generation completed in {elapsed:.2f}s")
@@ -146,38 +130,18 @@ class BatchProcessor:
             'results': results
         }
     
-    def _generate_single_roadmap(self, roadmap_generator, request, index):
-        """Helper function to generate a single roadmap"""
-        try:
-            result = roadmap_generator.generate(
-                user_id=request.get('userId'),
-                performance=request.get('performance', {}),
-                semester=request.get('semester', 1),
-                interests=request.get('interests', []),
-                target_career=request.get('targetCareer'),
-                time_available=request.get('timeAvailable', 15)
-            )
-            return {
-                'index': index,
-                'userId': request.get('userId'),
-                'status': 'success',
-                'data': result
-            }
-        except Exception as e:
-            return {
-                'index': index,
-                'userId': request.get('userId'),
-                'status': 'error',
-                'error': str(e)
-            }
-    
-    def batch_recommend_careers(self, career_recommender, career_requests):
+    def batch_recommend_careers(self, career_recommender, career_requests, pack_size=None):
         """
         Generate career recommendations in batch
         
+        LLM calls are issued concurrently on the shared async client
+        (bounded by LLM_MAX_CONCURRENCY) instead of the thread pool, with
+        several student profiles packed into each prompt.
+        
         Args:
             career_recommender: CareerRecommender instance
             career_requests: List of career request dictionaries
+            pack_size: Profiles per LLM call (None uses CAREER_PACK_SIZE)
         
         Returns:
             dict: Batch results
@@ -185,33 +149,26 @@ class BatchProcessor:
         logger.info(f"Batch processing {len(career_requests)} career recommendations")
         start_time = time.time()
         
-        results = []
-        futures = []
-        
-        # Submit all tasks
-        for idx, request in enumerate(career_requests):
-            future = self.executor.submit(
-                self._recommend_single_career,
-                career_recommender,
-                request,
-                idx
-            )
-            futures.append(future)
-        
-        # Collect results
-        for future in as_completed(futures):
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Error in batch career recommendation: {e}")
-                results.append({
+        try:
+            recommendations = career_recommender.recommend_many(career_requests, pack_size=pack_size)
+            results = [
+                {
+                    'index': idx,
+                    'status': 'success',
+                    'data': recommendation
+                }
+                for idx, recommendation in enumerate(recommendations)
+            ]
+        except Exception as e:
+            logger.error(f"Error in batch career recommendation: {e}")
+            results = [
+                {
+                    'index': idx,
                     'status': 'error',
                     'error': str(e)
-                })
-        
-        # Sort by original index
-        results.sort(key=lambda x: x.get('index', 0))
+                }
+                for idx in range(len(career_requests))
+            ]
         
         elapsed = time.time() - start_time
         logger.info(f"Batch career recommendation completed in {elapsed:.2f}s")
@@ -224,26 +181,86 @@ class BatchProcessor:
             'results': results
         }
     
-    def _recommend_single_career(self, career_recommender, request, index):
-        """Helper function to recommend career for single request"""
-        try:
-            result = career_recommender.recommend(
-                scores=request.get('scores', {}),
-                interests=request.get('interests', []),
-                skills=request.get('skills', []),
-                semester=request.get('semester', 1)
-            )
-            return {
-                'index': index,
-                'status': 'success',
-                'data': result
-            }
-        except Exception as e:
-            return {
-                'index': index,
-                'status': 'error',
-                'error': str(e)
-            }
+    def run_branches(self, branches, timeout=None):
+        """
+        Run independent analyses concurrently
+        
+        Each branch's deadline starts when it begins running, so a branch
+        queued behind other requests in the shared pool is not charged for
+        the wait. A branch still queued a full timeout after submission is
+        cancelled without running. A branch that times out while running
+        keeps its worker until it returns (threads can't be interrupted),
+        but its result is not waited for. A branch that returns a dict
+        with an "error" key (the models' fallback results when the LLM call
+        fails) counts as failed, like one that raises.
+        
+        Args:
+            branches: Dict of name -> zero-argument callable
+            timeout: Seconds each branch may run (None waits indefinitely)
+        
+        Returns:
+            tuple: (results of successful branches, per-branch status report)
+        """
+        start_time = time.time()
+        started_at = {}
+        finished_at = {}
+        
+        def timed(name, branch):
+            started_at[name] = time.time()
+            try:
+                return branch()
+            finally:
+                finished_at[name] = time.time()
+        
+        futures = {name: self.executor.submit(timed, name, branch) for name, branch in branches.items()}
+        
+        timed_out = {}  # name -> whether the branch had started
+        pending = dict(futures)
+        while pending:
+            now = time.time()
+            deadlines = []
+            if timeout is not None:
+                for name, future in list(pending.items()):
+                    began = started_at.get(name)
+                    if began is None and now >= start_time + timeout and future.cancel():
+                        timed_out[name] = False
+                        del pending[name]
+                    elif began is not None and now >= began + timeout:
+                        timed_out[name] = True
+                        del pending[name]
+                    else:
+                        deadlines.append((began or start_time) + timeout)
+            if not pending:
+                break
+            wait(pending.values(), timeout=max(0.0, min(deadlines) - now) if deadlines else None,
+                 return_when=FIRST_COMPLETED)
+            pending = {name: future for name, future in pending.items() if not future.done()}
+        
+        results = {}
+        report = {}
+        for name, future in futures.items():
+            if name in timed_out:
+                if timed_out[name]:
+                    logger.warning(f"Branch '{name}' timed out after {timeout}s")
+                    report[name] = {'status': 'timeout'}
+                else:
+                    logger.warning(f"Branch '{name}' did not start within {timeout}s")
+                    report[name] = {'status': 'timeout', 'queued': True}
+            else:
+                try:
+                    result = future.result()
+                    if isinstance(result, dict) and result.get('error'):
+                        logger.error(f"Branch '{name}' returned an error: {result['error']}")
+                        report[name] = {'status': 'error', 'error': str(result['error'])}
+                    else:
+                        results[name] = result
+                        report[name] = {'status': 'success'}
+                except Exception as e:
+                    logger.error(f"Branch '{name}' failed: {e}")
+                    report[name] = {'status': 'error', 'error': str(e)}
+            report[name]['processing_time'] = round(finished_at.get(name, time.time()) - start_time, 2)
+        
+        return results, report
     
     def shutdown(self):
         """Shutdown the executor"""
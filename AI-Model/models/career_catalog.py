@@ -0,0 +1,111 @@
+"""
+Career Catalog for LearnMate AI
+Static career descriptions used when recommendations are served
+without the LLM (ensemble fast path)
+"""
+
+CAREER_CATALOG = {
+    'AI Engineer': {
+        'description': 'Designs, builds and deploys AI-powered systems and intelligent applications.',
+        'requirements': ['Machine Learning fundamentals', 'Strong programming', 'Linear Algebra'],
+        'keySkills': ['Python', 'TensorFlow/PyTorch', 'MLOps'],
+        'growthRate': 'Very High',
+        'avgSalary': '$100k - $170k',
+        'industries': ['Technology', 'Healthcare', 'Finance'],
+        'subjects': ['AI', 'Programming', 'Math']
+    },
+    'Machine Learning Engineer': {
+        'description': 'Builds production machine learning pipelines, models and serving infrastructure.',
+        'requirements': ['Software engineering', 'Machine Learning algorithms', 'Statistics'],
+        'keySkills': ['Python', 'scikit-learn', 'Docker'],
+        'growthRate': 'Very High',
+        'avgSalary': '$100k - $165k',
+        'industries': ['Technology', 'E-commerce', 'Finance'],
+        'subjects': ['Programming', 'AI', 'Math']
+    },
+    'Research Scientist': {
+        'description': 'Advances the state of the art through research in AI, algorithms or data.',
+        'requirements': ['Advanced Mathematics', 'Research methodology', 'Scientific writing'],
+        'keySkills': ['Python', 'PyTorch', 'LaTeX'],
+        'growthRate': 'High',
+        'avgSalary': '$95k - $180k',
+        'industries': ['Research Labs', 'Academia', 'Technology'],
+        'subjects': ['AI', 'Math']
+    },
+    'Data Scientist': {
+        'description': 'Extracts insights and builds predictive models from large datasets.',
+        'requirements': ['Statistics', 'Data wrangling', 'Machine Learning'],
+        'keySkills': ['Python', 'pandas', 'SQL'],
+        'growthRate': 'Very High',
+        'avgSalary': '$90k - $150k',
+        'industries': ['Technology', 'Finance', 'Healthcare'],
+        'subjects': ['DataScience', 'Math', 'Programming']
+    },
+    'Data Analyst': {
+        'description': 'Turns business data into reports, dashboards and actionable findings.',
+        'requirements': ['Statistics', 'Data visualization', 'Business understanding'],
+        'keySkills': ['SQL', 'Excel', 'Tableau/Power BI'],
+        'growthRate': 'High',
+        'avgSalary': '$60k - $100k',
+        'industries': ['Finance', 'Retail', 'Consulting'],
+        'subjects': ['DataScience', 'Math']
+    },
+    'Business Intelligence Analyst': {
+        'description': 'Designs data models and dashboards that support business decisions.',
+        'requirements': ['Data modelling', 'Reporting', 'Domain knowledge'],
+        'keySkills': ['SQL', 'Power BI', 'Data Warehousing'],
+        'growthRate': 'High',
+        'avgSalary': '$65k - $110k',
+        'industries': ['Consulting', 'Retail', 'Finance'],
+        'subjects': ['DataScience', 'Math']
+    },
+    'Full Stack Developer': {
+        'description': 'Builds complete web applications across frontend, backend and databases.',
+        'requirements': ['Web fundamentals', 'Backend development', 'Databases'],
+        'keySkills': ['JavaScript', 'React', 'Node.js'],
+        'growthRate': 'High',
+        'avgSalary': '$75k - $130k',
+        'industries': ['Technology', 'Startups', 'E-commerce'],
+        'subjects': ['WebDev', 'Programming']
+    },
+    'Software Engineer': {
+        'description': 'Designs, develops and maintains reliable software systems.',
+        'requirements': ['Data Structures & Algorithms', 'Software design', 'Testing'],
+        'keySkills': ['Python/Java', 'Git', 'System Design'],
+        'growthRate': 'High',
+        'avgSalary': '$80k - $140k',
+        'industries': ['Technology', 'Finance', 'Telecom'],
+        'subjects': ['Programming', 'Math']
+    },
+    'DevOps Engineer': {
+        'description': 'Automates infrastructure, deployment and monitoring of software systems.',
+        'requirements': ['Linux', 'Networking', 'Scripting'],
+        'keySkills': ['Docker', 'Kubernetes', 'CI/CD'],
+        'growthRate': 'Very High',
+        'avgSalary': '$85k - $145k',
+        'industries': ['Technology', 'Cloud Services', 'Finance'],
+        'subjects': ['Programming', 'WebDev']
+    },
+    'Cybersecurity Analyst': {
+        'description': 'Protects systems and data by detecting, analysing and preventing threats.',
+        'requirements': ['Networking', 'Security fundamentals', 'Cryptography basics'],
+        'keySkills': ['Linux', 'Wireshark', 'SIEM tools'],
+        'growthRate': 'Very High',
+        'avgSalary': '$75k - $130k',
+        'industries': ['Government', 'Finance', 'Technology'],
+        'subjects': ['Programming', 'Math']
+    }
+}
+
+
+def get_career_info(career):
+    """Get catalog entry for a career (generic entry if unknown)"""
+    return CAREER_CATALOG.get(career, {
+        'description': f'Career path in {career}.',
+        'requirements': [],
+        'keySkills': [],
+        'growthRate': 'High',
+        'avgSalary': 'Varies',
+        'industries': [],
+        'subjects': []
+    })
@@ -1,73 +1,532 @@
+import os
 import logging
+import threading
+from collections import namedtuple
 from datetime import datetime
-from .llm_client import LLMClient
+from .llm_client import LLMClient, get_async_llm_client
+from .career_catalog import get_career_info
 
 logger = logging.getLogger(__name__)
 
+RECOMMENDER_MODES = ('llm', 'hybrid', 'fast')
+
+# How a single request will be answered (see CareerRecommender._plan)
+_Plan = namedtuple('_Plan', ['result', 'prompt', 'finish', 'profile'])
+DEFAULT_ENSEMBLE_MODEL_PATH = os.path.join(
+    os.path.dirname(__file__), 'saved', 'ensemble_career_model.pkl'
+)
+
+
+class ProfileCanonicalizer:
+    """
+    Map near-identical student profiles onto one canonical profile
+
+    Scores are quantized into bands, semesters into buckets and
+    interests/skills are normalized, so that the LLM prompt (and therefore
+    the response cache key) is shared by students with similar profiles.
+    """
+
+    def __init__(self, score_band=None, semester_bucket=None):
+        self.score_band = score_band or int(os.getenv('CAREER_SCORE_BAND', 5))
+        self.semester_bucket = semester_bucket or int(os.getenv('CAREER_SEMESTER_BUCKET', 2))
+
+    def score_band_label(self, score):
+        """Quantize a 0-100 score into a band label like '70-75'"""
+        try:
+            score = min(max(float(score), 0.0), 100.0)
+        except (TypeError, ValueError):
+            return 'unknown'
+        lower = int(score // self.score_band) * self.score_band
+        lower = min(lower, 100 - self.score_band) if self.score_band < 100 else 0
+        return f"{lower}-{lower + self.score_band}"
+
+    def semester_label(self, semester):
+        """Bucket a semester number into a range label like '3-4'"""
+        try:
+            semester = max(int(semester), 1)
+        except (TypeError, ValueError):
+            return 'unknown'
+        lower = ((semester - 1) // self.semester_bucket) * self.semester_bucket + 1
+        upper = lower + self.semester_bucket - 1
+        return str(lower) if lower == upper else f"{lower}-{upper}"
+
+    @staticmethod
+    def normalize_terms(terms):
+        """Lowercase, strip, de-duplicate and sort a list of free-text terms"""
+        return sorted({str(t).strip().lower() for t in (terms or []) if str(t).strip()})
+
+    def canonicalize(self, scores, interests=None, skills=None, semester=1):
+        """
+        Build the canonical profile used in the LLM prompt
+
+        Returns:
+            dict: Canonical profile
+        """
+        return {
+            'semester': self.semester_label(semester),
+            'scores': {
+                str(subject): self.score_band_label(score)
+                for subject, score in sorted((scores or {}).items(), key=lambda x: str(x[0]))
+            },
+            'interests': self.normalize_terms(interests),
+            'skills': self.normalize_terms(skills)
+        }
+
+
 class CareerRecommender:
     """
     Intelligent Career Recommendation System (Powered by Gemini AI)
+
+    Modes:
+        llm: Gemini ranks and describes careers (original behaviour)
+        hybrid: the trained ensemble model ranks careers in milliseconds,
+            Gemini only writes the descriptive text fields
+        fast: ensemble ranking with catalog text, no LLM call at all
     """
     
-    def __init__(self):
+    def __init__(self, canonicalizer=None, default_mode=None, model_path=None, pack_size=None):
         """Initialize with LLM Client"""
         self.llm = LLMClient()
-        logger.info("CareerRecommender initialized with Gemini AI")
-    
-    def recommend(self, scores, interests=None, skills=None, semester=1):
+        self.canonicalizer = canonicalizer or ProfileCanonicalizer()
+        self.default_mode = (default_mode or os.getenv('CAREER_RECOMMENDER_MODE', 'hybrid')).lower()
+        self.model_path = model_path or os.getenv('ENSEMBLE_MODEL_PATH', DEFAULT_ENSEMBLE_MODEL_PATH)
+        self._ensemble = None
+        self._processor = None
+        self._ensemble_checked = False
+        self._ensemble_lock = threading.Lock()
+        self.pack_size = int(pack_size or os.getenv('CAREER_PACK_SIZE', 5))
+        logger.info(f"CareerRecommender initialized with Gemini AI (default mode: {self.default_mode})")
+
+    def _get_ensemble(self):
+        """Lazily load the trained ensemble model (None if unavailable)"""
+        if self._ensemble_checked:
+            return self._ensemble
+
+        with self._ensemble_lock:
+            if not self._ensemble_checked:
+                try:
+                    if os.path.exists(self.model_path):
+                        from .ensemble_recommender import EnsembleCareerRecommender
+                        from data.improved_processor import ImprovedDataProcessor
+
+                        ensemble = EnsembleCareerRecommender()
+                        ensemble.load_model(self.model_path)
+                        self._processor = ImprovedDataProcessor()
+                        self._ensemble = ensemble
+                    else:
+                        logger.warning(f"Ensemble model not found at {self.model_path}; using LLM mode only")
+                except Exception as e:
+                    logger.error(f"Failed to load ensemble model: {e}")
+                self._ensemble_checked = True
+
+        return self._ensemble
+
+    def recommend(self, scores, interests=None, skills=None, semester=1, mode=None):
         """
-        Generate career recommendations using LLM analysis
+        Generate career recommendations
+
+        Args:
+            scores: Subject scores
+            interests: List of interests
+            skills: List of known skills
+            semester: Current semester
+            mode: 'llm', 'hybrid' or 'fast' (defaults to CAREER_RECOMMENDER_MODE)
         """
+        plan = self._plan(scores, interests, skills, semester, mode)
+        if plan.prompt is None:
+            return plan.result
+
         try:
-            logger.info(f"Generating AI career recommendations for semester {semester}")
-            
-            prompt = f"""
+            response = self.llm.generate_json(plan.prompt)
+        except Exception as e:
+            response = e
+        return plan.finish(response)
+
+    def recommend_many(self, requests, pack_size=None):
+        """
+        Generate recommendations for many students with concurrent async LLM calls
+
+        LLM-mode requests are packed up to pack_size profiles per prompt;
+        any packed item that comes back missing or malformed is retried
+        with its own single-profile prompt. Packing shares the per-profile
+        response cache: cached profiles are not packed, and each valid
+        packed item is cached under its single-profile prompt. Packed
+        responses themselves are never cached.
+
+        Args:
+            requests: List of dicts with recommend() keyword arguments
+            pack_size: Profiles per LLM call (defaults to CAREER_PACK_SIZE,
+                1 disables packing)
+
+        Returns:
+            list: One recommendation result per request, in order
+        """
+        pack_size = pack_size or self.pack_size
+        plans = [
+            self._plan(
+                req.get('scores', {}),
+                req.get('interests', []),
+                req.get('skills', []),
+                req.get('semester', 1),
+                req.get('mode')
+            )
+            for req in requests
+        ]
+        results = [plan.result if plan.prompt is None else None for plan in plans]
+
+        client = get_async_llm_client()
+        llm_indices = [i for i, plan in enumerate(plans) if plan.profile is not None]
+        packs = []
+        if pack_size > 1 and len(llm_indices) > 1:
+            # Profiles answered before (alone or in a pack) come from the cache
+            for i in llm_indices:
+                cached = client.get_cached_json(plans[i].prompt)
+                if cached is not None:
+                    results[i] = plans[i].finish(cached)
+            pending = [i for i in llm_indices if results[i] is None]
+            if len(pending) > 1:
+                packs = [pending[i:i + pack_size] for i in range(0, len(pending), pack_size)]
+        packed = {i for pack in packs for i in pack}
+        singles = [i for i, plan in enumerate(plans)
+                   if plan.prompt is not None and i not in packed and results[i] is None]
+
+        responses = client.generate_json_many(
+            [self._packed_prompt([plans[i].profile for i in pack]) for pack in packs] +
+            [plans[i].prompt for i in singles],
+            use_cache=[False] * len(packs) + [True] * len(singles)
+        )
+
+        retries = []
+        for pack, response in zip(packs, responses[:len(packs)]):
+            items = self._split_packed(response, len(pack))
+            for i, item in zip(pack, items):
+                if item is None:
+                    retries.append(i)
+                else:
+                    client.set_cached_json(plans[i].prompt, item)
+                    results[i] = plans[i].finish(item)
+        for i, response in zip(singles, responses[len(packs):]):
+            results[i] = plans[i].finish(response)
+
+        if retries:
+            logger.info(f"Retrying {len(retries)} packed career recommendations individually")
+            for i, response in zip(retries, client.generate_json_many([plans[i].prompt for i in retries])):
+                results[i] = plans[i].finish(response)
+
+        return results
+
+    def _packed_prompt(self, profiles):
+        """Prompt asking the LLM to rank and describe careers for several students"""
+        listing = "\n".join(
+            f"            [{idx}] Semester (range): {p['semester']}; "
+            f"Subject Score Bands: {p['scores']}; Interests: {p['interests']}; "
+            f"Known Skills: {p['skills']}"
+            for idx, p in enumerate(profiles)
+        )
+        return f"""
             Act as an expert Career Counselor for university students.
-            Analyze the student's profile and recommend the top 6 most suitable career paths.
+            For EACH of the {len(profiles)} student profiles below, independently recommend
+            the top 6 most suitable career paths.
             
-            STUDENT PROFILE:
-            - Current Semester: {semester}
-            - Academic Performance (Subject Scores): {scores}
-            - Interests: {interests}
-            - Known Skills: {skills}
+            STUDENT PROFILES (index, profile):
+{listing}
             
             OUTPUT REQUIREMENTS:
-            Return a JSON object with this exact structure:
+            Return a JSON object with exactly {len(profiles)} entries in "results",
+            one per student, using this exact structure:
             {{
-                "recommendations": [
+                "results": [
                     {{
-                        "career": "Career Name",
-                        "confidence": 0.95,  // Float between 0-1
-                        "description": "Brief description of the role",
-                        "matchReasons": ["Reason 1", "Reason 2"], // Specific to the student's profile
-                        "requirements": ["Skill 1", "Skill 2"],
-                        "keySkills": ["Tech Stack 1", "Tech Stack 2"],
-                        "growthRate": "High/Very High",
-                        "avgSalary": "$X - $Y",
-                        "industries": ["Ind 1", "Ind 2"]
+                        "index": 0,  // Index of the student profile
+                        "recommendations": [
+                            {{
+                                "career": "Career Name",
+                                "confidence": 0.95,  // Float between 0-1
+                                "description": "Brief description of the role",
+                                "matchReasons": ["Reason 1", "Reason 2"], // Specific to this student
+                                "requirements": ["Skill 1", "Skill 2"],
+                                "keySkills": ["Tech Stack 1", "Tech Stack 2"],
+                                "growthRate": "High/Very High",
+                                "avgSalary": "$X - $Y",
+                                "industries": ["Ind 1", "Ind 2"]
+                            }}
+                        ],
+                        "careerAdvice": ["Specific action item 1", "Specific action item 2"],
+                        "careerReadiness": "High/Medium/Developing"
                     }}
-                ],
-                "careerAdvice": ["Specific action item 1", "Specific action item 2"],
-                "careerReadiness": "High/Medium/Developing",
-                "avgScore": {sum(scores.values()) / len(scores) if scores else 0}
+                ]
             }}
             
-            Ensure the "matchReasons" are highly personalized to the input scores and interests.
+            Ensure the "matchReasons" are highly personalized to each student's scores and interests.
             """
-            
-            result = self.llm.generate_json(prompt)
-            result["analysisDate"] = datetime.utcnow().isoformat() + "Z"
+
+    def _split_packed(self, response, count):
+        """
+        Split a packed response back into per-student results
+
+        Returns:
+            list: count items, each a valid single-student result or None
+        """
+        items = [None] * count
+        if isinstance(response, Exception):
+            logger.warning(f"Packed career recommendation failed: {response}")
+            return items
+
+        entries = response.get('results') if isinstance(response, dict) else None
+        for position, entry in enumerate(entries if isinstance(entries, list) else []):
+            if not isinstance(entry, dict):
+                continue
+            index = entry.pop('index', position)
+            if not isinstance(index, int) or not 0 <= index < count or items[index] is not None:
+                continue
+            if self._is_valid_result(entry):
+                items[index] = entry
+        return items
+
+    @staticmethod
+    def _is_valid_result(result):
+        """Check that a single-student result has usable recommendations"""
+        recommendations = result.get('recommendations')
+        return (
+            isinstance(recommendations, list) and len(recommendations) > 0 and
+            all(isinstance(rec, dict) and rec.get('career') for rec in recommendations)
+        )
+
+    def _plan(self, scores, interests, skills, semester, mode):
+        """
+        Work out how to answer a request
+
+        Returns:
+            _Plan: local result (or None), LLM prompt (or None), finish
+            callback taking the LLM response or exception, and the canonical
+            profile for LLM-mode requests (these can be packed). When the
+            prompt is None the local result is final.
+        """
+        mode = (mode or self.default_mode).lower()
+        if mode not in RECOMMENDER_MODES:
+            logger.warning(f"Unknown recommender mode '{mode}', using '{self.default_mode}'")
+            mode = self.default_mode
+
+        try:
+            profile = self.canonicalizer.canonicalize(scores, interests, skills, semester)
+            self._average_score(scores)  # Non-numeric scores fail here, before any LLM call
+        except Exception as e:
+            return _Plan(self._error_result(e), None, None, None)
+
+        if mode != 'llm':
+            ensemble = self._get_ensemble()
+            if ensemble is not None:
+                try:
+                    ranked = self._rank_careers(ensemble, scores, interests, skills, semester)
+                    result = self._describe_locally(ranked, scores, interests)
+                    result["source"] = "ensemble"
+                    self._stamp(result, scores)
+                    if mode == 'fast':
+                        logger.info(f"Ensemble generated {len(ranked)} recommendations (fast)")
+                        return _Plan(result, None, None, None)
+
+                    prompt = self._enrichment_prompt(profile, [r['career'] for r in ranked])
+                    return _Plan(result, prompt, lambda response: self._apply_enrichment(result, response), None)
+                except Exception as e:
+                    logger.error(f"Ensemble recommendation failed, falling back to LLM: {e}")
+
+        logger.info(f"Generating AI career recommendations for semester {semester}")
+        return _Plan(
+            None,
+            self._llm_prompt(profile),
+            lambda response: self._finish_llm(response, scores),
+            profile
+        )
+
+    def _rank_careers(self, ensemble, scores, interests, skills, semester, k=6):
+        """Rank careers with the ensemble model"""
+        frame = self._processor.profile_to_frame(scores, interests, skills, semester)
+        features = self._processor.engineer_features(
+            frame,
+            percentile_reference=ensemble.reference_scores or None
+        )
+        return ensemble.predict_top_k(features[ensemble.feature_names], k=k)[0]
+
+    @staticmethod
+    def _average_score(scores):
+        return sum(scores.values()) / len(scores) if scores else 0
+
+    def _stamp(self, result, scores):
+        """Fill per-request fields (never part of the cached LLM payload)"""
+        result["avgScore"] = self._average_score(scores)
+        result["analysisDate"] = datetime.utcnow().isoformat() + "Z"
+        return result
+
+    def _describe_locally(self, ranked, scores, interests):
+        """Fill recommendation text fields from the static career catalog"""
+        scores = scores or {}
+        interests = [str(i) for i in (interests or [])]
+        avg = self._average_score(scores)
+        recommendations = []
+
+        for item in ranked:
+            info = get_career_info(item['career'])
+            reasons = [
+                f"Strong {subject} score ({score:.0f})"
+                for subject, score in scores.items()
+                if subject in info['subjects'] and score >= 70
+            ]
+            matched = [i for i in interests if i.lower() in info['description'].lower()]
+            if matched:
+                reasons.append(f"Matches your interest in {', '.join(matched)}")
+            if not reasons:
+                reasons.append("Predicted from profiles of students with similar scores")
+
+            recommendations.append({
+                "career": item['career'],
+                "confidence": round(item['confidence'], 3),
+                "description": info['description'],
+                "matchReasons": reasons,
+                "requirements": info['requirements'],
+                "keySkills": info['keySkills'],
+                "growthRate": info['growthRate'],
+                "avgSalary": info['avgSalary'],
+                "industries": info['industries']
+            })
+
+        advice = []
+        if scores:
+            weakest = min(scores, key=scores.get)
+            advice.append(f"Strengthen {weakest} to widen your career options")
+        if recommendations:
+            top_skills = ', '.join(recommendations[0]['keySkills'][:2])
+            advice.append(f"Build a project using {top_skills} to prepare for {recommendations[0]['career']}")
+
+        return {
+            "recommendations": recommendations,
+            "careerAdvice": advice,
+            "careerReadiness": "High" if avg >= 80 else "Medium" if avg >= 65 else "Developing"
+        }
+
+    def _enrichment_prompt(self, profile, careers):
+        """Prompt asking the LLM to describe an already-ranked career list"""
+        return f"""
+        Act as an expert Career Counselor for university students.
+        The following careers have already been selected and ranked for the student: {careers}
+        Do not add, remove or reorder careers. Describe each one for this student.
+
+        STUDENT PROFILE:
+        - Current Semester (range): {profile['semester']}
+        - Academic Performance (Subject Score Bands, out of 100): {profile['scores']}
+        - Interests: {profile['interests']}
+        - Known Skills: {profile['skills']}
+
+        OUTPUT REQUIREMENTS:
+        Return a JSON object with this exact structure:
+        {{
+            "recommendations": [
+                {{
+                    "career": "Career Name (exactly as given)",
+                    "description": "Brief description of the role",
+                    "matchReasons": ["Reason 1", "Reason 2"], // Specific to the student's profile
+                    "requirements": ["Skill 1", "Skill 2"],
+                    "keySkills": ["Tech Stack 1", "Tech Stack 2"],
+                    "growthRate": "High/Very High",
+                    "avgSalary": "$X - $Y",
+                    "industries": ["Ind 1", "Ind 2"]
+                }}
+            ],
+            "careerAdvice": ["Specific action item 1", "Specific action item 2"],
+            "careerReadiness": "High/Medium/Developing"
+        }}
+        """
+
+    def _apply_enrichment(self, result, enriched):
+        """Replace catalog text with personalized LLM text, keeping the model's ranking"""
+        if isinstance(enriched, Exception):
+            # Quota exhausted / key missing: the local result is still valid
+            logger.warning(f"LLM enrichment skipped: {enriched}")
+            return result
+
+        by_career = {
+            rec.get('career'): rec
+            for rec in enriched.get('recommendations', []) if isinstance(rec, dict)
+        }
+        text_fields = ('description', 'matchReasons', 'requirements', 'keySkills',
+                       'growthRate', 'avgSalary', 'industries')
+
+        for rec in result['recommendations']:
+            llm_rec = by_career.get(rec['career'], {})
+            for field in text_fields:
+                if llm_rec.get(field):
+                    rec[field] = llm_rec[field]
+
+        if enriched.get('careerAdvice'):
+            result['careerAdvice'] = enriched['careerAdvice']
+        if enriched.get('careerReadiness'):
+            result['careerReadiness'] = enriched['careerReadiness']
+        result["source"] = "ensemble+llm"
+
+        logger.info(f"Ensemble generated {len(result['recommendations'])} recommendations (hybrid)")
+        return result
+
+    def _llm_prompt(self, profile):
+        """
+        Prompt asking the LLM to rank and describe careers
+
+        Built from the canonical (bucketed) profile so similar students
+        share a cached LLM result.
+        """
+        return f"""
+        Act as an expert Career Counselor for university students.
+        Analyze the student's profile and recommend the top 6 most suitable career paths.
+
+        STUDENT PROFILE:
+        - Current Semester (range): {profile['semester']}
+        - Academic Performance (Subject Score Bands, out of 100): {profile['scores']}
+        - Interests: {profile['interests']}
+        - Known Skills: {profile['skills']}
+
+        OUTPUT REQUIREMENTS:
+        Return a JSON object with this exact structure:
+        {{
+            "recommendations": [
+                {{
+                    "career": "Career Name",
+                    "confidence": 0.95,  // Float between 0-1
+                    "description": "Brief description of the role",
+                    "matchReasons": ["Reason 1", "Reason 2"], // Specific to the student's profile
+                    "requirements": ["Skill 1", "Skill 2"],
+                    "keySkills": ["Tech Stack 1", "Tech Stack 2"],
+                    "growthRate": "High/Very High",
+                    "avgSalary": "$X - $Y",
+                    "industries": ["Ind 1", "Ind 2"]
+                }}
+            ],
+            "careerAdvice": ["Specific action item 1", "Specific action item 2"],
+            "careerReadiness": "High/Medium/Developing"
+        }}
+
+        Ensure the "matchReasons" are highly personalized to the input scores and interests.
+        """
+
+    def _finish_llm(self, result, scores):
+        """Turn an LLM response (or failure) into the API result"""
+        try:
+            if isinstance(result, Exception):
+                raise result
+
+            self._stamp(result, scores)
+            result["source"] = "llm"
             
             logger.info(f"AI generated {len(result.get('recommendations', []))} recommendations")
             return result
             
         except Exception as e:
             logger.error(f"Error in career recommendation: {str(e)}")
-            # Fallback to empty/error response rather than crashing
-            return {
-                "recommendations": [],
-                "careerAdvice": ["AI Service is currently unavailable. Please check API Key."],
-                "careerReadiness": "Unknown",
-                "avgScore": 0,
-                "error": str(e)
-            }
\ No newline at end of file
+            return self._error_result(e)
+
+    def _error_result(self, error):
+        """Fallback to empty/error response rather than crashing"""
+        return {
+            "recommendations": [],
+            "careerAdvice": ["AI Service is currently unavailable. Please check API Key."],
+            "careerReadiness": "Unknown",
+            "avgScore": 0,
+            "error": str(error)
+        }
@@ -5,17 +5,57 @@ Combines multiple algorithms for 70-80% accuracy
 
 import numpy as np
 import pandas as pd
+import sklearn
+from sklearn.base import BaseEstimator, ClassifierMixin, clone
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, VotingClassifier
 from sklearn.neural_network import MLPClassifier
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.metrics import classification_report, accuracy_score, confusion_matrix
+from sklearn.utils.class_weight import compute_sample_weight
+from sklearn.utils.validation import has_fit_parameter
 import joblib
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class OversamplingWeightAdapter(ClassifierMixin, BaseEstimator):
+    """
+    Sample weight support for a classifier whose fit() has none
+
+    Each training row is repeated in proportion to its weight (whole
+    copies plus one random extra copy for the fraction), so with
+    'balanced' class weights the wrapped model trains on a randomly
+    oversampled copy of its training split. Used for MLPClassifier,
+    which only accepts sample_weight from scikit-learn 1.7 on.
+    """
+
+    def __init__(self, estimator, random_state=42):
+        self.estimator = estimator
+        self.random_state = random_state
+
+    def fit(self, X, y, sample_weight=None):
+        X, y = np.asarray(X), np.asarray(y)
+        if sample_weight is not None:
+            weight = np.asarray(sample_weight, dtype=float)
+            copies = weight / weight[weight > 0].min()
+            rng = np.random.default_rng(self.random_state)
+            counts = np.floor(copies).astype(np.intp)
+            counts += rng.random(len(copies)) < copies - counts
+            rows = rng.permutation(np.repeat(np.arange(len(y)), counts))
+            X, y = X[rows], y[rows]
+        self.estimator_ = clone(self.estimator).fit(X, y)
+        self.classes_ = self.estimator_.classes_
+        return self
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+    def predict_proba(self, X):
+        return self.estimator_.predict_proba(X)
+
+
 class EnsembleCareerRecommender:
     """
     Advanced ensemble model combining multiple algorithms
@@ -26,6 +66,7 @@ class EnsembleCareerRecommender:
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
         self.feature_names = []
+        self.reference_scores = {}
         
     def create_base_models(self):
         """
@@ -123,7 +164,7 @@ class EnsembleCareerRecommender:
         
         return grid_search.best_estimator_
     
-    def train(self, X, y, use_tuning=False):
+    def train(self, X, y, use_tuning=False, class_weight=None):
         """
         Train the ensemble model
         
@@ -131,6 +172,9 @@ class EnsembleCareerRecommender:
             X: Features (pandas DataFrame or numpy array)
             y: Target labels
             use_tuning: Whether to perform hyperparameter tuning
+            class_weight: 'balanced' to weight training samples by inverse
+                class frequency (for unresampled, imbalanced data); models
+                without sample_weight support are fit on oversampled rows
         """
         logger.info("="*70)
         logger.info("ENSEMBLE MODEL TRAINING")
@@ -175,7 +219,22 @@ class EnsembleCareerRecommender:
         
         # Train ensemble
         logger.info("\nTraining ensemble model...")
-        self.ensemble_model.fit(X_train_scaled, y_train)
+        if class_weight:
+            # Weight every model through sample weights (the forest would otherwise weight twice)
+            self.ensemble_model.named_estimators['random_forest'].set_params(class_weight=None)
+            estimators = []
+            for name, model in self.ensemble_model.estimators:
+                if not has_fit_parameter(model, 'sample_weight'):
+                    logger.info(f"{name} takes no sample_weight in scikit-learn {sklearn.__version__}; "
+                                f"fitting it on a randomly oversampled copy of its training split")
+                    model = OversamplingWeightAdapter(model)
+                estimators.append((name, model))
+            self.ensemble_model.set_params(estimators=estimators)
+            sample_weight = compute_sample_weight(class_weight, y_train)
+            self.ensemble_model.fit(X_train_scaled, y_train, sample_weight=sample_weight)
+            logger.info(f"Trained with {class_weight} class weights (cross-validation below is unweighted)")
+        else:
+            self.ensemble_model.fit(X_train_scaled, y_train)
         
         # Evaluate on training set
         train_accuracy = self.ensemble_model.score(X_train_scaled, y_train)
@@ -227,6 +286,18 @@ class EnsembleCareerRecommender:
         
         return test_accuracy
     
+    def set_reference_scores(self, df, columns):
+        """
+        Store sorted training score distributions
+
+        Used at inference time to compute percentile features for a single
+        student against the training population.
+        """
+        self.reference_scores = {
+            col: np.sort(df[col].to_numpy(dtype=float))
+            for col in columns if col in df.columns
+        }
+
     def save_model(self, filepath='models/saved/ensemble_career_model.pkl'):
         """
         Save the trained ensemble model
@@ -235,7 +306,8 @@ class EnsembleCareerRecommender:
             'ensemble_model': self.ensemble_model,
             'scaler': self.scaler,
             'label_encoder': self.label_encoder,
-            'feature_names': self.feature_names
+            'feature_names': self.feature_names,
+            'reference_scores': self.reference_scores
         }
         
         joblib.dump(model_data, filepath)
@@ -250,6 +322,9 @@ class EnsembleCareerRecommender:
         self.scaler = model_data['scaler']
         self.label_encoder = model_data['label_encoder']
         self.feature_names = model_data['feature_names']
+        self.reference_scores = model_data.get('reference_scores', {})
+        if not self.reference_scores:
+            logger.warning("Model has no reference score distribution; retrain for accurate percentile features")
         
         logger.info(f"✓ Model loaded from {filepath}")
     
@@ -0,0 +1,239 @@
+"""
+Append-only Event Log for LearnMate AI
+JSON-lines segments with batched fsync, rotation and retention
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+_SEGMENT_PATTERN = re.compile(r'^events-(\d{4}-\d{2}-\d{2})\.(\d+)\.jsonl$')
+
+
+class EventLog:
+    """
+    Append-only JSON-lines event log split into daily, size-capped segments
+
+    Segments are named events-<UTC date>.<sequence>.jsonl. Every event is
+    written with a single O_APPEND write, so concurrent gunicorn workers can
+    share a segment without rewriting it. Because segment names are derived
+    from the date and size, workers that rotate at the same time agree on
+    the next segment.
+    """
+
+    def __init__(self, log_dir='logs/analytics', segment_max_bytes=8 * 1024 * 1024,
+                 fsync_every=100, fsync_interval=1.0, retention_days=90,
+                 max_total_bytes=512 * 1024 * 1024):
+        """
+        Args:
+            log_dir: Directory holding the segments
+            segment_max_bytes: Rotate to a new segment past this size
+            fsync_every: fsync after this many unsynced events
+            fsync_interval: ...or when the last fsync is older than this (seconds)
+            retention_days: Delete segments older than this many days
+            max_total_bytes: Delete the oldest segments past this total size
+        """
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.retention_days = retention_days
+        self.max_total_bytes = max_total_bytes
+
+        self._lock = threading.Lock()
+        self._fd = None
+        self._segment = None
+        self._unsynced = 0
+        self._last_sync = time.time()
+
+        os.makedirs(log_dir, exist_ok=True)
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, log_dir='logs/analytics'):
+        """Build an event log from environment variables"""
+        return cls(
+            log_dir=os.getenv('ANALYTICS_LOG_DIR', log_dir),
+            segment_max_bytes=int(os.getenv('ANALYTICS_SEGMENT_MAX_BYTES', 8 * 1024 * 1024)),
+            fsync_every=int(os.getenv('ANALYTICS_FSYNC_EVERY', 100)),
+            fsync_interval=float(os.getenv('ANALYTICS_FSYNC_INTERVAL', 1.0)),
+            retention_days=int(os.getenv('ANALYTICS_RETENTION_DAYS', 90)),
+            max_total_bytes=int(os.getenv('ANALYTICS_MAX_TOTAL_BYTES', 512 * 1024 * 1024))
+        )
+
+    def append(self, event):
+        """
+        Append one event (O(1), independent of log size)
+
+        Args:
+            event: JSON-serializable dict with an ISO 'timestamp'
+        """
+        line = (json.dumps(event, default=str) + '\n').encode('utf-8')
+        date = event.get('timestamp', '')[:10] or datetime.utcnow().date().isoformat()
+
+        with self._lock:
+            self._ensure_segment(date)
+            os.write(self._fd, line)
+            self._unsynced += 1
+
+            if os.fstat(self._fd).st_size >= self.segment_max_bytes:
+                self._rotate(date)
+            elif (self._unsynced >= self.fsync_every or
+                  time.time() - self._last_sync >= self.fsync_interval):
+                self._sync()
+
+    def append_many(self, events):
+        """
+        Append a batch of events, one write per segment run
+
+        Args:
+            events: JSON-serializable dicts with ISO 'timestamps', in order
+        """
+        runs = []  # (date, [encoded lines]) for consecutive events of one day
+        for event in events:
+            date = event.get('timestamp', '')[:10] or datetime.utcnow().date().isoformat()
+            line = (json.dumps(event, default=str) + '\n').encode('utf-8')
+            if runs and runs[-1][0] == date:
+                runs[-1][1].append(line)
+            else:
+                runs.append((date, [line]))
+
+        with self._lock:
+            for date, lines in runs:
+                self._ensure_segment(date)
+                os.write(self._fd, b''.join(lines))
+                self._unsynced += len(lines)
+                if os.fstat(self._fd).st_size >= self.segment_max_bytes:
+                    self._rotate(date)
+            if (self._fd is not None and (self._unsynced >= self.fsync_every or
+                                          time.time() - self._last_sync >= self.fsync_interval)):
+                self._sync()
+
+    def read(self, since=None):
+        """
+        Stream events in write order
+
+        Args:
+            since: Optional datetime; segments from earlier days are skipped
+                and older events in the boundary segment are filtered out
+
+        Yields:
+            dict: One event at a time
+        """
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+
+        cutoff = since.isoformat() if since else None
+        min_date = since.date().isoformat() if since else None
+
+        for date, _, path in self.segments():
+            if min_date and date < min_date:
+                continue
+            try:
+                with open(path, 'r') as f:
+                    for line in f:
+                        try:
+                            event = json.loads(line)
+                        except ValueError:
+                            continue  # Torn line from a crashed writer
+                        if cutoff and event.get('timestamp', '') <= cutoff:
+                            continue
+                        yield event
+            except FileNotFoundError:
+                continue  # Removed by retention in another worker
+
+    def import_events(self, events):
+        """Append a sequence of existing events (used for migrations)"""
+        for event in events:
+            self.append(event)
+        self.flush()
+
+    def flush(self):
+        """fsync pending writes"""
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+
+    def close(self):
+        """Flush and close the active segment"""
+        with self._lock:
+            if self._fd is not None:
+                self._sync()
+                os.close(self._fd)
+                self._fd = None
+                self._segment = None
+
+    def segments(self):
+        """List (date, sequence, path) for all segments, oldest first"""
+        segments = []
+        for name in os.listdir(self.log_dir):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                segments.append((match.group(1), int(match.group(2)),
+                                 os.path.join(self.log_dir, name)))
+        return sorted(segments)
+
+    def _segment_path(self, date, sequence):
+        return os.path.join(self.log_dir, f"events-{date}.{sequence}.jsonl")
+
+    def _ensure_segment(self, date):
+        """Open the newest segment for a date (lock held)"""
+        if self._fd is not None and self._segment[0] == date:
+            return
+        sequences = [seq for seg_date, seq, _ in self.segments() if seg_date == date]
+        self._open(date, max(sequences) if sequences else 0)
+        self._enforce_retention()
+
+    def _open(self, date, sequence):
+        """Switch the active segment (lock held)"""
+        if self._fd is not None:
+            self._sync()
+            os.close(self._fd)
+        self._fd = os.open(self._segment_path(date, sequence),
+                           os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._segment = (date, sequence)
+
+    def _rotate(self, date):
+        """Move to the next segment of the day (lock held)"""
+        self._open(date, self._segment[1] + 1)
+        self._enforce_retention()
+
+    def _sync(self):
+        """fsync the active segment (lock held)"""
+        if self._unsynced:
+            os.fsync(self._fd)
+            self._unsynced = 0
+        self._last_sync = time.time()
+
+    def _enforce_retention(self):
+        """Delete segments past the age or total size limits (lock held)"""
+        segments = self.segments()
+        oldest_date = (datetime.utcnow().date() - timedelta(days=self.retention_days)).isoformat()
+        active = self._segment_path(*self._segment) if self._segment else None
+
+        sizes = {}
+        for _, _, path in segments:
+            try:
+                sizes[path] = os.path.getsize(path)
+            except OSError:
+                sizes[path] = 0
+        total = sum(sizes.values())
+
+        for date, _, path in segments:
+            if path == active:
+                continue
+            if date < oldest_date or total > self.max_total_bytes:
+                try:
+                    os.remove(path)
+                    logger.info(f"Event log retention removed {path}")
+                except FileNotFoundError:
+                    pass
+                total -= sizes[path]
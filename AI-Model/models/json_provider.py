@@ -0,0 +1,186 @@
+"""
+JSON Serialization for LearnMate AI
+Pluggable Flask JSON providers and response compression
+"""
+
+import gzip
+import logging
+import os
+
+import numpy as np
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _default(obj):
+    """Encode NumPy values and Flask's extra types (date, UUID, dataclass, ...)"""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    elif isinstance(obj, np.floating):
+        return float(obj)
+    elif isinstance(obj, np.ndarray):
+        return obj.tolist()
+    elif isinstance(obj, np.bool_):
+        return bool(obj)
+    return DefaultJSONProvider.default(obj)
+
+
+def _finite(obj):
+    """Copy of obj with NaN and infinite floats replaced by None"""
+    if isinstance(obj, (float, np.floating)):
+        return float(obj) if np.isfinite(obj) else None
+    elif isinstance(obj, np.ndarray):
+        return _finite(obj.tolist())
+    elif isinstance(obj, dict):
+        return {key: _finite(value) for key, value in obj.items()}
+    elif isinstance(obj, (list, tuple)):
+        return [_finite(value) for value in obj]
+    return obj
+
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """
+    Standard library encoder with a NumPy-aware default hook
+
+    NaN and infinities are written as null (as orjson does) instead of
+    the NaN/Infinity tokens, which are not JSON and break JSON.parse.
+    With a payload_validator set, loads() parses through it so the
+    validator's structural limits apply to request bodies.
+    """
+
+    default = staticmethod(_default)
+    payload_validator = None  # PayloadValidator used by loads(), if any
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault('allow_nan', False)
+        try:
+            return super().dumps(obj, **kwargs)
+        except ValueError:
+            # Out-of-range float somewhere: only then pay for a sanitized copy
+            return super().dumps(_finite(obj), **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.payload_validator is not None and not kwargs:
+            return self.payload_validator.loads(s)
+        return super().loads(s, **kwargs)
+
+
+class OrjsonProvider(NumpyJSONProvider):
+    """
+    orjson encoder
+
+    Serializes NumPy scalars and arrays natively and writes the response
+    body straight from the encoded bytes. Honors sort_keys and debug
+    pretty-printing like the default provider, and dates go through
+    Flask's HTTP date format, so the parsed output matches
+    NumpyJSONProvider (float32 values are written at float32 precision).
+    """
+
+    def _options(self):
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.compact is False or (self.compact is None and self._app.debug):
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs or self.payload_validator is not None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+JSON_PROVIDERS = {
+    'stdlib': NumpyJSONProvider,
+    'orjson': OrjsonProvider
+}
+
+
+def select_json_provider(name=None):
+    """
+    Provider class from JSON_PROVIDER (orjson by default when installed)
+
+    Falls back to the standard library encoder if orjson is missing.
+    """
+    name = (name or os.getenv('JSON_PROVIDER', 'orjson')).lower()
+    if name not in JSON_PROVIDERS:
+        logger.warning(f"Unknown JSON provider '{name}', using stdlib")
+        name = 'stdlib'
+    if name == 'orjson' and orjson is None:
+        logger.warning("orjson not installed, using the stdlib JSON encoder")
+        name = 'stdlib'
+    return JSON_PROVIDERS[name]
+
+
+class ResponseCompressor:
+    """
+    after_request hook compressing large JSON responses
+
+    Bodies of at least min_size bytes are encoded with the client's
+    preferred Accept-Encoding among br (when the optional brotli package
+    is installed) and gzip.
+    Small bodies are sent as-is, where compression costs more than it saves.
+    """
+
+    def __init__(self, min_size=1024, gzip_level=6, brotli_quality=4):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.encodings = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    @classmethod
+    def from_env(cls):
+        """Build from environment variables, or None when disabled"""
+        if os.getenv('RESPONSE_COMPRESSION', 'true').lower() in ('0', 'false', 'no'):
+            return None
+        return cls(
+            min_size=int(os.getenv('COMPRESSION_MIN_BYTES', 1024)),
+            gzip_level=int(os.getenv('COMPRESSION_GZIP_LEVEL', 6)),
+            brotli_quality=int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+        )
+
+    def compress(self, response, accept_encodings):
+        """Compress a response in place if it is eligible"""
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype != 'application/json'):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        encoding = accept_encodings.best_match(self.encodings)
+        if encoding == 'br':
+            body = brotli.compress(body, quality=self.brotli_quality)
+        elif encoding == 'gzip':
+            body = gzip.compress(body, compresslevel=self.gzip_level)
+        else:
+            return response
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,107 @@
+"""
+Leaderboard Index for LearnMate AI
+Per-user running totals with ordered per-metric rankings
+"""
+
+import bisect
+import threading
+
+# Leaderboard metric -> user totals field (unknown metrics rank by activity)
+LEADERBOARD_METRICS = {
+    'score': 'average_score',
+    'quizzes': 'total_quizzes',
+    'activity': 'total_activity'
+}
+
+
+def metric_field(metric):
+    return LEADERBOARD_METRICS.get(metric, 'total_activity')
+
+
+class LeaderboardIndex:
+    """
+    In-memory leaderboard maintained on every recorded activity
+
+    Keeps running totals per user and, per metric, a sorted list of
+    (-value, user_id) keys. An update moves one user's keys with binary
+    search; top-K reads slice the list and rank lookups are a bisect.
+    """
+
+    def __init__(self):
+        self._totals = {}
+        self._orders = {field: [] for field in LEADERBOARD_METRICS.values()}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._totals)
+
+    def load(self, rows):
+        """Bulk-load user totals (dicts from a store's user_stats())"""
+        with self._lock:
+            for row in rows:
+                self._totals[row['user_id']] = {
+                    'total_quizzes': row['total_quizzes'],
+                    'percentage_sum': row['average_score'] * row['total_quizzes'],
+                    'total_activity': row['total_activity']
+                }
+            for field, order in self._orders.items():
+                order[:] = sorted(
+                    (-self._value(totals, field), user_id)
+                    for user_id, totals in self._totals.items()
+                )
+
+    @staticmethod
+    def _value(totals, field):
+        if field == 'average_score':
+            count = totals['total_quizzes']
+            return totals['percentage_sum'] / count if count else 0
+        return totals[field]
+
+    def record(self, user_id, kind, entry):
+        """Update a user's totals for one activity entry"""
+        with self._lock:
+            totals = self._totals.get(user_id)
+            if totals is None:
+                totals = {'total_quizzes': 0, 'percentage_sum': 0.0, 'total_activity': 0}
+            else:
+                self._remove(user_id, totals)
+
+            totals['total_activity'] += 1
+            if kind == 'quizzes':
+                totals['total_quizzes'] += 1
+                totals['percentage_sum'] += entry.get('percentage') or 0
+
+            self._totals[user_id] = totals
+            for field, order in self._orders.items():
+                bisect.insort(order, (-self._value(totals, field), user_id))
+
+    def _remove(self, user_id, totals):
+        """Drop a user's current keys from every order (lock held)"""
+        for field, order in self._orders.items():
+            position = bisect.bisect_left(order, (-self._value(totals, field), user_id))
+            if position < len(order) and order[position][1] == user_id:
+                del order[position]
+
+    def _row(self, user_id):
+        totals = self._totals[user_id]
+        return {
+            'user_id': user_id,
+            'average_score': self._value(totals, 'average_score'),
+            'total_quizzes': totals['total_quizzes'],
+            'total_activity': totals['total_activity']
+        }
+
+    def top(self, metric='score', limit=10, offset=0):
+        """Users ranked by a metric, one page at a time"""
+        with self._lock:
+            order = self._orders[metric_field(metric)]
+            return [self._row(user_id) for _, user_id in order[offset:offset + limit]]
+
+    def rank(self, user_id, metric='score'):
+        """1-based rank of a user (ties share the best rank), or None"""
+        with self._lock:
+            totals = self._totals.get(user_id)
+            if totals is None:
+                return None
+            order = self._orders[metric_field(metric)]
+            return bisect.bisect_left(order, (-self._value(totals, metric_field(metric)),)) + 1
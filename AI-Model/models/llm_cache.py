@@ -0,0 +1,255 @@
+"""
+LLM Response Cache for LearnMate AI
+Content-addressed caching of Gemini JSON responses
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class _RedisTier:
+    """Shared cache tier stored in Redis (same instance as the Celery broker)"""
+
+    def __init__(self, redis_url, prefix='learnmate:llm:'):
+        import redis  # Optional dependency, only needed for this tier
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, entry, ttl):
+        self.client.set(self.prefix + key, json.dumps(entry), ex=max(1, int(ttl)))
+
+    def clear(self):
+        for key in self.client.scan_iter(match=self.prefix + '*'):
+            self.client.delete(key)
+
+
+class _DiskTier:
+    """Persistent cache tier stored as one JSON file per key"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            entry = json.load(f)
+        if entry.get('expires_at', 0) < time.time():
+            os.remove(path)
+            return None
+        return entry
+
+    def set(self, key, entry, ttl):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(dict(entry, expires_at=time.time() + ttl), f)
+        os.replace(tmp_path, path)
+
+    def clear(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    os.remove(os.path.join(root, name))
+
+
+class LLMResponseCache:
+    """
+    In-process LRU + TTL cache for LLM responses with an optional
+    shared second tier (Redis or disk)
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, backend='memory',
+                 redis_url=None, cache_dir='logs/llm_cache'):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'memory_hits': 0,
+            'tier_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'writes': 0,
+            'tier_errors': 0,
+            'saved_seconds': 0.0
+        }
+        self.tier = self._create_tier(backend, redis_url, cache_dir)
+        logger.info(
+            f"LLMResponseCache initialized (max_entries={max_entries}, ttl={ttl}s, "
+            f"tier={backend if self.tier else 'memory'})"
+        )
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from environment variables, or None when disabled"""
+        if os.getenv('LLM_CACHE_ENABLED', 'true').lower() in ('0', 'false', 'no'):
+            return None
+        return cls(
+            max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', 1024)),
+            ttl=int(os.getenv('LLM_CACHE_TTL', 3600)),
+            backend=os.getenv('LLM_CACHE_BACKEND', 'memory'),
+            redis_url=os.getenv('REDIS_URL', 'redis://localhost:6379/0'),
+            cache_dir=os.getenv('LLM_CACHE_DIR', 'logs/llm_cache')
+        )
+
+    def _create_tier(self, backend, redis_url, cache_dir):
+        """Create the optional second cache tier"""
+        try:
+            if backend == 'redis':
+                return _RedisTier(redis_url)
+            if backend == 'disk':
+                return _DiskTier(cache_dir)
+        except Exception as e:
+            logger.warning(f"LLM cache tier '{backend}' unavailable, using memory only: {e}")
+        return None
+
+    @staticmethod
+    def make_key(prompt, config=None):
+        """
+        Build a content-addressed key from the prompt and model config
+
+        Whitespace is collapsed so that re-indented prompt templates map
+        to the same key.
+        """
+        normalized_prompt = re.sub(r'\s+', ' ', prompt).strip()
+        payload = json.dumps(
+            {'prompt': normalized_prompt, 'config': config or {}},
+            sort_keys=True,
+            default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, record_miss=True):
+        """
+        Look up a cached response
+
+        Args:
+            key: Key from make_key()
+            record_miss: Count a miss in the stats (disabled for polling)
+
+        Returns:
+            A deep copy of the cached value, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry['expires_at'] > now:
+                    self._entries.move_to_end(key)
+                    self._record_hit(entry, 'memory_hits')
+                    return copy.deepcopy(entry['value'])
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+        if self.tier is not None:
+            try:
+                entry = self.tier.get(key)
+            except Exception as e:
+                logger.warning(f"LLM cache tier read failed: {e}")
+                entry = None
+                with self._lock:
+                    self._stats['tier_errors'] += 1
+
+            if entry is not None:
+                with self._lock:
+                    self._store(key, entry['value'], entry.get('latency', 0.0), now)
+                    self._record_hit(entry, 'tier_hits')
+                return copy.deepcopy(entry['value'])
+
+        if record_miss:
+            with self._lock:
+                self._stats['misses'] += 1
+        return None
+
+    def set(self, key, value, latency=0.0):
+        """
+        Store a response
+
+        Args:
+            key: Key from make_key()
+            value: JSON-serializable response
+            latency: Seconds the live call took (used for savings stats)
+        """
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._store(key, value, latency, time.time())
+            self._stats['writes'] += 1
+
+        if self.tier is not None:
+            try:
+                self.tier.set(key, {'value': value, 'latency': latency}, self.ttl)
+            except Exception as e:
+                logger.warning(f"LLM cache tier write failed: {e}")
+                with self._lock:
+                    self._stats['tier_errors'] += 1
+
+    def clear(self):
+        """Drop all cached entries (stats are kept)"""
+        with self._lock:
+            self._entries.clear()
+        if self.tier is not None:
+            self.tier.clear()
+
+    def stats(self):
+        """Get hit/miss/eviction counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        stats['saved_seconds'] = round(stats['saved_seconds'], 3)
+        return stats
+
+    def _store(self, key, value, latency, now):
+        """Insert into the LRU, evicting the oldest entries (lock held)"""
+        self._entries[key] = {
+            'value': value,
+            'latency': latency,
+            'expires_at': now + self.ttl
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _record_hit(self, entry, tier_stat):
+        """Update hit counters (lock held)"""
+        self._stats['hits'] += 1
+        self._stats[tier_stat] += 1
+        self._stats['saved_seconds'] += entry.get('latency', 0.0) or 0.0
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    """Get the process-wide LLM response cache (None when disabled)"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMResponseCache.from_env() or False
+    return _shared_cache or None
@@ -1,8 +1,14 @@
 import os
+import copy
 import logging
 import json
+import time
+import asyncio
+import threading
 import google.generativeai as genai
 from dotenv import load_dotenv
+from .llm_cache import LLMResponseCache, get_shared_cache
+from .single_flight import get_shared_single_flight
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -11,21 +17,26 @@ class LLMClient:
     """
     Client for interacting with Google Gemini API
     """
-    def __init__(self):
+    MODEL_NAME = 'gemini-1.5-flash'
+    GENERATION_SETTINGS = {
+        'temperature': 0.2,
+        'top_p': 0.8,
+        'top_k': 40,
+        'response_mime_type': 'application/json'
+    }
+
+    def __init__(self, cache=None, single_flight=None):
         self.api_key = os.getenv('GEMINI_API_KEY')
+        self.cache = cache if cache is not None else get_shared_cache()
+        self.single_flight = single_flight if single_flight is not None else get_shared_single_flight()
         if not self.api_key:
             logger.warning("GEMINI_API_KEY not found in environment variables")
         else:
             genai.configure(api_key=self.api_key)
             # STABILIZATION: Lock temperature to 0.2 to prevent hallucinations and ensure consistency
             self.model = genai.GenerativeModel(
-                'gemini-1.5-flash',
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.2,
-                    top_p=0.8,
-                    top_k=40,
-                    response_mime_type='application/json'
-                ),
+                self.MODEL_NAME,
+                generation_config=genai.types.GenerationConfig(**self.GENERATION_SETTINGS),
                 safety_settings=[
                     {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
                     {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
@@ -35,14 +46,34 @@ class LLMClient:
             )
             logger.info("Gemini API Client initialized with STABLE config (Temp: 0.2)")
 
-    def generate_json(self, prompt, context=""):
-        """
-        Generate JSON response from LLM
-        """
-        if not self.api_key:
-            raise Exception("GEMINI_API_KEY is missing")
+    def cache_key(self, full_prompt):
+        """Content-addressed cache key for a prompt under the current model config"""
+        return LLMResponseCache.make_key(
+            full_prompt,
+            dict(self.GENERATION_SETTINGS, model=self.MODEL_NAME)
+        )
+
+    def get_cached_json(self, prompt, context=""):
+        """Cached response for a prompt, or None (no LLM call)"""
+        if not self.cache:
+            return None
+        return self.cache.get(self.cache_key(self.build_prompt(prompt, context)))
 
-        full_prompt = f"""
+    def set_cached_json(self, prompt, value, context="", latency=0.0):
+        """Cache a response obtained elsewhere (e.g. split from a packed prompt) under a prompt's key"""
+        if self.cache:
+            self.cache.set(self.cache_key(self.build_prompt(prompt, context)), value, latency=latency)
+
+    def get_cache_stats(self):
+        """Get response cache and request coalescing counters"""
+        stats = self.cache.stats() if self.cache else {}
+        if self.single_flight:
+            stats['single_flight'] = self.single_flight.stats()
+        return stats
+
+    def build_prompt(self, prompt, context=""):
+        """Wrap a task prompt with the strict JSON output instructions"""
+        return f"""
         {context}
         
         STRICT OUTPUT FORMAT:
@@ -52,11 +83,178 @@ class LLMClient:
         {prompt}
         """
 
+    def generate_json(self, prompt, context="", use_cache=True):
+        """
+        Generate JSON response from LLM
+
+        Identical prompts under the same model config are served from the
+        response cache instead of calling Gemini again.
+        """
+        if not self.api_key:
+            raise Exception("GEMINI_API_KEY is missing")
+
+        full_prompt = self.build_prompt(prompt, context)
+        key = self.cache_key(full_prompt)
+
+        if use_cache and self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not use_cache or not self.single_flight:
+            return self._generate_live(full_prompt, key if use_cache else None)
+
+        # Identical concurrent prompts share one in-flight Gemini call
+        check = (lambda: self.cache.get(key, record_miss=False)) if self.cache else None
+
+        def lead():
+            # A previous leader may have finished between our lookup and now
+            cached = check() if check else None
+            return cached if cached is not None else self._generate_live(full_prompt, key)
+
+        return self.single_flight.do(key, lead, check=check)
+
+    def _generate_live(self, full_prompt, cache_key=None):
+        """Call Gemini and store the parsed response in the cache"""
         try:
+            started = time.time()
             response = self.model.generate_content(full_prompt)
             # With response_mime_type='application/json', text is guaranteed to be JSON
-            return json.loads(response.text)
+            result = json.loads(response.text)
+            if cache_key and self.cache:
+                self.cache.set(cache_key, result, latency=time.time() - started)
+            return result
         except Exception as e:
             logger.error(f"LLM Generation Error: {str(e)}")
             logger.error(f"Raw Response: {response.text if 'response' in locals() else 'None'}")
             raise e
+
+
+class AsyncLLMClient(LLMClient):
+    """
+    asyncio-native Gemini client for high fan-out batch work
+
+    All calls run on one long-lived background event loop, so the SDK's
+    async gRPC channel (created once per model) is reused across batches
+    instead of being rebuilt per request. A semaphore caps in-flight calls.
+    """
+
+    def __init__(self, max_concurrency=None, timeout=None, cache=None):
+        super().__init__(cache=cache)
+        self.max_concurrency = int(max_concurrency or os.getenv('LLM_MAX_CONCURRENCY', 16))
+        self.timeout = float(timeout or os.getenv('LLM_TIMEOUT', 30))
+        self._loop = None
+        self._semaphore = None
+        self._in_flight = {}
+        self._loop_lock = threading.Lock()
+
+    def _ensure_loop(self):
+        """Start the background event loop on first use"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever,
+                    name='llm-event-loop',
+                    daemon=True
+                )
+                thread.start()
+                self._loop = loop
+                self._semaphore = asyncio.run_coroutine_threadsafe(
+                    self._create_semaphore(), loop
+                ).result()
+                logger.info(f"AsyncLLMClient loop started (max concurrency: {self.max_concurrency})")
+        return self._loop
+
+    async def _create_semaphore(self):
+        return asyncio.Semaphore(self.max_concurrency)
+
+    def run(self, coro):
+        """Run a coroutine on the client loop and block for its result"""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def agenerate_json(self, prompt, context="", use_cache=True, timeout=None):
+        """
+        Async version of generate_json
+
+        Must be awaited on the client loop (use run() or generate_json_many()).
+        """
+        if not self.api_key:
+            raise Exception("GEMINI_API_KEY is missing")
+
+        full_prompt = self.build_prompt(prompt, context)
+        key = self.cache_key(full_prompt)
+
+        if use_cache and self.cache:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if not use_cache:
+            return await self._agenerate_live(full_prompt, None, timeout)
+
+        # Identical concurrent prompts on this loop await one shared task
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._agenerate_live(full_prompt, key, timeout))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            return await asyncio.shield(task)
+        return copy.deepcopy(await asyncio.shield(task))
+
+    async def _agenerate_live(self, full_prompt, cache_key, timeout):
+        """Call Gemini asynchronously and store the parsed response in the cache"""
+        async with self._semaphore:
+            started = time.time()
+            try:
+                response = await asyncio.wait_for(
+                    self.model.generate_content_async(full_prompt),
+                    timeout=timeout or self.timeout
+                )
+                result = json.loads(response.text)
+            except Exception as e:
+                logger.error(f"Async LLM Generation Error: {type(e).__name__}: {e}")
+                raise
+
+        if cache_key and self.cache:
+            self.cache.set(cache_key, result, latency=time.time() - started)
+        return result
+
+    async def agenerate_json_many(self, prompts, context="", use_cache=True, return_exceptions=True):
+        """Run many prompts concurrently (bounded by the semaphore), preserving order"""
+        if not isinstance(use_cache, (list, tuple)):
+            use_cache = [use_cache] * len(prompts)
+        tasks = [self.agenerate_json(prompt, context, cache) for prompt, cache in zip(prompts, use_cache)]
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+
+    def generate_json_many(self, prompts, context="", use_cache=True, return_exceptions=True):
+        """
+        Generate JSON responses for many prompts concurrently
+
+        Args:
+            prompts: List of task prompts
+            use_cache: Use the response cache, for all prompts or as one
+                flag per prompt
+            return_exceptions: Return failures as Exception objects in the
+                result list instead of raising the first one
+
+        Returns:
+            list: One parsed JSON response (or Exception) per prompt, in order
+        """
+        if not prompts:
+            return []
+        return self.run(self.agenerate_json_many(prompts, context, use_cache, return_exceptions))
+
+
+_shared_async_client = None
+_shared_async_client_lock = threading.Lock()
+
+
+def get_async_llm_client():
+    """Get the process-wide AsyncLLMClient"""
+    global _shared_async_client
+    with _shared_async_client_lock:
+        if _shared_async_client is None:
+            _shared_async_client = AsyncLLMClient()
+    return _shared_async_client
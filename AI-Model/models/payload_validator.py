@@ -0,0 +1,88 @@
+"""
+Payload Validation for LearnMate AI
+Structural request limits enforced while the JSON body is parsed
+"""
+
+import json
+import os
+
+
+class PayloadValidationError(ValueError):
+    """Raised when a request body exceeds a structural limit"""
+
+
+class PayloadValidator:
+    """
+    Single-pass JSON structure limits
+
+    The decoder calls object_pairs_hook as each object closes, children
+    first, so every value is checked once by the container that holds it:
+    strings and lists by length, nested objects by the depth recorded when
+    they closed. Nothing is serialized or walked a second time, and an
+    oversized body fails as soon as the offending object has been parsed.
+    """
+
+    def __init__(self, max_depth=8, max_keys=20, max_list_len=50, max_str_len=5000):
+        """
+        Args:
+            max_depth: Maximum nesting of objects and lists
+            max_keys: Maximum keys in any object
+            max_list_len: Maximum items in any list
+            max_str_len: Maximum length of any string value
+        """
+        self.max_depth = max_depth
+        self.max_keys = max_keys
+        self.max_list_len = max_list_len
+        self.max_str_len = max_str_len
+
+    @classmethod
+    def from_env(cls):
+        """Build from PAYLOAD_* environment variables"""
+        return cls(
+            max_depth=int(os.getenv('PAYLOAD_MAX_DEPTH', 8)),
+            max_keys=int(os.getenv('PAYLOAD_MAX_KEYS', 20)),
+            max_list_len=int(os.getenv('PAYLOAD_MAX_LIST_LEN', 50)),
+            max_str_len=int(os.getenv('PAYLOAD_MAX_STR_LEN', 5000))
+        )
+
+    def loads(self, data):
+        """
+        Parse a JSON document, enforcing the limits as it is built
+
+        Raises:
+            PayloadValidationError: A limit was exceeded
+            ValueError: The document is not valid JSON
+        """
+        depths = {}  # id(dict) -> nesting depth, until its parent claims it
+
+        def value_depth(key, value):
+            if isinstance(value, str):
+                if len(value) > self.max_str_len:
+                    raise PayloadValidationError(f"Field '{key}' too long")
+                return 0
+            if isinstance(value, dict):
+                return depths.pop(id(value))
+            if isinstance(value, list):
+                if len(value) > self.max_list_len:
+                    raise PayloadValidationError(f"List '{key}' too long")
+                return 1 + max((value_depth(key, item) for item in value), default=0)
+            return 0
+
+        def object_pairs_hook(pairs):
+            if len(pairs) > self.max_keys:
+                raise PayloadValidationError("Too many fields")
+            depth = 1 + max((value_depth(key, value) for key, value in pairs), default=0)
+            if depth > self.max_depth:
+                raise PayloadValidationError("Payload nested too deeply")
+            obj = dict(pairs)
+            depths[id(obj)] = depth
+            return obj
+
+        try:
+            document = json.loads(data, object_pairs_hook=object_pairs_hook)
+        except RecursionError:
+            raise PayloadValidationError("Payload nested too deeply")
+        # Only a top-level list (or scalar) is still unchecked
+        if value_depth(None, document) > self.max_depth:
+            raise PayloadValidationError("Payload nested too deeply")
+        return document
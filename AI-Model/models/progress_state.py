@@ -0,0 +1,103 @@
+"""
+Materialized Progress State for LearnMate AI
+Per-user counters, streaks and score trend updated in O(1) per activity
+"""
+
+from datetime import date, datetime, timedelta
+
+TREND_WINDOW = 10
+RECENT_WINDOW = 5
+
+
+def new_state(created_at=None):
+    """Empty progress state"""
+    return {
+        'created_at': created_at or datetime.utcnow().isoformat(),
+        'counts': {'quizzes': 0, 'roadmaps': 0, 'career_explorations': 0},
+        'quiz': {'percentage_sum': 0.0, 'grades': {}, 'subjects': {}},
+        # Last TREND_WINDOW percentages with running regression sums (x = position)
+        'recent_scores': [],
+        'sum_y': 0.0,
+        'sum_xy': 0.0,
+        'streak': {'last_active_date': None, 'current_run': 0, 'longest': 0, 'active_days': 0}
+    }
+
+
+def apply_activity(state, kind, entry):
+    """Fold one activity entry into the state (O(1))"""
+    state['counts'][kind] = state['counts'].get(kind, 0) + 1
+    if kind != 'quizzes':
+        return state
+
+    percentage = entry.get('percentage') or 0
+    quiz = state['quiz']
+    quiz['percentage_sum'] += percentage
+    grade = entry.get('grade', 'N/A')
+    quiz['grades'][grade] = quiz['grades'].get(grade, 0) + 1
+    subject = quiz['subjects'].setdefault(entry.get('subject', 'Unknown'), [0.0, 0])
+    subject[0] += percentage
+    subject[1] += 1
+
+    _push_score(state, percentage)
+    if entry.get('timestamp'):
+        _mark_active(state['streak'], datetime.fromisoformat(entry['timestamp']).date())
+    return state
+
+
+def _push_score(state, score):
+    """Slide the score window, keeping sum(y) and sum(x*y) current"""
+    scores = state['recent_scores']
+    if len(scores) == TREND_WINDOW:
+        oldest = scores.pop(0)
+        # Remaining scores move one position left: x*y loses one y each
+        state['sum_xy'] -= state['sum_y'] - oldest
+        state['sum_y'] -= oldest
+    state['sum_xy'] += len(scores) * score
+    state['sum_y'] += score
+    scores.append(score)
+
+
+def _mark_active(streak, day):
+    """Extend the day streak (activities arrive in time order)"""
+    last = streak['last_active_date']
+    last = date.fromisoformat(last) if last else None
+    if last is not None and day <= last:
+        return
+    if last is not None and day - last == timedelta(days=1):
+        streak['current_run'] += 1
+    else:
+        streak['current_run'] = 1
+    streak['longest'] = max(streak['longest'], streak['current_run'])
+    streak['active_days'] += 1
+    streak['last_active_date'] = day.isoformat()
+
+
+def build_state(record):
+    """Rebuild the state by replaying a full JSON-format progress record"""
+    state = new_state(record.get('created_at'))
+    for kind in ('roadmaps', 'career_explorations'):
+        for entry in record.get(kind, []):
+            apply_activity(state, kind, entry)
+    for quiz in sorted(record.get('quizzes', []), key=lambda q: q.get('timestamp') or ''):
+        apply_activity(state, 'quizzes', quiz)
+    return state
+
+
+def trend_slope(state):
+    """Least-squares slope of the recent score window"""
+    n = len(state['recent_scores'])
+    sum_x = n * (n - 1) / 2
+    sum_x2 = (n - 1) * n * (2 * n - 1) / 6
+    denominator = n * sum_x2 - sum_x * sum_x
+    if denominator == 0:
+        return 0
+    return (n * state['sum_xy'] - sum_x * state['sum_y']) / denominator
+
+
+def current_streak(state, today=None):
+    """Consecutive active days ending today (0 if not active today)"""
+    streak = state['streak']
+    today = today or datetime.utcnow().date()
+    if streak['last_active_date'] != today.isoformat():
+        return 0
+    return streak['current_run']
@@ -0,0 +1,580 @@
+"""
+Progress Storage for LearnMate AI
+Storage engines behind ProgressTracker (SQLite or per-user JSON files)
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from .leaderboard import LeaderboardIndex, metric_field
+from .progress_state import apply_activity, build_state
+
+try:
+    import fcntl  # Cross-process file locks (not available on Windows)
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ACTIVITY_KINDS = ('quizzes', 'roadmaps', 'career_explorations')
+
+# Entries per kind shown in a progress report's recent activity
+RECENT_LIMITS = {'quizzes': 5, 'roadmaps': 3, 'career_explorations': 3}
+
+
+def new_user_record(user_id):
+    """Empty progress record for a user"""
+    return {
+        'user_id': user_id,
+        'quizzes': [],
+        'roadmaps': [],
+        'career_explorations': [],
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+
+class ShardedProgressStore:
+    """
+    One JSON file per user, sharded by hash prefix
+
+    Files live at <data_dir>/<sha1[:2]>/<sha1>.json, so a write touches only
+    the affected user's file. Writes hold a per-user lock (flock across
+    processes where available) around the read-modify-replace, so
+    concurrent writers for the same user do not lose updates.
+    """
+
+    def __init__(self, data_dir='logs/progress', lock_stripes=64):
+        self.data_dir = data_dir
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._leaderboard = None
+        self._leaderboard_lock = threading.Lock()
+        os.makedirs(data_dir, exist_ok=True)
+
+    @staticmethod
+    def _digest(user_id):
+        return hashlib.sha1(str(user_id).encode('utf-8')).hexdigest()
+
+    def _path(self, user_id):
+        digest = self._digest(user_id)
+        return os.path.join(self.data_dir, digest[:2], f"{digest}.json")
+
+    @contextmanager
+    def _user_lock(self, user_id):
+        """Serialize writers of one user (threads, and processes via flock)"""
+        digest = self._digest(user_id)
+        path = self._path(user_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with self._locks[int(digest[:8], 16) % len(self._locks)]:
+            if fcntl is None:
+                yield
+                return
+            with open(path + '.lock', 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def _write(self, path, record):
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(record, f)
+        os.replace(tmp_path, path)
+
+    def load_user(self, user_id):
+        """Get one user's record, or None"""
+        return self._read(self._path(user_id))
+
+    def update_user(self, user_id, update):
+        """
+        Apply update(record) to a user's record under the user's lock
+
+        Args:
+            user_id: User identifier
+            update: Function mutating the record in place
+        """
+        path = self._path(user_id)
+        with self._user_lock(user_id):
+            record = self._read(path) or new_user_record(user_id)
+            update(record)
+            self._write(path, record)
+
+    def append(self, user_id, kind, entry):
+        """Append one activity entry (kind is one of ACTIVITY_KINDS)"""
+        def add(record):
+            record.setdefault(kind, []).append(entry)
+            if 'state' in record:
+                apply_activity(record['state'], kind, entry)
+            else:
+                record['state'] = build_state(record)
+
+        self.update_user(user_id, add)
+        with self._leaderboard_lock:
+            if self._leaderboard is not None:
+                self._leaderboard.record(user_id, kind, entry)
+
+    def append_many(self, items):
+        """Append (user_id, kind, entry) items"""
+        for user_id, kind, entry in items:
+            self.append(user_id, kind, entry)
+
+    def load_state(self, user_id):
+        """Get a user's materialized progress state, or None"""
+        record = self.load_user(user_id)
+        if not record:
+            return None
+        return record.get('state') or build_state(record)
+
+    def recent_activity(self, user_id):
+        """Latest entries per kind (see RECENT_LIMITS)"""
+        record = self.load_user(user_id) or {}
+        return {kind: record.get(kind, [])[-limit:] for kind, limit in RECENT_LIMITS.items()}
+
+    def iter_users(self):
+        """Yield (user_id, record) for every stored user"""
+        for root, _, files in os.walk(self.data_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    record = self._read(os.path.join(root, name))
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Skipping unreadable progress file {name}: {e}")
+                    continue
+                if record:
+                    yield record.get('user_id'), record
+
+    def import_legacy(self, data_file):
+        """
+        Split a legacy single-file progress JSON into per-user files
+
+        Idempotent like ProgressStore.import_records: an entry is skipped
+        when the user already has one of the same kind and timestamp.
+
+        Returns:
+            int: Number of users imported
+        """
+        with open(data_file, 'r') as f:
+            progress = json.load(f)
+
+        for user_id, user_data in progress.items():
+            def merge(record, user_data=user_data):
+                for kind in ACTIVITY_KINDS:
+                    existing = record.get(kind, [])
+                    seen = {entry.get('timestamp') for entry in existing}
+                    record[kind] = [entry for entry in user_data.get(kind, [])
+                                    if entry.get('timestamp') not in seen] + existing
+                record['created_at'] = user_data.get('created_at', record['created_at'])
+                record['state'] = build_state(record)
+            self.update_user(user_id, merge)
+
+        return len(progress)
+
+    def user_stats(self, user_ids=None):
+        """
+        Per-user quiz count, average percentage and activity total
+
+        Args:
+            user_ids: Users to include (None for all)
+
+        Returns:
+            list: Dicts with user_id, average_score, total_quizzes, total_activity
+        """
+        if user_ids is None:
+            records = self.iter_users()
+        else:
+            records = ((user_id, self.load_user(user_id)) for user_id in user_ids)
+
+        stats = []
+        for user_id, record in records:
+            if not record:
+                continue
+            quizzes = record.get('quizzes', [])
+            stats.append({
+                'user_id': user_id,
+                'average_score': sum(q.get('percentage', 0) for q in quizzes) / len(quizzes) if quizzes else 0,
+                'total_quizzes': len(quizzes),
+                'total_activity': sum(len(record.get(kind, [])) for kind in ACTIVITY_KINDS)
+            })
+        return stats
+
+    def _leaderboard_index(self):
+        """
+        Leaderboard index, built with one scan on first use
+
+        The index is per process: it sees this worker's writes as they
+        happen, but other workers' writes only after a restart. Use the
+        SQLite store when several workers record progress.
+        """
+        with self._leaderboard_lock:
+            if self._leaderboard is None:
+                self._leaderboard = LeaderboardIndex()
+                self._leaderboard.load(self.user_stats())
+            return self._leaderboard
+
+    def leaderboard(self, metric='score', limit=10, offset=0):
+        """Users ranked by a metric (see LEADERBOARD_METRICS)"""
+        return self._leaderboard_index().top(metric, limit, offset)
+
+    def user_rank(self, user_id, metric='score'):
+        """
+        Returns:
+            tuple: (1-based rank or None, number of ranked users)
+        """
+        index = self._leaderboard_index()
+        return index.rank(user_id, metric), len(index)
+
+    def subject_attempts(self, subject, since=None, until=None):
+        """Quiz attempts for a subject in a time range (full scan)"""
+        attempts = []
+        for user_id, record in self.iter_users():
+            for quiz in record.get('quizzes', []):
+                timestamp = quiz.get('timestamp', '')
+                if quiz.get('subject') != subject:
+                    continue
+                if (since and timestamp < since) or (until and timestamp >= until):
+                    continue
+                attempts.append(dict(quiz, user_id=user_id))
+        return attempts
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    subject TEXT,
+    score REAL,
+    percentage REAL,
+    grade TEXT,
+    topics TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_user_time ON quiz_attempts (user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_quiz_subject_time ON quiz_attempts (subject, timestamp);
+CREATE TABLE IF NOT EXISTS roadmap_generations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    milestones_count INTEGER,
+    target_career TEXT,
+    estimated_hours REAL
+);
+CREATE INDEX IF NOT EXISTS idx_roadmap_user_time ON roadmap_generations (user_id, timestamp);
+CREATE TABLE IF NOT EXISTS career_explorations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    recommendations TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_career_user_time ON career_explorations (user_id, timestamp);
+CREATE TABLE IF NOT EXISTS user_state (
+    user_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_totals (
+    user_id TEXT PRIMARY KEY,
+    total_quizzes INTEGER NOT NULL DEFAULT 0,
+    percentage_sum REAL NOT NULL DEFAULT 0,
+    average_score REAL NOT NULL DEFAULT 0,
+    total_activity INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_totals_score ON user_totals (average_score DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_totals_quizzes ON user_totals (total_quizzes DESC, user_id);
+CREATE INDEX IF NOT EXISTS idx_totals_activity ON user_totals (total_activity DESC, user_id);
+"""
+
+# Running totals, updated in the same transaction as each activity insert
+_BUMP_TOTALS_SQL = """
+INSERT INTO user_totals (user_id, total_quizzes, percentage_sum, average_score, total_activity)
+VALUES (?, ?, ?, ?, 1)
+ON CONFLICT (user_id) DO UPDATE SET
+    total_quizzes = total_quizzes + excluded.total_quizzes,
+    percentage_sum = percentage_sum + excluded.percentage_sum,
+    average_score = CASE WHEN total_quizzes + excluded.total_quizzes > 0
+        THEN (percentage_sum + excluded.percentage_sum) / (total_quizzes + excluded.total_quizzes)
+        ELSE 0 END,
+    total_activity = total_activity + 1
+"""
+
+# kind -> (table, columns, JSON-encoded columns)
+_TABLES = {
+    'quizzes': ('quiz_attempts',
+                ('timestamp', 'subject', 'score', 'percentage', 'grade', 'topics'), ('topics',)),
+    'roadmaps': ('roadmap_generations',
+                 ('timestamp', 'milestones_count', 'target_career', 'estimated_hours'), ()),
+    'career_explorations': ('career_explorations',
+                            ('timestamp', 'recommendations'), ('recommendations',))
+}
+
+_BACKFILL_TOTALS_SQL = """
+INSERT OR REPLACE INTO user_totals (user_id, total_quizzes, percentage_sum, average_score, total_activity)
+SELECT u.user_id,
+       COALESCE(q.total_quizzes, 0),
+       COALESCE(q.percentage_sum, 0),
+       COALESCE(q.percentage_sum / q.total_quizzes, 0),
+       COALESCE(q.total_quizzes, 0)
+         + (SELECT COUNT(*) FROM roadmap_generations r WHERE r.user_id = u.user_id)
+         + (SELECT COUNT(*) FROM career_explorations c WHERE c.user_id = u.user_id)
+FROM users u
+LEFT JOIN (
+    SELECT user_id, SUM(COALESCE(percentage, 0)) AS percentage_sum, COUNT(*) AS total_quizzes
+    FROM quiz_attempts
+    GROUP BY user_id
+) q ON q.user_id = u.user_id
+"""
+
+
+class ProgressStore:
+    """
+    SQLite progress store (stdlib sqlite3, WAL mode)
+
+    One row per activity, indexed on (user_id, timestamp) and, for quiz
+    attempts, (subject, timestamp). WAL lets gunicorn workers read while
+    another worker writes; each thread uses its own connection.
+    """
+
+    def __init__(self, db_path='logs/progress.db', busy_timeout=5.0):
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+            users = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+            totals = conn.execute('SELECT COUNT(*) FROM user_totals').fetchone()[0]
+            if totals < users:
+                # Database from before the totals table existed
+                conn.execute(_BACKFILL_TOTALS_SQL)
+
+    def _connection(self):
+        """Per-thread connection (used as a transaction context manager)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _ensure_user(self, conn, user_id, created_at=None):
+        conn.execute(
+            'INSERT OR IGNORE INTO users (user_id, created_at) VALUES (?, ?)',
+            (user_id, created_at or datetime.utcnow().isoformat())
+        )
+
+    def _insert(self, conn, user_id, kind, entry):
+        table, columns, json_columns = _TABLES[kind]
+        values = [
+            json.dumps(entry.get(column)) if column in json_columns else entry.get(column)
+            for column in columns
+        ]
+        conn.execute(
+            f"INSERT INTO {table} (user_id, {', '.join(columns)}) "
+            f"VALUES (?, {', '.join('?' for _ in columns)})",
+            [user_id] + values
+        )
+        is_quiz = kind == 'quizzes'
+        percentage = (entry.get('percentage') or 0) if is_quiz else 0
+        conn.execute(_BUMP_TOTALS_SQL, (user_id, int(is_quiz), percentage, percentage))
+
+    def append(self, user_id, kind, entry):
+        """Append one activity entry (kind is one of ACTIVITY_KINDS)"""
+        self.append_many([(user_id, kind, entry)])
+
+    def append_many(self, items):
+        """Append (user_id, kind, entry) items in one transaction"""
+        with self._connection() as conn:
+            for user_id, kind, entry in items:
+                self._ensure_user(conn, user_id)
+                self._insert(conn, user_id, kind, entry)
+                # The first insert took the write lock, so this read-modify-write is atomic
+                state = self._read_state(conn, user_id)
+                if state is None:
+                    state = build_state(self._load_record(conn, user_id))
+                else:
+                    apply_activity(state, kind, entry)
+                self._write_state(conn, user_id, state)
+
+    def _read_state(self, conn, user_id):
+        row = conn.execute('SELECT state FROM user_state WHERE user_id = ?', (user_id,)).fetchone()
+        return json.loads(row['state']) if row else None
+
+    def _write_state(self, conn, user_id, state):
+        conn.execute(
+            'INSERT OR REPLACE INTO user_state (user_id, state) VALUES (?, ?)',
+            (user_id, json.dumps(state))
+        )
+
+    def _rows(self, conn, kind, where, params):
+        table, columns, json_columns = _TABLES[kind]
+        rows = conn.execute(
+            f"SELECT user_id, {', '.join(columns)} FROM {table} WHERE {where} ORDER BY timestamp, id",
+            params
+        ).fetchall()
+        entries = []
+        for row in rows:
+            entry = {column: row[column] for column in ('user_id',) + columns}
+            for column in json_columns:
+                entry[column] = json.loads(entry[column]) if entry[column] is not None else None
+            entries.append(entry)
+        return entries
+
+    def load_user(self, user_id):
+        """Get one user's record (indexed by user_id), or None"""
+        return self._load_record(self._connection(), user_id)
+
+    def _load_record(self, conn, user_id):
+        user = conn.execute('SELECT created_at FROM users WHERE user_id = ?', (user_id,)).fetchone()
+        if user is None:
+            return None
+
+        record = {'user_id': user_id, 'created_at': user['created_at']}
+        for kind in ACTIVITY_KINDS:
+            entries = self._rows(conn, kind, 'user_id = ?', (user_id,))
+            for entry in entries:
+                del entry['user_id']
+            record[kind] = entries
+        return record
+
+    def load_state(self, user_id):
+        """Get a user's materialized progress state, or None"""
+        with self._connection() as conn:
+            state = self._read_state(conn, user_id)
+            if state is None:
+                # Users imported or recorded before state was materialized
+                record = self._load_record(conn, user_id)
+                if record is None:
+                    return None
+                state = build_state(record)
+                self._write_state(conn, user_id, state)
+            return state
+
+    def recent_activity(self, user_id):
+        """Latest entries per kind (see RECENT_LIMITS), oldest first"""
+        conn = self._connection()
+        recent = {}
+        for kind, limit in RECENT_LIMITS.items():
+            table, columns, json_columns = _TABLES[kind]
+            rows = conn.execute(
+                f"SELECT {', '.join(columns)} FROM {table} WHERE user_id = ? "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (user_id, limit)
+            ).fetchall()
+            entries = []
+            for row in reversed(rows):
+                entry = dict(row)
+                for column in json_columns:
+                    entry[column] = json.loads(entry[column]) if entry[column] is not None else None
+                entries.append(entry)
+            recent[kind] = entries
+        return recent
+
+    def user_stats(self, user_ids=None):
+        """Per-user quiz count, average percentage and activity total (running totals)"""
+        conn = self._connection()
+        sql = 'SELECT user_id, average_score, total_quizzes, total_activity FROM user_totals'
+        if user_ids is None:
+            return [dict(row) for row in conn.execute(sql)]
+
+        user_ids = list(user_ids)
+        if not user_ids:
+            return []
+        placeholders = ', '.join('?' for _ in user_ids)
+        return [dict(row) for row in conn.execute(f'{sql} WHERE user_id IN ({placeholders})', user_ids)]
+
+    def leaderboard(self, metric='score', limit=10, offset=0):
+        """Users ranked by a metric (walks the metric's index, no full scan)"""
+        field = metric_field(metric)
+        rows = self._connection().execute(
+            'SELECT user_id, average_score, total_quizzes, total_activity FROM user_totals '
+            f'ORDER BY {field} DESC, user_id LIMIT ? OFFSET ?',
+            (limit, offset)
+        )
+        return [dict(row) for row in rows]
+
+    def user_rank(self, user_id, metric='score'):
+        """
+        Returns:
+            tuple: (1-based rank or None, number of ranked users)
+        """
+        field = metric_field(metric)
+        conn = self._connection()
+        total = conn.execute('SELECT COUNT(*) FROM user_totals').fetchone()[0]
+        row = conn.execute(f'SELECT {field} FROM user_totals WHERE user_id = ?', (user_id,)).fetchone()
+        if row is None:
+            return None, total
+        better = conn.execute(
+            f'SELECT COUNT(*) FROM user_totals WHERE {field} > ?', (row[0],)
+        ).fetchone()[0]
+        return better + 1, total
+
+    def subject_attempts(self, subject, since=None, until=None):
+        """Quiz attempts for a subject in a time range (indexed on subject, timestamp)"""
+        where, params = 'subject = ?', [subject]
+        if since:
+            where += ' AND timestamp >= ?'
+            params.append(since)
+        if until:
+            where += ' AND timestamp < ?'
+            params.append(until)
+        return self._rows(self._connection(), 'quizzes', where, params)
+
+    def import_records(self, records):
+        """
+        Import (user_id, record) pairs in the JSON progress format
+
+        Idempotent: an entry is skipped when the user already has one of
+        the same kind with the same timestamp, so re-running a migration
+        (or one interrupted before its source was renamed) adds nothing.
+
+        Returns:
+            int: Number of users imported
+        """
+        count = 0
+        with self._connection() as conn:
+            for user_id, record in records:
+                self._ensure_user(conn, user_id, record.get('created_at'))
+                for kind in ACTIVITY_KINDS:
+                    table = _TABLES[kind][0]
+                    for entry in record.get(kind, []):
+                        exists = conn.execute(
+                            f'SELECT 1 FROM {table} WHERE user_id = ? AND timestamp = ? LIMIT 1',
+                            (user_id, entry.get('timestamp'))
+                        ).fetchone()
+                        if not exists:
+                            self._insert(conn, user_id, kind, entry)
+                # Rebuilt from the full history on next read
+                conn.execute('DELETE FROM user_state WHERE user_id = ?', (user_id,))
+                count += 1
+        return count
+
+    def import_legacy(self, data_file):
+        """Import a legacy single-file progress JSON"""
+        with open(data_file, 'r') as f:
+            progress = json.load(f)
+        return self.import_records(progress.items())
+
+
+def create_progress_store():
+    """Create the progress store selected by PROGRESS_BACKEND (sqlite or sharded)"""
+    if os.getenv('PROGRESS_BACKEND', 'sqlite') == 'sharded':
+        return ShardedProgressStore(os.getenv('PROGRESS_DATA_DIR', 'logs/progress'))
+    return ProgressStore(os.getenv('PROGRESS_DB_PATH', 'logs/progress.db'))
@@ -3,30 +3,103 @@ Progress Tracker for LearnMate AI
 Track student learning progress over time
 """
 
-import json
 import os
 from datetime import datetime, timedelta
 from collections import defaultdict
 import logging
 
+from .progress_state import RECENT_WINDOW, current_streak, trend_slope
+from .progress_store import create_progress_store
+from .write_behind import WriteBehindQueue
+
 logger = logging.getLogger(__name__)
 
 
+def _process_alive(pid):
+    """Whether a process exists (assumed alive where it cannot be checked)"""
+    if os.name != 'posix':
+        return True  # os.kill would terminate it on Windows
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
 class ProgressTracker:
     """
     Track and analyze student learning progress over time
     """
     
-    def __init__(self, data_file='logs/progress_data.json'):
+    def __init__(self, data_file='logs/progress_data.json', store=None):
+        """
+        Args:
+            data_file: Legacy single-file progress JSON, imported once
+            store: ProgressStore / ShardedProgressStore (default from PROGRESS_BACKEND)
+        """
         self.data_file = data_file
+        self.store = store or create_progress_store()
+        # Batches store writes on a background thread (None: write inline)
+        self.write_queue = WriteBehindQueue.from_env('progress', self.store.append_many)
         self.ensure_data_file()
     
     def ensure_data_file(self):
-        """Ensure progress data file exists"""
-        os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
-        if not os.path.exists(self.data_file):
-            with open(self.data_file, 'w') as f:
-                json.dump({}, f)
+        """
+        Import a legacy single-file progress JSON into the store (once)
+        
+        Each worker process runs this at startup. The file is first renamed
+        to a claim path unique to this process, which only one process can
+        do, and imported from there; the others find no file and skip the
+        import. A claim left behind by a process that died mid-import is
+        taken over on the next start; the stores skip entries a user
+        already has, so importing it again adds nothing.
+        """
+        claim_file = f"{self.data_file}.importing.{os.getpid()}"
+        try:
+            os.replace(self.data_file, claim_file)
+        except FileNotFoundError:
+            if not self._claim_abandoned_import(claim_file):
+                return
+        try:
+            users = self.store.import_legacy(claim_file)
+            os.replace(claim_file, self.data_file + '.migrated')
+            logger.info(f"Imported progress for {users} users from {self.data_file}")
+        except Exception as e:
+            logger.error(f"Error importing legacy progress data {claim_file}: {e}")
+    
+    def _claim_abandoned_import(self, claim_file):
+        """Take over the claim of an importing process that no longer runs"""
+        prefix = f"{os.path.basename(self.data_file)}.importing."
+        directory = os.path.dirname(self.data_file) or '.'
+        try:
+            names = os.listdir(directory)
+        except FileNotFoundError:
+            return False
+        for name in names:
+            pid = name[len(prefix):]
+            if not name.startswith(prefix) or not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            try:
+                os.replace(os.path.join(directory, name), claim_file)
+            except FileNotFoundError:
+                continue  # Taken over by another process
+            logger.warning(f"Resuming legacy progress import abandoned by process {pid}")
+            return True
+        return False
+    
+    def _record(self, user_id, kind, entry):
+        """Queue an activity entry for the store (or write it inline)"""
+        if self.write_queue is not None:
+            self.write_queue.submit((user_id, kind, entry))
+        else:
+            self.store.append(user_id, kind, entry)
+    
+    def _sync(self):
+        """Write queued activity before reading, so reports include it"""
+        if self.write_queue is not None:
+            self.write_queue.flush()
     
     def record_quiz_attempt(self, user_id, quiz_data):
         """
@@ -37,21 +110,7 @@ class ProgressTracker:
             quiz_data: Quiz result data
         """
         try:
-            # Read existing progress
-            with open(self.data_file, 'r') as f:
-                progress = json.load(f)
-            
-            # Initialize user if not exists
-            if user_id not in progress:
-                progress[user_id] = {
-                    'quizzes': [],
-                    'roadmaps': [],
-                    'career_explorations': [],
-                    'created_at': datetime.utcnow().isoformat()
-                }
-            
-            # Add quiz attempt
-            progress[user_id]['quizzes'].append({
+            self._record(user_id, 'quizzes', {
                 'timestamp': datetime.utcnow().isoformat(),
                 'subject': quiz_data.get('subject'),
                 'score': quiz_data.get('score'),
@@ -60,10 +119,6 @@ class ProgressTracker:
                 'topics': quiz_data.get('topicPerformance', {})
             })
             
-            # Write back
-            with open(self.data_file, 'w') as f:
-                json.dump(progress, f)
-            
             logger.info(f"Recorded quiz attempt for user {user_id}")
             
         except Exception as e:
@@ -72,52 +127,24 @@ class ProgressTracker:
     def record_roadmap_generation(self, user_id, roadmap_data):
         """Record roadmap generation for tracking"""
         try:
-            with open(self.data_file, 'r') as f:
-                progress = json.load(f)
-            
-            if user_id not in progress:
-                progress[user_id] = {
-                    'quizzes': [],
-                    'roadmaps': [],
-                    'career_explorations': [],
-                    'created_at': datetime.utcnow().isoformat()
-                }
-            
-            progress[user_id]['roadmaps'].append({
+            self._record(user_id, 'roadmaps', {
                 'timestamp': datetime.utcnow().isoformat(),
                 'milestones_count': len(roadmap_data.get('roadmap', [])),
                 'target_career': roadmap_data.get('targetCareer'),
                 'estimated_hours': roadmap_data.get('statistics', {}).get('estimatedTotalHours')
             })
             
-            with open(self.data_file, 'w') as f:
-                json.dump(progress, f)
-            
         except Exception as e:
             logger.error(f"Error recording roadmap: {e}")
     
     def record_career_exploration(self, user_id, career_data):
         """Record career exploration activity"""
         try:
-            with open(self.data_file, 'r') as f:
-                progress = json.load(f)
-            
-            if user_id not in progress:
-                progress[user_id] = {
-                    'quizzes': [],
-                    'roadmaps': [],
-                    'career_explorations': [],
-                    'created_at': datetime.utcnow().isoformat()
-                }
-            
-            progress[user_id]['career_explorations'].append({
+            self._record(user_id, 'career_explorations', {
                 'timestamp': datetime.utcnow().isoformat(),
                 'recommendations': [r.get('career') for r in career_data.get('recommendations', [])[:3]]
             })
             
-            with open(self.data_file, 'w') as f:
-                json.dump(progress, f)
-            
         except Exception as e:
             logger.error(f"Error recording career exploration: {e}")
     
@@ -125,52 +152,39 @@ class ProgressTracker:
         """
         Get comprehensive progress report for a user
         
+        Reads the user's materialized progress state (see progress_state),
+        plus the few latest activities for the recent activity list.
+        
         Returns:
             dict: Progress report with analytics
         """
         try:
-            with open(self.data_file, 'r') as f:
-                progress = json.load(f)
+            self._sync()
             
-            user_data = progress.get(user_id)
+            state = self.store.load_state(user_id)
             
-            if not user_data:
+            if not state:
                 return {
                     'user_id': user_id,
                     'status': 'no_data',
                     'message': 'No progress data found for this user'
                 }
             
-            # Analyze quiz progress
-            quiz_analysis = self._analyze_quiz_progress(user_data.get('quizzes', []))
-            
-            # Analyze learning trends
-            trends = self._calculate_trends(user_data.get('quizzes', []))
-            
-            # Calculate streaks
-            streaks = self._calculate_streaks(user_data)
-            
-            # Overall stats
-            total_quizzes = len(user_data.get('quizzes', []))
-            total_roadmaps = len(user_data.get('roadmaps', []))
-            total_career_explorations = len(user_data.get('career_explorations', []))
-            
-            # Calculate engagement level
-            engagement = self._calculate_engagement(user_data)
+            counts = state['counts']
             
             return {
                 'user_id': user_id,
-                'member_since': user_data.get('created_at'),
+                'member_since': state.get('created_at'),
                 'overall_stats': {
-                    'total_quizzes': total_quizzes,
-                    'total_roadmaps': total_roadmaps,
-                    'career_explorations': total_career_explorations,
-                    'engagement_level': engagement
+                    'total_quizzes': counts['quizzes'],
+                    'total_roadmaps': counts['roadmaps'],
+                    'career_explorations': counts['career_explorations'],
+                    'engagement_level': self._calculate_engagement(state)
                 },
-                'quiz_progress': quiz_analysis,
-                'learning_trends': trends,
-                'streaks': streaks,
-                'recent_activity': self._get_recent_activity(user_data),
+                'quiz_progress': self._analyze_quiz_progress(state),
+                'learning_trends': self._calculate_trends(state),
+                'streaks': self._calculate_streaks(state),
+                'recent_activity': self._get_recent_activity(self.store.recent_activity(user_id)),
                 'generated_at': datetime.utcnow().isoformat()
             }
             
@@ -182,67 +196,43 @@ class ProgressTracker:
                 'error': str(e)
             }
     
-    def _analyze_quiz_progress(self, quizzes):
+    def _analyze_quiz_progress(self, state):
         """Analyze quiz performance over time"""
-        if not quizzes:
+        count = state['counts']['quizzes']
+        if not count:
             return {'count': 0}
         
-        # Calculate averages
-        total_percentage = sum(q.get('percentage', 0) for q in quizzes)
-        avg_percentage = total_percentage / len(quizzes)
-        
-        # Grade distribution
-        grades = defaultdict(int)
-        for quiz in quizzes:
-            grades[quiz.get('grade', 'N/A')] += 1
-        
-        # Subject performance
-        subject_performance = defaultdict(list)
-        for quiz in quizzes:
-            subject = quiz.get('subject', 'Unknown')
-            subject_performance[subject].append(quiz.get('percentage', 0))
+        quiz = state['quiz']
+        avg_percentage = quiz['percentage_sum'] / count
         
         subject_avgs = {
-            subject: round(sum(scores) / len(scores), 1)
-            for subject, scores in subject_performance.items()
+            subject: round(total / attempts, 1)
+            for subject, (total, attempts) in quiz['subjects'].items()
         }
         
         # Recent vs overall comparison
-        recent_quizzes = quizzes[-5:] if len(quizzes) >= 5 else quizzes
-        recent_avg = sum(q.get('percentage', 0) for q in recent_quizzes) / len(recent_quizzes)
+        recent_scores = state['recent_scores'][-RECENT_WINDOW:]
+        recent_avg = sum(recent_scores) / len(recent_scores)
         
         improvement = round(recent_avg - avg_percentage, 1)
         
         return {
-            'total_quizzes': len(quizzes),
+            'total_quizzes': count,
             'average_score': round(avg_percentage, 1),
             'recent_average': round(recent_avg, 1),
             'improvement': improvement,
-            'grade_distribution': dict(grades),
+            'grade_distribution': dict(quiz['grades']),
             'subject_performance': subject_avgs,
             'strongest_subject': max(subject_avgs, key=subject_avgs.get) if subject_avgs else None,
             'weakest_subject': min(subject_avgs, key=subject_avgs.get) if subject_avgs else None
         }
     
-    def _calculate_trends(self, quizzes):
-        """Calculate learning trends"""
-        if len(quizzes) < 3:
+    def _calculate_trends(self, state):
+        """Calculate learning trends from the running regression sums"""
+        if state['counts']['quizzes'] < 3:
             return {'trend': 'insufficient_data'}
         
-        # Get last 10 quizzes or all if less
-        recent = quizzes[-10:]
-        scores = [q.get('percentage', 0) for q in recent]
-        
-        # Calculate trend using simple linear regression
-        x = list(range(len(scores)))
-        n = len(scores)
-        
-        sum_x = sum(x)
-        sum_y = sum(scores)
-        sum_xy = sum(xi * yi for xi, yi in zip(x, scores))
-        sum_x2 = sum(xi * xi for xi in x)
-        
-        slope = (n * sum_xy - sum_x * sum_y) / (n * sum_x2 - sum_x * sum_x) if (n * sum_x2 - sum_x * sum_x) != 0 else 0
+        slope = trend_slope(state)
         
         if slope > 2:
             trend = 'improving'
@@ -254,63 +244,25 @@ class ProgressTracker:
         return {
             'trend': trend,
             'slope': round(slope, 2),
-            'recent_scores': scores
+            'recent_scores': list(state['recent_scores'])
         }
     
-    def _calculate_streaks(self, user_data):
+    def _calculate_streaks(self, state):
         """Calculate learning streaks"""
-        quizzes = user_data.get('quizzes', [])
-        
-        if not quizzes:
+        if not state['counts']['quizzes']:
             return {'current_streak': 0}
         
-        # Sort by timestamp
-        sorted_quizzes = sorted(quizzes, key=lambda x: x.get('timestamp', ''))
-        
-        # Calculate daily streak
-        dates = set()
-        for quiz in sorted_quizzes:
-            timestamp = quiz.get('timestamp', '')
-            if timestamp:
-                date = datetime.fromisoformat(timestamp).date()
-                dates.add(date)
-        
-        # Current streak
-        current_streak = 0
-        today = datetime.utcnow().date()
-        
-        for i in range(365):  # Check up to 365 days
-            check_date = today - timedelta(days=i)
-            if check_date in dates:
-                current_streak += 1
-            else:
-                break
-        
-        # Longest streak
-        sorted_dates = sorted(dates)
-        longest_streak = 1
-        current = 1
-        
-        for i in range(1, len(sorted_dates)):
-            if (sorted_dates[i] - sorted_dates[i-1]).days == 1:
-                current += 1
-                longest_streak = max(longest_streak, current)
-            else:
-                current = 1
+        streak = state['streak']
         
         return {
-            'current_streak': current_streak,
-            'longest_streak': longest_streak,
-            'total_active_days': len(dates)
+            'current_streak': current_streak(state),
+            'longest_streak': max(streak['longest'], 1),
+            'total_active_days': streak['active_days']
         }
     
-    def _calculate_engagement(self, user_data):
+    def _calculate_engagement(self, state):
         """Calculate engagement level"""
-        total_activities = (
-            len(user_data.get('quizzes', [])) +
-            len(user_data.get('roadmaps', [])) +
-            len(user_data.get('career_explorations', []))
-        )
+        total_activities = sum(state['counts'].values())
         
         if total_activities >= 50:
             return 'very_high'
@@ -324,7 +276,7 @@ class ProgressTracker:
             return 'very_low'
     
     def _get_recent_activity(self, user_data):
-        """Get recent activity summary"""
+        """Get recent activity summary (user_data holds the latest entries per kind)"""
         # Combine all activities
         activities = []
         
@@ -366,25 +318,17 @@ class ProgressTracker:
             dict: Comparison data
         """
         try:
-            with open(self.data_file, 'r') as f:
-                progress = json.load(f)
+            self._sync()
             
             comparison = {}
+            stats = {row['user_id']: row for row in self.store.user_stats(user_ids)}
             
             for user_id in user_ids:
-                user_data = progress.get(user_id)
-                if user_data:
-                    quizzes = user_data.get('quizzes', [])
-                    avg_score = sum(q.get('percentage', 0) for q in quizzes) / len(quizzes) if quizzes else 0
-                    
+                if user_id in stats:
                     comparison[user_id] = {
-                        'total_quizzes': len(quizzes),
-                        'average_score': round(avg_score, 1),
-                        'total_activities': (
-                            len(quizzes) +
-                            len(user_data.get('roadmaps', [])) +
-                            len(user_data.get('career_explorations', []))
-                        )
+                        'total_quizzes': stats[user_id]['total_quizzes'],
+                        'average_score': round(stats[user_id]['average_score'], 1),
+                        'total_activities': stats[user_id]['total_activity']
                     }
             
             # Calculate rankings
@@ -404,51 +348,105 @@ class ProgressTracker:
             logger.error(f"Error comparing users: {e}")
             return {'error': str(e)}
     
-    def get_leaderboard(self, limit=10, metric='score'):
+    def get_leaderboard(self, limit=10, metric='score', offset=0):
         """
         Get leaderboard based on different metrics
         
+        Served from the store's leaderboard index, so a page costs
+        O(limit) index reads instead of ranking every user. With
+        PROGRESS_BACKEND=sharded the index is kept per worker process:
+        it misses other workers' writes until restarted, so pages can be
+        stale when several workers record progress.
+        
         Args:
             limit: Number of users to return
             metric: 'score', 'quizzes', or 'activity'
+            offset: Number of top users to skip (pagination)
         
         Returns:
             list: Top users
         """
         try:
-            with open(self.data_file, 'r') as f:
-                progress = json.load(f)
+            self._sync()
+            
+            return [
+                {
+                    'user_id': row['user_id'],
+                    'average_score': round(row['average_score'], 1),
+                    'total_quizzes': row['total_quizzes'],
+                    'total_activity': row['total_activity']
+                }
+                for row in self.store.leaderboard(metric, limit, offset)
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error getting leaderboard: {e}")
+            return []
+    
+    def get_user_rank(self, user_id, metric='score'):
+        """
+        Get a user's leaderboard position
+        
+        Like get_leaderboard, ranks from the sharded backend come from a
+        per-process index and can be stale across workers.
+        
+        Args:
+            user_id: User identifier
+            metric: 'score', 'quizzes', or 'activity'
+        
+        Returns:
+            dict: Rank (1-based, None if the user has no activity) and total users
+        """
+        try:
+            self._sync()
             
-            user_stats = []
+            rank, total_users = self.store.user_rank(user_id, metric)
+            return {
+                'user_id': user_id,
+                'metric': metric,
+                'rank': rank,
+                'total_users': total_users
+            }
             
-            for user_id, user_data in progress.items():
-                quizzes = user_data.get('quizzes', [])
-                avg_score = sum(q.get('percentage', 0) for q in quizzes) / len(quizzes) if quizzes else 0
-                
-                user_stats.append({
-                    'user_id': user_id,
-                    'average_score': round(avg_score, 1),
-                    'total_quizzes': len(quizzes),
-                    'total_activity': (
-                        len(quizzes) +
-                        len(user_data.get('roadmaps', [])) +
-                        len(user_data.get('career_explorations', []))
-                    )
-                })
+        except Exception as e:
+            logger.error(f"Error getting user rank: {e}")
+            return {'user_id': user_id, 'error': str(e)}
+    
+    def get_subject_progress(self, subject, days=30):
+        """
+        Summarize quiz attempts for a subject over the last N days
+        
+        Args:
+            subject: Quiz subject
+            days: Time window
+        
+        Returns:
+            dict: Attempts, unique users, average score and grades
+        """
+        try:
+            self._sync()
+            
+            since = (datetime.utcnow() - timedelta(days=days)).isoformat()
+            attempts = self.store.subject_attempts(subject, since=since)
             
-            # Sort based on metric
-            if metric == 'score':
-                user_stats.sort(key=lambda x: x['average_score'], reverse=True)
-            elif metric == 'quizzes':
-                user_stats.sort(key=lambda x: x['total_quizzes'], reverse=True)
-            else:  # activity
-                user_stats.sort(key=lambda x: x['total_activity'], reverse=True)
+            grades = defaultdict(int)
+            for attempt in attempts:
+                grades[attempt.get('grade') or 'N/A'] += 1
             
-            return user_stats[:limit]
+            total_percentage = sum(a.get('percentage') or 0 for a in attempts)
+            
+            return {
+                'subject': subject,
+                'period_days': days,
+                'attempts': len(attempts),
+                'unique_users': len({a['user_id'] for a in attempts}),
+                'average_score': round(total_percentage / len(attempts), 1) if attempts else 0,
+                'grade_distribution': dict(grades)
+            }
             
         except Exception as e:
-            logger.error(f"Error getting leaderboard: {e}")
-            return []
+            logger.error(f"Error getting subject progress: {e}")
+            return {'subject': subject, 'error': str(e)}
 
 
 # Global progress tracker instance
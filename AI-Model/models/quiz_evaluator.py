@@ -1,22 +1,14 @@
 import numpy as np
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import re
 import logging
 from collections import defaultdict
 
-logger = logging.getLogger(__name__)
-
+from .reference_index import pairwise_similarities
 
-def convert_to_json_serializable(obj):
-    """Convert NumPy types to Python native types"""
-    if isinstance(obj, np.bool_):
-        return bool(obj)
-    elif isinstance(obj, (np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64)):
-        return int(obj)
-    elif isinstance(obj, (np.float_, np.float16, np.float32, np.float64)):
-        return float(obj)
-    return obj
+logger = logging.getLogger(__name__)
 
 
 class QuizEvaluator:
@@ -24,8 +16,10 @@ class QuizEvaluator:
     Advanced Quiz Evaluator with NLP-based subjective answer evaluation
     """
     
-    def __init__(self, similarity_threshold=0.7):
+    def __init__(self, similarity_threshold=0.7, reference_index=None):
         self.similarity_threshold = similarity_threshold
+        # Optional ReferenceAnswerIndex with pre-vectorized bank answers
+        self.reference_index = reference_index
         self.vectorizer = TfidfVectorizer(
             ngram_range=(1, 2),
             stop_words='english',
@@ -138,85 +132,237 @@ class QuizEvaluator:
     def evaluate(self, answers, correct_answers, subject="General"):
         """Main evaluation function"""
         try:
-            correct_lookup = {ca['questionId']: ca for ca in correct_answers}
+            return self.evaluate_batch([{
+                'answers': answers,
+                'correctAnswers': correct_answers,
+                'subject': subject
+            }])[0]
+        except Exception as e:
+            logger.error(f"Error in quiz evaluation: {str(e)}")
+            raise
+
+    def evaluate_batch(self, submissions, return_exceptions=False):
+        """
+        Evaluate many quiz submissions in one vectorized pass
+
+        All subjective answers that need NLP grading (across every
+        submission) are counted in one pass together with their reference
+        answers, and the paired cosine similarities are computed at once
+        instead of refitting a vectorizer per answer. Every pair keeps its
+        own weighting, so a submission grades the same alone or batched.
+
+        Args:
+            submissions: List of dicts with 'answers', 'correctAnswers'
+                and optional 'subject'
+            return_exceptions: Put an Exception in the result list for a
+                malformed submission instead of raising
+
+        Returns:
+            list: One evaluate()-shaped result per submission, in order
+        """
+        graded = []
+        pending = []  # (submission index, item index, user text, reference text)
+
+        for sub_idx, submission in enumerate(submissions):
+            try:
+                items = self._prepare_items(
+                    submission.get('answers', []),
+                    submission.get('correctAnswers', [])
+                )
+            except Exception as e:
+                if not return_exceptions:
+                    raise
+                logger.error(f"Error in quiz evaluation: {str(e)}")
+                graded.append(e)
+                continue
+
+            for item_idx, item in enumerate(items):
+                if item.pop('pending', None):
+                    pending.append((sub_idx, item_idx, item.pop('user_text'), item.pop('reference_text')))
+            graded.append(items)
+
+        if pending:
+            similarities = self._pending_similarities(
+                [p[2] for p in pending],
+                [p[3] for p in pending]
+            )
+            scores = np.select(
+                [similarities >= 0.9, similarities >= 0.7, similarities >= 0.5, similarities >= 0.3],
+                [1.0, 0.8, 0.6, 0.3],
+                default=0.0
+            )
+            for (sub_idx, item_idx, _, _), similarity, score in zip(pending, similarities, scores):
+                item = graded[sub_idx][item_idx]
+                item['is_correct'] = similarity >= self.similarity_threshold
+                item['score'] = score
+                item['similarity'] = similarity
+
+        results = []
+        for submission, items in zip(submissions, graded):
+            if isinstance(items, Exception):
+                results.append(items)
+            else:
+                results.append(self._build_result(items, len(submission.get('answers', [])),
+                                                  submission.get('subject', 'General')))
+        return results
+
+    def _prepare_items(self, answers, correct_answers):
+        """
+        Grade MCQ and trivial subjective answers; mark the rest as pending
+
+        Returns:
+            list: One dict per gradable answer
+        """
+        correct_lookup = {ca['questionId']: ca for ca in correct_answers}
+        items = []
+
+        for user_ans in answers:
+            q_id = user_ans.get('questionId')
+            user_answer = user_ans.get('answer', '')
+            q_type = user_ans.get('type', 'mcq')
             
-            total_score = 0.0
-            max_score = len(answers)
-            topic_performance = defaultdict(lambda: [0, 0])
-            detailed_results = []
-            weak_topics = []
+            if q_id not in correct_lookup:
+                logger.warning(f"Question {q_id} not found")
+                continue
             
-            for user_ans in answers:
-                q_id = user_ans.get('questionId')
-                user_answer = user_ans.get('answer', '')
-                q_type = user_ans.get('type', 'mcq')
-                
-                if q_id not in correct_lookup:
-                    logger.warning(f"Question {q_id} not found")
-                    continue
-                
-                correct_data = correct_lookup[q_id]
-                correct_answer = correct_data.get('answer', '')
-                topic = correct_data.get('topic', 'General')
+            correct_data = correct_lookup[q_id]
+            correct_answer = correct_data.get('answer', '')
+            item = {
+                'q_id': q_id,
+                'q_type': q_type,
+                'topic': correct_data.get('topic', 'General'),
+                'user_answer': user_answer,
+                'correct_answer': correct_answer
+            }
+            
+            if q_type.lower() in ['mcq', 'multiple_choice', 'objective']:
+                is_correct, score = self.evaluate_mcq(user_answer, correct_answer)
+                item.update(is_correct=is_correct, score=score, similarity=1.0 if is_correct else 0.0)
+            else:
+                user_text = self.preprocess_text(user_answer)
+                reference_text = self.preprocess_text(correct_answer)
                 
-                if q_type.lower() in ['mcq', 'multiple_choice', 'objective']:
-                    is_correct, score = self.evaluate_mcq(user_answer, correct_answer)
-                    similarity = 1.0 if is_correct else 0.0
+                if not user_text or len(user_text) < 3:
+                    item.update(is_correct=False, score=0.0, similarity=0.0)
+                elif len(user_text.split()) <= 2:
+                    exact_match = user_text in reference_text or reference_text in user_text
+                    value = 1.0 if exact_match else 0.0
+                    item.update(is_correct=exact_match, score=value, similarity=value)
                 else:
-                    is_correct, score, similarity = self.evaluate_subjective(user_answer, correct_answer)
-                
-                total_score += score
-                topic_performance[topic][1] += 1
-                if is_correct:
-                    topic_performance[topic][0] += 1
-                
-                # FIX: Convert NumPy types to Python types for JSON serialization
-                detailed_results.append({
-                    "questionId": str(q_id),
-                    "topic": str(topic),
-                    "isCorrect": bool(is_correct),
-                    "score": float(round(score, 2)),
-                    "similarity": float(round(similarity, 2)) if q_type != 'mcq' else None,
-                    "userAnswer": str(user_answer[:100]),
-                    "correctAnswer": str(correct_answer[:100])
-                })
-            
-            score_percentage = (total_score / max_score * 100) if max_score > 0 else 0
-            
-            for topic, (correct, total) in topic_performance.items():
-                if total > 0 and (correct / total) < 0.6:
-                    weak_topics.append(str(topic))
-            
-            topic_feedback = self.generate_topic_feedback(dict(topic_performance))
-            improvement_suggestions = self.generate_improvement_suggestions(weak_topics, score_percentage)
+                    item.update(pending=True, user_text=user_text, reference_text=reference_text)
             
-            result = {
-                "score": float(round(total_score, 1)),
-                "total": int(max_score),
-                "percentage": float(round(score_percentage, 1)),
-                "grade": str(self._calculate_grade(score_percentage)),
-                "subject": str(subject),
-                "topicPerformance": {
-                    str(topic): {
-                        "correct": int(correct),
-                        "total": int(total),
-                        "percentage": float(round((correct/total)*100, 1)) if total > 0 else 0.0
-                    }
-                    for topic, (correct, total) in topic_performance.items()
-                },
-                "feedback": [str(f) for f in topic_feedback],
-                "improvementSuggestions": [str(s) for s in improvement_suggestions],
-                "weakTopics": [str(t) for t in weak_topics],
-                "detailedResults": detailed_results,
-                "evaluatedAt": str(self._get_timestamp())
-            }
+            items.append(item)
+        
+        return items
+
+    def _pending_similarities(self, user_texts, reference_texts):
+        """
+        Similarities for pending answers, using the reference index when possible
+
+        Answers whose reference is in the index only need the student's
+        text vectorized; the rest are graded with a per-batch vectorizer.
+        """
+        similarities = np.zeros(len(user_texts))
+        rows = [None] * len(user_texts)
+        if self.reference_index is not None:
+            rows = [self.reference_index.lookup(text) for text in reference_texts]
+
+        indexed = [i for i, row in enumerate(rows) if row is not None]
+        if indexed:
+            similarities[indexed] = self.reference_index.paired_similarities(
+                [user_texts[i] for i in indexed],
+                [rows[i] for i in indexed]
+            )
+
+        unindexed = [i for i, row in enumerate(rows) if row is None]
+        if unindexed:
+            similarities[unindexed] = self._paired_similarities(
+                [user_texts[i] for i in unindexed],
+                [reference_texts[i] for i in unindexed]
+            )
+        return similarities
+
+    def _paired_similarities(self, user_texts, reference_texts):
+        """
+        Cosine similarity of each (user, reference) pair
+
+        Each pair is weighted as if a vectorizer had been fitted on that
+        pair alone (as evaluate_subjective does), so an answer's grade does
+        not depend on the rest of the batch. Term counts for all texts come
+        from one pass.
+        """
+        try:
+            counter = clone(self.vectorizer).set_params(max_features=None, use_idf=False, norm=None)
+            counts = counter.fit_transform(list(user_texts) + list(reference_texts)).tocsr()
+        except ValueError as e:
+            # e.g. every answer is made of stop words: nothing to compare
+            logger.warning(f"Subjective evaluation produced no vocabulary: {e}")
+            return np.zeros(len(user_texts))
+
+        n = len(user_texts)
+        return pairwise_similarities(counts[:n], counts[n:])
+
+    def _build_result(self, items, max_score, subject):
+        """Aggregate graded items into the evaluation result"""
+        total_score = 0.0
+        topic_performance = defaultdict(lambda: [0, 0])
+        detailed_results = []
+        weak_topics = []
+        
+        for item in items:
+            topic = item['topic']
+            score = item['score']
+            is_correct = item['is_correct']
             
-            logger.info(f"Quiz evaluation completed: {score_percentage:.1f}%")
-            return result
+            total_score += score
+            topic_performance[topic][1] += 1
+            if is_correct:
+                topic_performance[topic][0] += 1
             
-        except Exception as e:
-            logger.error(f"Error in quiz evaluation: {str(e)}")
-            raise
+            # Native types: the Flask providers handle NumPy, but Celery's JSON
+            # result serializer (tasks.py) does not
+            detailed_results.append({
+                "questionId": str(item['q_id']),
+                "topic": str(topic),
+                "isCorrect": bool(is_correct),
+                "score": float(round(score, 2)),
+                "similarity": float(round(item['similarity'], 2)) if item['q_type'] != 'mcq' else None,
+                "userAnswer": str(item['user_answer'][:100]),
+                "correctAnswer": str(item['correct_answer'][:100])
+            })
+        
+        score_percentage = (total_score / max_score * 100) if max_score > 0 else 0
+        
+        for topic, (correct, total) in topic_performance.items():
+            if total > 0 and (correct / total) < 0.6:
+                weak_topics.append(str(topic))
+        
+        topic_feedback = self.generate_topic_feedback(dict(topic_performance))
+        improvement_suggestions = self.generate_improvement_suggestions(weak_topics, score_percentage)
+        
+        result = {
+            "score": float(round(total_score, 1)),
+            "total": int(max_score),
+            "percentage": float(round(score_percentage, 1)),
+            "grade": str(self._calculate_grade(score_percentage)),
+            "subject": str(subject),
+            "topicPerformance": {
+                str(topic): {
+                    "correct": int(correct),
+                    "total": int(total),
+                    "percentage": float(round((correct/total)*100, 1)) if total > 0 else 0.0
+                }
+                for topic, (correct, total) in topic_performance.items()
+            },
+            "feedback": [str(f) for f in topic_feedback],
+            "improvementSuggestions": [str(s) for s in improvement_suggestions],
+            "weakTopics": [str(t) for t in weak_topics],
+            "detailedResults": detailed_results,
+            "evaluatedAt": str(self._get_timestamp())
+        }
+        
+        logger.info(f"Quiz evaluation completed: {score_percentage:.1f}%")
+        return result
     
     def _calculate_grade(self, percentage):
         """Convert percentage to grade"""
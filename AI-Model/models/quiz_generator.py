@@ -29,6 +29,13 @@ class QuizGenerator:
            logger.error(f"Failed to initialize AI for Quiz Generator: {e}")
            self.ai_enabled = False
     
+    @classmethod
+    def load_question_bank(cls, question_bank_file='data/question_bank.json'):
+        """The bank a QuizGenerator would use, without initializing the LLM client"""
+        generator = cls.__new__(cls)
+        generator.question_bank_file = question_bank_file
+        return generator._load_question_bank()
+    
     def _load_question_bank(self):
         """Load or create question bank"""
         if os.path.exists(self.question_bank_file):
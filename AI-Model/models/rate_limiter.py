@@ -0,0 +1,231 @@
+"""
+Rate Limiting for LearnMate AI
+Per-endpoint token buckets, in-process or shared through Redis
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Default per-endpoint limits as (requests, window seconds). Quiz grading is
+# cheap; LLM-backed endpoints cost seconds of Gemini time per request.
+DEFAULT_LIMITS = {
+    'default': (60, 60),
+    'evaluate_quiz': (120, 60),
+    'generate_roadmap': (20, 60),
+    'recommend_career': (30, 60),
+    'batch_analyze': (10, 60)
+}
+
+# Token bucket in Redis: one hash per key, refilled from the elapsed server
+# time, expiring once the bucket would be full again.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + (now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class LocalTokenBucketLimiter:
+    """
+    In-process token buckets with timing-wheel expiry
+
+    Each check refills one bucket from the elapsed time and spends a token,
+    in O(1). A bucket that has refilled completely holds no information, so
+    it is scheduled on a timing wheel at the moment it becomes full; the
+    wheel is advanced lazily on each check and drops idle buckets, so
+    cleanup costs amortized O(1) instead of a scan of every client.
+    """
+
+    def __init__(self, slot_seconds=1.0, slots=128):
+        self.slot_seconds = slot_seconds
+        self._buckets = {}  # key -> [tokens, last refill, scheduled tick]
+        self._wheel = [set() for _ in range(slots)]
+        self._tick = int(time.time() / slot_seconds)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def acquire(self, key, rate, capacity, cost=1):
+        """
+        Spend tokens from a bucket
+
+        Args:
+            key: Bucket key (endpoint + client)
+            rate: Tokens refilled per second
+            capacity: Bucket size (burst)
+            cost: Tokens this request costs
+
+        Returns:
+            tuple: (allowed, seconds until the request would be allowed)
+        """
+        now = time.time()
+        with self._lock:
+            self._advance(now)
+
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+
+            full_at = now + (capacity - tokens) / rate
+            self._schedule(key, bucket, tokens, now, full_at)
+            return allowed, retry_after
+
+    def _schedule(self, key, bucket, tokens, now, full_at):
+        """Store the bucket and (re)place it on the wheel (lock held)"""
+        tick = max(self._tick + 1, math.ceil(full_at / self.slot_seconds))
+        if bucket is None:
+            self._buckets[key] = [tokens, now, tick]
+        else:
+            if bucket[2] != tick:
+                self._wheel[bucket[2] % len(self._wheel)].discard(key)
+            bucket[0], bucket[1], bucket[2] = tokens, now, tick
+        self._wheel[tick % len(self._wheel)].add(key)
+
+    def _advance(self, now):
+        """Expire buckets in the slots passed since the last check (lock held)"""
+        current = int(now / self.slot_seconds)
+        if current <= self._tick:
+            return
+        # A gap longer than one rotation visits every slot once
+        start = max(self._tick + 1, current - len(self._wheel) + 1)
+        for tick in range(start, current + 1):
+            slot = self._wheel[tick % len(self._wheel)]
+            for key in [key for key in slot if self._buckets[key][2] <= current]:
+                slot.discard(key)
+                del self._buckets[key]
+        self._tick = current
+
+
+class RedisTokenBucketLimiter:
+    """Token buckets shared by all workers through Redis"""
+
+    def __init__(self, redis_url, prefix='learnmate:ratelimit:'):
+        import redis  # Optional dependency, only needed for the shared backend
+
+        self.client = redis.Redis.from_url(redis_url)
+        self.prefix = prefix
+        self._script = self.client.register_script(_TOKEN_BUCKET_SCRIPT)
+
+    def acquire(self, key, rate, capacity, cost=1):
+        allowed, retry_after = self._script(keys=[self.prefix + key], args=[rate, capacity, cost])
+        return bool(allowed), float(retry_after)
+
+
+class RateLimiter:
+    """
+    Per-endpoint, per-client rate limits
+
+    Each endpoint has (limit, window): a bucket of `limit` tokens that
+    refills at limit/window per second, so sustained traffic is capped at
+    `limit` per window while short bursts up to `limit` are allowed.
+    """
+
+    def __init__(self, limits=None, backend='local', redis_url=None):
+        self.limits = dict(DEFAULT_LIMITS)
+        self.limits.update(limits or {})
+        self._stats = {'allowed': 0, 'limited': 0, 'backend_errors': 0}
+        self._stats_lock = threading.Lock()
+
+        longest_window = max(window for _, window in self.limits.values())
+        self.local = LocalTokenBucketLimiter(slot_seconds=max(longest_window / 128, 0.05))
+        self.shared = None
+        if backend == 'redis':
+            try:
+                self.shared = RedisTokenBucketLimiter(redis_url)
+            except Exception as e:
+                logger.warning(f"Redis rate limiter unavailable, limiting per process: {e}")
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build from environment variables
+
+        RATE_LIMITS overrides endpoint limits, e.g.
+        "default=60/60,generate_roadmap=10/60,evaluate_quiz=300/60"
+        """
+        return cls(
+            limits=cls.parse_limits(os.getenv('RATE_LIMITS', '')),
+            backend=os.getenv('RATE_LIMIT_BACKEND', 'local'),
+            redis_url=os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        )
+
+    @staticmethod
+    def parse_limits(spec):
+        """Parse "endpoint=limit/window,..." into {endpoint: (limit, window)}"""
+        limits = {}
+        for item in filter(None, (part.strip() for part in spec.split(','))):
+            try:
+                endpoint, value = item.split('=', 1)
+                limit, window = value.split('/', 1)
+                limits[endpoint.strip()] = (int(limit), float(window))
+            except ValueError:
+                logger.warning(f"Ignoring malformed rate limit '{item}'")
+        return limits
+
+    def check(self, endpoint, client, cost=1):
+        """
+        Check and record one request
+
+        Returns:
+            tuple: (allowed, retry_after seconds)
+        """
+        limit, window = self.limits.get(endpoint, self.limits['default'])
+        key = f"{endpoint}:{client}"
+        rate = limit / window
+
+        result = None
+        if self.shared is not None:
+            try:
+                result = self.shared.acquire(key, rate, limit, cost)
+            except Exception as e:
+                logger.warning(f"Redis rate limiter failed, limiting per process: {e}")
+                with self._stats_lock:
+                    self._stats['backend_errors'] += 1
+        if result is None:
+            result = self.local.acquire(key, rate, limit, cost)
+
+        with self._stats_lock:
+            self._stats['allowed' if result[0] else 'limited'] += 1
+        return result
+
+    def stats(self):
+        """Allowed/limited counters and tracked client buckets"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['tracked_buckets'] = len(self.local)
+        stats['backend'] = 'redis' if self.shared is not None else 'local'
+        return stats
@@ -0,0 +1,237 @@
+"""
+Reference Answer Index for LearnMate AI
+Pre-vectorized reference answers for subjective quiz grading
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_FILE = os.path.join(os.path.dirname(__file__), 'saved', 'reference_index.pkl')
+
+# Smoothed IDF of a term in only one text of a two-document corpus
+UNSHARED_IDF = np.log(1.5) + 1
+
+
+def pairwise_similarities(user_counts, reference_counts):
+    """
+    Cosine similarity of aligned rows of term counts, each pair weighted alone
+
+    Matches a TfidfVectorizer fitted on just that pair (as
+    QuizEvaluator.evaluate_subjective does, and as the grading thresholds
+    were calibrated): the smoothed IDF is 1 for a term both texts share
+    and ln(3/2) + 1 for a term only one of them has.
+
+    Args:
+        user_counts: Sparse term counts of the student answers
+        reference_counts: Sparse term counts of their references, same columns
+    """
+    user, reference = user_counts.tocsr(), reference_counts.tocsr()
+    user_weights = user * UNSHARED_IDF - user.multiply(reference > 0) * (UNSHARED_IDF - 1)
+    reference_weights = reference * UNSHARED_IDF - reference.multiply(user > 0) * (UNSHARED_IDF - 1)
+
+    dot = np.asarray(user_weights.multiply(reference_weights).sum(axis=1)).ravel()
+    norms = np.sqrt(
+        np.asarray(user_weights.multiply(user_weights).sum(axis=1)).ravel() *
+        np.asarray(reference_weights.multiply(reference_weights).sum(axis=1)).ravel()
+    )
+    return np.divide(dot, norms, out=np.zeros(user.shape[0]), where=norms > 0)
+
+
+class ReferenceAnswerIndex:
+    """
+    Store preprocessed, vectorized reference answers
+
+    Terms are hashed into a fixed feature space (same analyzer settings as
+    QuizEvaluator), so there is no vocabulary to refit: adding answers only
+    vectorizes the new ones, and grading only vectorizes the student's
+    answer. Each pair is weighted on its own (pairwise_similarities), so
+    the index only saves work: a grade is the same whether or not its
+    reference is indexed. Answers are keyed by a hash of their
+    preprocessed text (question ids are kept as metadata).
+    """
+
+    N_FEATURES = 2 ** 20
+
+    def __init__(self, preprocess, index_file=DEFAULT_INDEX_FILE):
+        """
+        Args:
+            preprocess: Text normalization function (QuizEvaluator.preprocess_text)
+            index_file: Where the index is persisted
+        """
+        self.preprocess = preprocess
+        self.index_file = index_file
+        self.texts = []
+        self.rows = {}
+        self.question_ids = {}
+        self.vectorizer = HashingVectorizer(
+            n_features=self.N_FEATURES,
+            ngram_range=(1, 2),
+            stop_words='english',
+            lowercase=True,
+            alternate_sign=False,
+            norm=None
+        )
+        self.counts = sp.csr_matrix((0, self.N_FEATURES))
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def answer_key(text):
+        """Hash of a preprocessed reference answer"""
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, items):
+        """
+        Add reference answers
+
+        Args:
+            items: Iterable of dicts with 'answer' and optional 'questionId'
+
+        Returns:
+            int: Number of newly indexed answers
+        """
+        with self._lock:
+            new_texts = []
+            new_keys = set()
+            for item in items:
+                text = self.preprocess(item.get('answer', ''))
+                if not text:
+                    continue
+                key = self.answer_key(text)
+                if key not in self.rows and key not in new_keys:
+                    new_keys.add(key)
+                    new_texts.append(text)
+                if item.get('questionId') is not None:
+                    self.question_ids.setdefault(key, set()).add(str(item['questionId']))
+
+            if not new_texts:
+                return 0
+
+            self._append(new_texts)
+            logger.info(f"Reference index: added {len(new_texts)} answers ({len(self.texts)} total)")
+            return len(new_texts)
+
+    def _append(self, texts):
+        """Vectorize and append answers (lock held)"""
+        counts = self.vectorizer.transform(texts).tocsr()
+        self.counts = sp.vstack([self.counts, counts], format='csr')
+        for text in texts:
+            self.rows[self.answer_key(text)] = len(self.texts)
+            self.texts.append(text)
+
+    def add_question_bank(self, bank):
+        """Index every subjective answer in a QuizGenerator question bank"""
+        items = [
+            question
+            for difficulties in bank.values()
+            for questions in difficulties.values()
+            for question in questions
+            if question.get('type') == 'subjective' and question.get('answer')
+        ]
+        return self.add(items)
+
+    def lookup(self, reference_text):
+        """
+        Find the row of a preprocessed reference answer
+
+        Returns:
+            int or None
+        """
+        return self.rows.get(self.answer_key(reference_text))
+
+    def paired_similarities(self, user_texts, rows):
+        """
+        Cosine similarity of each preprocessed user answer to its indexed reference
+
+        Args:
+            user_texts: Preprocessed student answers
+            rows: Matching rows from lookup()
+        """
+        if not user_texts:
+            return np.zeros(0)
+        with self._lock:
+            reference_counts = self.counts[rows]
+        return pairwise_similarities(self.vectorizer.transform(user_texts), reference_counts)
+
+    def save(self):
+        """Persist the index to disk (atomic replace)"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.index_file) or '.', exist_ok=True)
+            tmp_path = f"{self.index_file}.{os.getpid()}.tmp"
+            joblib.dump({
+                'texts': self.texts,
+                'question_ids': self.question_ids,
+                'n_features': self.N_FEATURES,
+                'counts': self.counts
+            }, tmp_path)
+            os.replace(tmp_path, self.index_file)
+        logger.info(f"Reference index saved to {self.index_file}")
+
+    def load(self):
+        """Load a persisted index; returns False if none exists"""
+        if not os.path.exists(self.index_file):
+            return False
+        data = joblib.load(self.index_file)
+        with self._lock:
+            self.question_ids = data.get('question_ids', {})
+            self.texts, self.rows = [], {}
+            self.counts = sp.csr_matrix((0, self.N_FEATURES))
+            if data.get('n_features') == self.N_FEATURES:
+                self.counts = data['counts'].tocsr()
+                self.texts = list(data['texts'])
+                self.rows = {self.answer_key(text): row for row, text in enumerate(self.texts)}
+            elif data['texts']:
+                # Written by an older format: re-vectorize the stored answers
+                self._append(list(data['texts']))
+        logger.info(f"Reference index loaded: {len(self.texts)} answers")
+        return True
+
+    @classmethod
+    def from_env(cls, preprocess):
+        """Load/build the index from environment variables, or None when disabled"""
+        if os.getenv('QUIZ_REFERENCE_INDEX', 'true').lower() in ('0', 'false', 'no'):
+            return None
+        return cls.load_or_build(
+            preprocess,
+            index_file=os.getenv('QUIZ_REFERENCE_INDEX_FILE', DEFAULT_INDEX_FILE),
+            bank_file=os.getenv('QUESTION_BANK_FILE', 'data/question_bank.json')
+        )
+
+    @classmethod
+    def load_or_build(cls, preprocess, index_file=DEFAULT_INDEX_FILE,
+                      bank_file='data/question_bank.json'):
+        """
+        Load the persisted index and fold in any new question bank answers
+
+        The bank is QuizGenerator's: bank_file if it exists, otherwise the
+        default bank (which QuizGenerator writes to bank_file).
+
+        Returns:
+            ReferenceAnswerIndex, or None if nothing could be indexed
+        """
+        from .quiz_generator import QuizGenerator
+
+        index = cls(preprocess, index_file)
+        try:
+            index.load()
+        except Exception as e:
+            logger.warning(f"Could not load reference index, rebuilding: {e}")
+
+        try:
+            if index.add_question_bank(QuizGenerator.load_question_bank(bank_file)):
+                index.save()
+        except Exception as e:
+            logger.warning(f"Could not index question bank {bank_file}: {e}")
+
+        return index if len(index) else None
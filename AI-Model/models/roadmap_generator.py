@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime
-from .llm_client import LLMClient
+from .llm_client import LLMClient, get_async_llm_client
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +21,56 @@ class RoadmapGenerator:
         try:
             logger.info(f"Generating AI roadmap for {target_career}")
             
-            prompt = f"""
+            prompt = self._build_prompt(performance, semester, interests,
+                                        target_career, time_available, known_skills)
+            result = self.llm.generate_json(prompt)
+            return self._finalize(result, user_id)
+            
+        except Exception as e:
+            logger.error(f"Error generating roadmap: {str(e)}")
+            return self._error_result(e)
+
+    def generate_many(self, requests):
+        """
+        Generate roadmaps for many requests with concurrent async LLM calls
+
+        Args:
+            requests: List of dicts with generate() keyword arguments
+
+        Returns:
+            list: One roadmap (or error result) per request, in order
+        """
+        results = [None] * len(requests)
+        prompts, indices = [], []
+        for idx, req in enumerate(requests):
+            try:
+                prompts.append(self._build_prompt(
+                    req.get('performance', {}),
+                    req.get('semester', 1),
+                    req.get('interests'),
+                    req.get('target_career'),
+                    req.get('time_available', 15),
+                    req.get('known_skills')
+                ))
+                indices.append(idx)
+            except Exception as e:
+                logger.error(f"Error generating roadmap: {str(e)}")
+                results[idx] = self._error_result(e)
+
+        responses = get_async_llm_client().generate_json_many(prompts)
+
+        for idx, response in zip(indices, responses):
+            if isinstance(response, Exception):
+                logger.error(f"Error generating roadmap: {str(response)}")
+                results[idx] = self._error_result(response)
+            else:
+                results[idx] = self._finalize(response, requests[idx].get('user_id'))
+        return results
+
+    def _build_prompt(self, performance, semester, interests, target_career,
+                      time_available, known_skills):
+        """Build the roadmap prompt"""
+        return f"""
             Act as an expert Learning Curriculum Designer.
             Create a detailed, week-by-week learning roadmap for a student targeting the role of: {target_career}.
             
@@ -65,18 +114,19 @@ class RoadmapGenerator:
             - The "milestones" field inside each phase is crucial. It must contain specific, actionable learning tasks.
             - Adapt curriculum to fill gaps in 'Weak Areas' first.
             """
-            
-            result = self.llm.generate_json(prompt)
-            result["userId"] = user_id
-            result["generatedAt"] = datetime.utcnow().isoformat() + "Z"
-            
-            logger.info(f"AI generated roadmap with {len(result.get('roadmap', []))} phases")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error generating roadmap: {str(e)}")
-            return {
-                "roadmap": [],
-                "studyRecommendations": [],
-                "error": str(e)
-            }
\ No newline at end of file
+
+    def _finalize(self, result, user_id):
+        """Attach request metadata to an LLM roadmap"""
+        result["userId"] = user_id
+        result["generatedAt"] = datetime.utcnow().isoformat() + "Z"
+        
+        logger.info(f"AI generated roadmap with {len(result.get('roadmap', []))} phases")
+        return result
+
+    def _error_result(self, error):
+        """Fallback response when generation fails"""
+        return {
+            "roadmap": [],
+            "studyRecommendations": [],
+            "error": str(error)
+        }
\ No newline at end of file
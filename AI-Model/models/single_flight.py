@@ -0,0 +1,173 @@
+"""
+Single-Flight Request Coalescing for LearnMate AI
+Concurrent callers with the same key share one in-flight computation
+"""
+
+import copy
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Delete the lock only if we still own it
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coalesce duplicate concurrent calls
+
+    Within a process, the first caller for a key (the leader) runs the
+    function and every concurrent caller with the same key waits on the
+    leader's future. With a Redis URL, a short-lived Redis lock extends
+    this across Celery/gunicorn workers: a worker that loses the lock polls
+    a shared lookup (e.g. the Redis tier of the LLM response cache) until
+    the lock holder publishes its result.
+    """
+
+    def __init__(self, redis_url=None, lock_ttl=60, poll_interval=0.1,
+                 prefix='learnmate:singleflight:'):
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.prefix = prefix
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'followers': 0, 'remote_waits': 0, 'remote_hits': 0}
+        self.redis = None
+        self._release = None
+
+        if redis_url:
+            try:
+                import redis  # Optional dependency, only needed across processes
+
+                self.redis = redis.Redis.from_url(redis_url)
+                self._release = self.redis.register_script(_RELEASE_SCRIPT)
+            except Exception as e:
+                logger.warning(f"Redis single-flight unavailable, coalescing in-process only: {e}")
+                self.redis = None
+
+    @classmethod
+    def from_env(cls):
+        """Build from environment variables, or None when disabled"""
+        if os.getenv('LLM_SINGLE_FLIGHT', 'true').lower() in ('0', 'false', 'no'):
+            return None
+        redis_url = None
+        if os.getenv('LLM_SINGLE_FLIGHT_BACKEND', 'local') == 'redis':
+            redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        return cls(
+            redis_url=redis_url,
+            lock_ttl=int(os.getenv('LLM_SINGLE_FLIGHT_LOCK_TTL', 60))
+        )
+
+    def do(self, key, fn, check=None):
+        """
+        Run fn once per key among concurrent callers
+
+        Args:
+            key: Coalescing key (e.g. the LLM response cache key)
+            fn: Zero-argument function producing the result
+            check: Optional zero-argument lookup returning a result published
+                by another process, or None (used with the Redis lock)
+
+        Returns:
+            The result of fn (followers receive a deep copy)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self._stats['leaders'] += 1
+            else:
+                self._stats['followers'] += 1
+
+        if not leader:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = self._run_leader(key, fn, check)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def stats(self):
+        """Get coalescing counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+    def _run_leader(self, key, fn, check):
+        """Run fn, coordinating with other processes when Redis is configured"""
+        if self.redis is None:
+            return fn()
+
+        lock_key = self.prefix + key
+        token = uuid.uuid4().hex
+        try:
+            acquired = self.redis.set(lock_key, token, nx=True, px=int(self.lock_ttl * 1000))
+        except Exception as e:
+            logger.warning(f"Single-flight lock failed, calling directly: {e}")
+            return fn()
+
+        if acquired:
+            try:
+                return fn()
+            finally:
+                try:
+                    self._release(keys=[lock_key], args=[token])
+                except Exception as e:
+                    logger.warning(f"Single-flight lock release failed: {e}")
+
+        # Another process is computing this key: wait for its published result
+        with self._lock:
+            self._stats['remote_waits'] += 1
+        deadline = time.time() + self.lock_ttl
+        while time.time() < deadline:
+            if check is not None:
+                result = check()
+                if result is not None:
+                    with self._lock:
+                        self._stats['remote_hits'] += 1
+                    return result
+            try:
+                if not self.redis.exists(lock_key):
+                    break
+            except Exception:
+                break
+            time.sleep(self.poll_interval)
+
+        # Holder finished without publishing (or failed): compute ourselves
+        if check is not None:
+            result = check()
+            if result is not None:
+                return result
+        return fn()
+
+
+_shared_single_flight = None
+_shared_single_flight_lock = threading.Lock()
+
+
+def get_shared_single_flight():
+    """Get the process-wide SingleFlight (None when disabled)"""
+    global _shared_single_flight
+    with _shared_single_flight_lock:
+        if _shared_single_flight is None:
+            _shared_single_flight = SingleFlight.from_env() or False
+    return _shared_single_flight or None
@@ -0,0 +1,256 @@
+"""
+Write-Behind Queue for LearnMate AI
+Moves tracker disk writes off the request path
+"""
+
+import atexit
+import logging
+import os
+import signal
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DROP_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+_queues = []
+_queues_lock = threading.Lock()
+_signal_installed = False
+# Set by the SIGTERM handler; flushers then drain without waiting for a full batch
+_terminating = False
+
+
+class WriteBehindQueue:
+    """
+    Bounded in-memory buffer flushed in batches by a background thread
+
+    submit() only appends to a deque. The flusher hands up to batch_size
+    items to flush_fn when the batch fills or flush_interval elapses.
+    When the buffer is full the drop policy decides: block (the default)
+    waits up to block_timeout for space before rejecting the new item,
+    drop_oldest evicts the oldest pending item and drop_newest rejects the
+    new one. Every dropped item is counted and logged.
+    """
+
+    def __init__(self, name, flush_fn, max_size=10000, batch_size=256,
+                 flush_interval=0.5, policy='block', block_timeout=1.0):
+        """
+        Args:
+            name: Queue name used in logs and metrics
+            flush_fn: Function receiving a list of items to persist
+            max_size: Maximum pending items
+            batch_size: Maximum items per flush_fn call
+            flush_interval: Seconds before a partial batch is flushed
+            policy: One of DROP_POLICIES
+            block_timeout: Seconds submit() may wait under the block policy
+        """
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"Unknown drop policy '{policy}', expected one of {DROP_POLICIES}")
+
+        self.name = name
+        self.flush_fn = flush_fn
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._items = deque()
+        self._condition = threading.Condition(threading.RLock())
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            'enqueued': 0,
+            'dropped': 0,
+            'flushed': 0,
+            'batches': 0,
+            'flush_errors': 0,
+            'last_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0
+        }
+
+        self._thread = threading.Thread(target=self._run, name=f"write-behind-{name}", daemon=True)
+        self._thread.start()
+        _register(self)
+
+    @classmethod
+    def from_env(cls, name, flush_fn):
+        """Build a queue from environment variables, or None when disabled"""
+        if os.getenv('TRACKER_WRITE_BEHIND', 'true').lower() in ('0', 'false', 'no'):
+            return None
+        return cls(
+            name,
+            flush_fn,
+            max_size=int(os.getenv('TRACKER_QUEUE_SIZE', 10000)),
+            batch_size=int(os.getenv('TRACKER_BATCH_SIZE', 256)),
+            flush_interval=float(os.getenv('TRACKER_FLUSH_INTERVAL', 0.5)),
+            policy=os.getenv('TRACKER_DROP_POLICY', 'block'),
+            block_timeout=float(os.getenv('TRACKER_BLOCK_TIMEOUT', 1.0))
+        )
+
+    def submit(self, item):
+        """
+        Queue an item for writing (never does I/O)
+
+        Returns:
+            bool: False if the item was dropped
+        """
+        dropped = 0
+        with self._condition:
+            if self._closed:
+                return False
+
+            accepted = True
+            if len(self._items) >= self.max_size:
+                if self.policy == 'drop_oldest':
+                    self._items.popleft()
+                    dropped = self._record_drops(1)
+                elif self.policy == 'block':
+                    deadline = time.time() + self.block_timeout
+                    while len(self._items) >= self.max_size and not self._closed:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                if len(self._items) >= self.max_size:
+                    dropped = self._record_drops(1)
+                    accepted = False
+
+            if accepted:
+                self._items.append(item)
+                self._stats['enqueued'] += 1
+                if len(self._items) >= self.batch_size:
+                    self._condition.notify_all()
+
+        if dropped:
+            self._log_drops(1, dropped, f"buffer full ({self.policy})")
+        return accepted
+
+    def _record_drops(self, count):
+        """Count dropped items (lock held); returns the running total"""
+        self._stats['dropped'] += count
+        return self._stats['dropped']
+
+    def _log_drops(self, count, total, reason):
+        """Warn about the first drop and then every 1000th, so a full buffer cannot flood the log"""
+        if total == count or total // 1000 != (total - count) // 1000:
+            logger.warning(f"Write-behind queue '{self.name}' dropped {count} item(s): {reason} "
+                           f"({total} dropped so far)")
+
+    def flush(self):
+        """Write every pending item now (blocks the caller)"""
+        while self._flush_batch():
+            pass
+
+    def close(self):
+        """Stop the flusher and write what is left"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.flush()
+
+    def stats(self):
+        """Queue depth, drop and flush latency counters"""
+        with self._condition:
+            stats = dict(self._stats)
+            stats['depth'] = len(self._items)
+        batches = stats['batches']
+        stats['avg_flush_seconds'] = round(stats.pop('total_flush_seconds') / batches, 6) if batches else 0.0
+        stats['last_flush_seconds'] = round(stats['last_flush_seconds'], 6)
+        stats['max_flush_seconds'] = round(stats['max_flush_seconds'], 6)
+        return stats
+
+    def _run(self):
+        while True:
+            with self._condition:
+                deadline = time.time() + self.flush_interval
+                # After SIGTERM any pending item is flushed at once, but an
+                # empty buffer still waits instead of spinning on flush()
+                while len(self._items) < (1 if _terminating else self.batch_size) and not self._closed:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._closed:
+                    return
+            self.flush()
+
+    def _flush_batch(self):
+        """Hand one batch to flush_fn; returns False when nothing was pending"""
+        with self._flush_lock:
+            with self._condition:
+                if not self._items:
+                    return False
+                batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+                self._condition.notify_all()  # Wake submitters blocked on space
+
+            started = time.time()
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                logger.error(f"Write-behind queue '{self.name}' failed to flush {len(batch)} items: {e}")
+                with self._condition:
+                    self._stats['flush_errors'] += 1
+                    self._record_drops(len(batch))
+                return True
+
+            elapsed = time.time() - started
+            with self._condition:
+                self._stats['flushed'] += len(batch)
+                self._stats['batches'] += 1
+                self._stats['last_flush_seconds'] = elapsed
+                self._stats['max_flush_seconds'] = max(self._stats['max_flush_seconds'], elapsed)
+                self._stats['total_flush_seconds'] += elapsed
+            return True
+
+
+def queue_stats():
+    """Metrics of every write-behind queue in this process"""
+    with _queues_lock:
+        return {queue.name: queue.stats() for queue in _queues}
+
+
+def close_all():
+    """Flush and stop every queue (registered with atexit)"""
+    with _queues_lock:
+        queues = list(_queues)
+    for queue in queues:
+        try:
+            queue.close()
+        except Exception as e:
+            logger.error(f"Error closing write-behind queue '{queue.name}': {e}")
+
+
+def _register(queue):
+    global _signal_installed
+    with _queues_lock:
+        _queues.append(queue)
+        if _signal_installed:
+            return
+        _signal_installed = True
+
+    atexit.register(close_all)
+
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def handle_sigterm(signum, frame):
+            # No I/O or locking here: the signal may have interrupted this thread
+            # while it held a flush_fn lock. Flushers start draining, and the
+            # atexit close_all() writes the rest once the stack has unwound.
+            global _terminating
+            _terminating = True
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                raise SystemExit(128 + signum)
+
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    except (ValueError, OSError) as e:
+        logger.warning(f"Could not install SIGTERM flush handler: {e}")
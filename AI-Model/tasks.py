@@ -2,7 +2,9 @@ import logging
 from celery_app import app
 from models.career_recommender import CareerRecommender
 from models.quiz_evaluator import QuizEvaluator
+from models.reference_index import ReferenceAnswerIndex
 from models.roadmap_generator import RoadmapGenerator
+from models.batch_processor import batch_processor
 
 logger = logging.getLogger(__name__)
 
@@ -10,6 +12,7 @@ logger = logging.getLogger(__name__)
 try:
     career_recommender = CareerRecommender()
     quiz_evaluator = QuizEvaluator()
+    quiz_evaluator.reference_index = ReferenceAnswerIndex.from_env(quiz_evaluator.preprocess_text)
     roadmap_generator = RoadmapGenerator()
 except Exception as e:
     logger.error(f"Error initializing models in Celery: {e}")
@@ -21,7 +24,8 @@ def recommend_career(data):
             scores=data.get('scores', {}),
             interests=data.get('interests', []),
             skills=data.get('skills', []),
-            semester=data.get('semester', 1)
+            semester=data.get('semester', 1),
+            mode=data.get('mode')
         )
         return result
     except Exception as e:
@@ -57,3 +61,22 @@ def generate_roadmap(user_id, performance, semester, interests, target_career, t
     except Exception as e:
         logger.error(f"Roadmap generation failed: {e}")
         raise e
+
+
+@app.task(name='tasks.batch_recommend_careers')
+def batch_recommend_careers(requests, pack_size=None):
+    """Recommend careers for many students with concurrent, packed LLM calls"""
+    try:
+        return batch_processor.batch_recommend_careers(career_recommender, requests, pack_size=pack_size)
+    except Exception as e:
+        logger.error(f"Batch career recommendation failed: {e}")
+        raise e
+
+@app.task(name='tasks.batch_generate_roadmaps')
+def batch_generate_roadmaps(requests):
+    """Generate roadmaps for many students with concurrent async LLM calls"""
+    try:
+        return batch_processor.batch_generate_roadmaps(roadmap_generator, requests)
+    except Exception as e:
+        logger.error(f"Batch roadmap generation failed: {e}")
+        raise e
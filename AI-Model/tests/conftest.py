@@ -0,0 +1,4 @@
+"""Shared pytest configuration"""
+
+# test_api.py exercises a running server: python tests/test_api.py
+collect_ignore = ['test_api.py']
@@ -0,0 +1,200 @@
+"""Tests for the incremental analytics aggregates"""
+
+import json
+import math
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from models.analytics_aggregates import (
+    HISTOGRAM_GROWTH, HISTOGRAM_MIN, LATENCY_PERCENTILES, AnalyticsAggregates, fold_event,
+    histogram_index, histogram_percentiles, merge_buckets, new_bucket
+)
+from models.event_log import EventLog
+
+# Recent enough to survive the event log's retention
+BASE = (datetime.utcnow() - timedelta(days=2)).replace(minute=0, second=0, microsecond=0)
+
+
+def _event(hours, event_type='quiz_evaluation', minutes=0, **data):
+    timestamp = (BASE + timedelta(hours=hours, minutes=minutes)).isoformat()
+    return {'timestamp': timestamp, 'type': event_type, 'data': data}
+
+
+def _quiz(hours, percentage, minutes=0, **data):
+    return _event(hours, minutes=minutes, score=percentage / 10, percentage=percentage,
+                  grade='A', subject='AI', **data)
+
+
+@pytest.fixture
+def log(tmp_path):
+    return EventLog(str(tmp_path / 'analytics'))
+
+
+def test_collect_matches_folding_every_event(log):
+    events = [_quiz(hour, 50 + hour, minutes=hour, response_time=0.1 * (hour + 1)) for hour in range(6)]
+    events += [
+        _event(1, 'career_recommendation', recommendations=[{'career': 'AI Engineer', 'confidence': 0.9}]),
+        _event(2, 'roadmap_generation', statistics={'totalMilestones': 4, 'estimatedTotalHours': 30},
+               roadmap=[{'subject': 'AI'}, {'subject': 'Math'}]),
+    ]
+    log.append_many(events)
+
+    totals, daily = AnalyticsAggregates(log).collect(since=BASE)
+
+    expected = new_bucket()
+    for event in events:
+        fold_event(expected, event)
+    assert totals == expected
+    assert totals['quiz']['count'] == 6 and totals['by_type']['career_recommendation'] == 1
+    assert sum(day['total'] for day in daily.values()) == len(events)
+
+
+def test_window_starts_at_the_cutoff_hour(log):
+    log.append_many([_quiz(0, 10, minutes=59), _quiz(1, 20), _quiz(1, 30, minutes=45), _quiz(2, 40)])
+    aggregates = AnalyticsAggregates(log)
+
+    # The whole cutoff hour counts, including events before the cutoff minute
+    totals, _ = aggregates.collect(since=BASE + timedelta(hours=1, minutes=30))
+    assert totals['quiz']['count'] == 3
+    assert totals['quiz']['percentage_sum'] == 90
+
+    totals, _ = aggregates.collect(since=BASE + timedelta(hours=2))
+    assert totals['quiz']['count'] == 1
+
+
+def test_refresh_only_folds_appended_events(log):
+    aggregates = AnalyticsAggregates(log)
+    log.append(_quiz(0, 10))
+    assert aggregates.collect(since=BASE)[0]['total'] == 1
+
+    log.append(_quiz(0, 20))
+    log.append(_quiz(1, 30))
+    totals, _ = aggregates.collect(since=BASE)
+    assert totals['total'] == 3
+    assert totals['quiz']['percentage_sum'] == 60
+
+
+def test_restart_resumes_from_persisted_offsets(log, tmp_path):
+    log.append_many([_quiz(0, 10), _quiz(1, 20)])
+    AnalyticsAggregates(log).collect(since=BASE)
+    state_file = tmp_path / 'analytics' / 'aggregates.json'
+    state = json.loads(state_file.read_text())
+    (segment, saved), = state.items()
+    assert saved['offset'] == (tmp_path / 'analytics' / segment).stat().st_size
+
+    # A restarted worker parses only what was appended since
+    log.append(_quiz(1, 30))
+    restarted = AnalyticsAggregates(log)
+    assert restarted._segments == state
+    totals, _ = restarted.collect(since=BASE)
+    assert totals['quiz']['count'] == 3 and totals['quiz']['percentage_sum'] == 60
+
+    # Bytes before the persisted offset are never parsed again
+    state = json.loads(state_file.read_text())
+    state[segment]['buckets'] = {}
+    state_file.write_text(json.dumps(state))
+    log.append(_quiz(2, 40))
+    assert AnalyticsAggregates(log).collect(since=BASE)[0]['total'] == 1
+
+
+def test_partial_line_is_folded_once_complete(log):
+    log.append(_quiz(0, 10))
+    aggregates = AnalyticsAggregates(log)
+    segment = log.segments()[0][2]
+    line = json.dumps(_quiz(0, 20)).encode()
+    with open(segment, 'ab') as f:
+        f.write(line[:10])
+    assert aggregates.collect(since=BASE)[0]['total'] == 1
+
+    with open(segment, 'ab') as f:
+        f.write(line[10:] + b'\n')
+    assert aggregates.collect(since=BASE)[0]['total'] == 2
+
+
+def test_malformed_event_leaves_no_partial_counts(log, tmp_path):
+    # Fails inside fold_event after 'total' and 'by_type' would have been counted
+    log.append_many([_quiz(0, 10), _event(0, percentage='high', score=None), _quiz(0, 30)])
+    segment = log.segments()[0][2]
+    with open(segment, 'ab') as f:
+        f.write(b'{"torn": \n[1, 2]\n')
+
+    aggregates = AnalyticsAggregates(log)
+    totals, _ = aggregates.collect(since=BASE)
+
+    assert totals['total'] == 2
+    assert totals['by_type'] == {'quiz_evaluation': 2}
+    assert totals['quiz']['count'] == 2 and totals['quiz']['percentage_sum'] == 40
+    # Skipped lines are not retried on every refresh
+    state = json.loads((tmp_path / 'analytics' / 'aggregates.json').read_text())
+    assert state[os.path.basename(segment)]['offset'] == os.path.getsize(segment)
+
+
+def test_retention_drops_a_segments_aggregates(log):
+    log.append(_quiz(0, 10))
+    aggregates = AnalyticsAggregates(log)
+    aggregates.collect(since=BASE)
+    log.close()
+    for _, _, path in log.segments():
+        os.remove(path)
+
+    assert aggregates.collect(since=BASE)[0]['total'] == 0
+    assert aggregates._segments == {}
+
+
+def _histogram(values):
+    histogram = {}
+    for value in values:
+        key = str(histogram_index(value))
+        histogram[key] = histogram.get(key, 0) + 1
+    return histogram
+
+
+def test_histogram_index_brackets_the_value():
+    values = np.geomspace(HISTOGRAM_MIN * 1.001, 3600, 5000)
+    indices = np.array([histogram_index(value) for value in values])
+    assert np.all(np.diff(indices) >= 0)
+    lower = HISTOGRAM_MIN * HISTOGRAM_GROWTH ** (indices - 1)
+    upper = HISTOGRAM_MIN * HISTOGRAM_GROWTH ** indices
+    assert np.all((lower <= values * (1 + 1e-12)) & (values <= upper * (1 + 1e-12)))
+    # An hour of latency fits in ~880 buckets
+    assert indices.max() <= 880
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_percentiles_are_within_the_bucket_error(seed):
+    rng = np.random.default_rng(seed)
+    latencies = rng.lognormal(mean=np.log(0.25), sigma=0.8, size=20000) + 0.01
+
+    percentiles = histogram_percentiles(_histogram(latencies))
+
+    assert set(percentiles) == {name for name, _ in LATENCY_PERCENTILES}
+    ordered = np.sort(latencies)
+    for name, quantile in LATENCY_PERCENTILES:
+        exact = ordered[math.ceil(quantile * len(ordered)) - 1]  # Same rank as the histogram
+        assert percentiles[name] == pytest.approx(exact, rel=0.02)
+
+
+def test_merged_histograms_give_the_percentiles_of_all_values():
+    rng = np.random.default_rng(3)
+    first, second = rng.exponential(0.2, 5000) + 0.01, rng.exponential(2.0, 3000) + 0.01
+    merged = merge_buckets(_histogram(first), _histogram(second))
+    assert histogram_percentiles(merged) == histogram_percentiles(_histogram(np.concatenate([first, second])))
+
+
+def test_empty_histogram_has_no_percentiles():
+    assert histogram_percentiles({}) == {}
+    assert histogram_percentiles({'12': 0}) == {}
+
+
+@pytest.mark.parametrize('value', [0.0042, 0.25, 1.7, 42.0])
+def test_single_value_gives_every_percentile(value):
+    percentiles = histogram_percentiles(_histogram([value]))
+    assert len(set(percentiles.values())) == 1
+    assert percentiles['p50'] == pytest.approx(value, rel=0.02)
+
+
+def test_values_below_the_first_bucket_report_its_floor():
+    assert histogram_percentiles(_histogram([1e-6, 0.0])) == {name: HISTOGRAM_MIN for name, _ in LATENCY_PERCENTILES}
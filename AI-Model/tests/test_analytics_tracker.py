@@ -0,0 +1,42 @@
+"""Tests for the legacy analytics log import"""
+
+import json
+import multiprocessing
+from datetime import datetime
+
+from models.analytics_tracker import AnalyticsTracker
+from models.event_log import EventLog
+
+
+def _start_worker(log_file, log_dir, barrier):
+    barrier.wait()
+    AnalyticsTracker(log_file=log_file, log_dir=log_dir)
+
+
+def test_legacy_log_is_imported_once_across_workers(tmp_path, monkeypatch):
+    monkeypatch.setenv('TRACKER_WRITE_BEHIND', 'false')
+    log_file = str(tmp_path / 'analytics.json')
+    log_dir = str(tmp_path / 'analytics')
+    timestamp = datetime.utcnow().isoformat()
+    with open(log_file, 'w') as f:
+        json.dump([{'timestamp': timestamp, 'type': 'quiz', 'data': {'n': i}} for i in range(50)], f)
+
+    # Workers start together, as gunicorn forks them
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=_start_worker, args=(log_file, log_dir, barrier)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert len(list(EventLog(log_dir).read())) == 50
+    assert (tmp_path / 'analytics.json.migrated').exists()
+    assert not (tmp_path / 'analytics.json').exists()
+
+
+def test_missing_legacy_log_is_skipped(tmp_path, monkeypatch):
+    monkeypatch.setenv('TRACKER_WRITE_BEHIND', 'false')
+    AnalyticsTracker(log_file=str(tmp_path / 'analytics.json'), log_dir=str(tmp_path / 'analytics'))
+    assert not (tmp_path / 'analytics.json.importing').exists()
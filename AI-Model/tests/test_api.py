@@ -3,6 +3,7 @@ API Testing Script for LearnMate AI
 Tests all endpoints with realistic data
 """
 
+import os
 import requests
 import json
 from datetime import datetime
@@ -10,6 +11,9 @@ from datetime import datetime
 # Configuration
 BASE_URL = "http://localhost:5000"
 HEADERS = {"Content-Type": "application/json"}
+ENSEMBLE_MODEL_PATH = os.getenv('ENSEMBLE_MODEL_PATH', os.path.join(
+    os.path.dirname(__file__), '..', 'models', 'saved', 'ensemble_career_model.pkl'
+))
 
 
 def print_section(title):
@@ -172,9 +176,45 @@ def test_career_recommendation():
     print("✅ Career recommendation passed!")
 
 
+def test_fast_career_recommendation():
+    """Test ensemble-only (no LLM) career recommendation"""
+    print_section("TEST 5: Fast Career Recommendation")
+    
+    data = {
+        "scores": {
+            "AI": 82,
+            "Programming": 90,
+            "Math": 78,
+            "DataScience": 85
+        },
+        "interests": ["AI", "Research"],
+        "skills": ["Python", "Machine Learning", "TensorFlow"],
+        "semester": 4,
+        "mode": "fast"
+    }
+    
+    response = requests.post(
+        f"{BASE_URL}/ai/recommend-career",
+        headers=HEADERS,
+        json=data
+    )
+    
+    print_response(response)
+    
+    assert response.status_code == 200
+    result = response.json()
+    assert result["status"] == "success"
+    if os.path.exists(ENSEMBLE_MODEL_PATH):
+        # fast mode must answer from the trained model, never the LLM
+        assert result["data"]["source"] == "ensemble"
+    else:
+        print("⚠️  No trained ensemble model found, skipping the source check")
+    print("✅ Fast career recommendation passed!")
+
+
 def test_error_handling():
     """Test error handling"""
-    print_section("TEST 5: Error Handling")
+    print_section("TEST 6: Error Handling")
     
     print("\n📝 Testing missing data error...")
     response = requests.post(
@@ -208,6 +248,7 @@ def run_all_tests():
         test_quiz_evaluation()
         test_roadmap_generation()
         test_career_recommendation()
+        test_fast_career_recommendation()
         test_error_handling()
         
         print("\n" + "="*70)
@@ -0,0 +1,44 @@
+"""Tests for the clustered neighbour index"""
+
+import numpy as np
+import pytest
+from sklearn.neighbors import NearestNeighbors
+
+from data.balancing import ClusteredNeighbors
+
+
+def test_exclude_self_drops_own_index_among_duplicates():
+    rng = np.random.default_rng(0)
+    X = np.repeat(rng.normal(size=(40, 3)), 3, axis=0)  # Every point three times
+
+    distances, indices = ClusteredNeighbors(n_neighbors=2).fit(X).kneighbors()
+
+    assert indices.shape == (len(X), 2)
+    assert not (indices == np.arange(len(X))[:, None]).any()
+    # The two other copies are the nearest neighbours
+    assert np.array_equal(np.sort(indices // 3, axis=1), np.repeat(np.arange(40), 3)[:, None].repeat(2, axis=1))
+    assert np.allclose(distances, 0, atol=1e-6)
+
+
+def test_single_cluster_matches_exact_search():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(200, 4))
+
+    distances, indices = ClusteredNeighbors(n_neighbors=5).fit(X).kneighbors()
+    exact_distances, exact_indices = NearestNeighbors(n_neighbors=5).fit(X).kneighbors()
+
+    assert np.array_equal(indices, exact_indices)
+    assert np.allclose(distances, exact_distances)
+
+
+def test_external_queries_keep_every_neighbour():
+    X = np.array([0, 1, 3, 6, 10, 15], dtype=float).reshape(-1, 1)
+    index = ClusteredNeighbors(n_neighbors=2).fit(X)
+
+    assert np.array_equal(index.kneighbors(X[:3], return_distance=False), [[0, 1], [1, 0], [2, 1]])
+
+
+def test_too_many_neighbours_rejected():
+    index = ClusteredNeighbors(n_neighbors=3).fit(np.zeros((3, 2)))
+    with pytest.raises(ValueError, match='n_neighbors <= n_samples_fit'):
+        index.kneighbors()
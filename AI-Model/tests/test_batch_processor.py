@@ -0,0 +1,65 @@
+"""Tests for concurrent batch-analysis branches"""
+
+import time
+
+from models.batch_processor import BatchProcessor
+
+
+def _fail():
+    raise RuntimeError("boom")
+
+
+def test_run_branches_reports_each_outcome():
+    processor = BatchProcessor(max_workers=4)
+    results, report = processor.run_branches({
+        'quiz': lambda: {'score': 8},
+        'roadmap': lambda: {'milestones': [], 'error': 'GEMINI_API_KEY is missing'},
+        'career': _fail,
+        'slow': lambda: time.sleep(2) or {'late': True},
+    }, timeout=0.5)
+
+    assert results == {'quiz': {'score': 8}}
+    assert {name: entry['status'] for name, entry in report.items()} == {
+        'quiz': 'success', 'roadmap': 'error', 'career': 'error', 'slow': 'timeout'
+    }
+    assert report['roadmap']['error'] == 'GEMINI_API_KEY is missing'
+    assert report['career']['error'] == 'boom'
+
+
+def test_run_branches_runs_concurrently():
+    processor = BatchProcessor(max_workers=3)
+    started = time.time()
+    results, _ = processor.run_branches({name: (lambda: time.sleep(0.3) or {}) for name in 'abc'})
+    assert len(results) == 3
+    assert time.time() - started < 0.8
+
+
+def test_queued_branches_get_the_full_timeout_once_started():
+    # One worker is held by the slow branch; the fast ones queue for the other
+    processor = BatchProcessor(max_workers=2)
+    branches = {'slow': lambda: time.sleep(2.5) or {'late': True}}
+    branches.update({f'fast{n}': (lambda n=n: time.sleep(0.4) or {'n': n}) for n in range(3)})
+
+    results, report = processor.run_branches(branches, timeout=1.0)
+
+    assert results == {f'fast{n}': {'n': n} for n in range(3)}
+    assert report['slow'] == {'status': 'timeout', 'processing_time': report['slow']['processing_time']}
+    assert report['fast2']['processing_time'] >= 1.1  # started after 0.8s queued, then ran 0.4s
+
+
+def test_branches_that_never_start_are_cancelled():
+    processor = BatchProcessor(max_workers=1)
+    ran = []
+    started = time.time()
+
+    results, report = processor.run_branches({
+        'hog': lambda: time.sleep(1.0) or {},
+        'queued': lambda: ran.append(True) or {},
+    }, timeout=0.3)
+
+    assert results == {}
+    assert report['hog']['status'] == 'timeout' and 'queued' not in report['hog']
+    assert report['queued']['status'] == 'timeout' and report['queued']['queued']
+    assert time.time() - started < 0.8
+    processor.shutdown()
+    assert ran == []
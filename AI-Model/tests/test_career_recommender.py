@@ -0,0 +1,164 @@
+"""Tests for packed career recommendations and the per-profile cache"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import career_recommender
+from models.llm_cache import LLMResponseCache
+from models.llm_client import LLMClient
+
+
+class FakeAsyncClient(LLMClient):
+    """Answers prompts locally; packed prompts get one result per profile"""
+
+    def __init__(self, packed_valid=True):
+        self.api_key = 'test'
+        self.cache = LLMResponseCache()
+        self.single_flight = None
+        self.packed_valid = packed_valid
+        self.calls = []
+
+    def generate_json_many(self, prompts, context="", use_cache=True, return_exceptions=True):
+        flags = use_cache if isinstance(use_cache, list) else [use_cache] * len(prompts)
+        responses = []
+        for prompt, cache in zip(prompts, flags):
+            cached = self.get_cached_json(prompt) if cache else None
+            if cached is not None:
+                responses.append(cached)
+                continue
+            packed = 'EACH of the' in prompt
+            self.calls.append('packed' if packed else 'single')
+            if packed:
+                count = int(prompt.split('EACH of the ')[1].split()[0])
+                career = 'Packed' if self.packed_valid else None
+                response = {'results': [
+                    {'index': i, 'recommendations': [{'career': career}]} for i in range(count)
+                ]}
+            else:
+                response = {'recommendations': [{'career': 'Single'}]}
+            if cache:
+                self.set_cached_json(prompt, response)
+            responses.append(response)
+        return responses
+
+    def _generate_live(self, full_prompt, cache_key=None):
+        self.calls.append('single')
+        response = {'recommendations': [{'career': 'Single'}], 'careerReadiness': 'High'}
+        if cache_key:
+            self.cache.set(cache_key, response)
+        return response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    fake = FakeAsyncClient()
+    monkeypatch.setattr(career_recommender, 'get_async_llm_client', lambda: fake)
+    return fake
+
+
+def _requests(count):
+    return [{'scores': {'AI': 50 + 10 * i, 'Math': 70}, 'semester': 3} for i in range(count)]
+
+
+def _recommender(client):
+    recommender = career_recommender.CareerRecommender(default_mode='llm', pack_size=5)
+    recommender.llm = client
+    return recommender
+
+
+def test_packed_items_fill_the_per_profile_cache(client):
+    recommender = _recommender(client)
+    results = recommender.recommend_many(_requests(3))
+    assert [r['recommendations'][0]['career'] for r in results] == ['Packed'] * 3
+    assert client.calls == ['packed']
+
+    # The same profiles, alone or batched again, never reach the LLM
+    single = recommender.recommend(**_requests(3)[1])
+    assert single['recommendations'][0]['career'] == 'Packed'
+    recommender.recommend_many(_requests(3))
+    assert client.calls == ['packed']
+
+
+def test_invalid_packed_response_is_not_cached(client):
+    client.packed_valid = False
+    recommender = _recommender(client)
+    results = recommender.recommend_many(_requests(2))
+
+    # Both items are retried alone; only the single-profile answers are cached
+    assert client.calls == ['packed', 'single', 'single']
+    assert [r['recommendations'][0]['career'] for r in results] == ['Single'] * 2
+    assert client.cache.stats()['writes'] == 2
+
+
+def test_profiles_are_bucketed():
+    canonicalizer = career_recommender.ProfileCanonicalizer(score_band=5, semester_bucket=2)
+    assert [canonicalizer.score_band_label(score) for score in (72.4, 75, 100, 104, -3, '81', 'high')] == [
+        '70-75', '75-80', '95-100', '95-100', '0-5', '80-85', 'unknown'
+    ]
+    assert [canonicalizer.semester_label(semester) for semester in (1, 3, 4, 0, '7', None)] == [
+        '1-2', '3-4', '3-4', '1-2', '7-8', 'unknown'
+    ]
+    assert career_recommender.ProfileCanonicalizer(semester_bucket=1).semester_label(3) == '3'
+
+    first = canonicalizer.canonicalize({'Math': 83, 'AI': 71}, [' AI', 'Web '], ['python'], 3)
+    second = canonicalizer.canonicalize({'AI': 73.5, 'Math': 84.9}, ['web', 'ai', 'AI'], ['Python'], 4)
+    assert first == second == {
+        'semester': '3-4',
+        'scores': {'AI': '70-75', 'Math': '80-85'},
+        'interests': ['ai', 'web'],
+        'skills': ['python']
+    }
+    assert canonicalizer.canonicalize({'AI': 75, 'Math': 83}, semester=3) != canonicalizer.canonicalize(
+        {'AI': 74, 'Math': 83}, semester=3)
+
+
+def test_profiles_in_one_bucket_share_the_cache_but_not_their_fields(client, monkeypatch):
+    class FakeDatetime:
+        now = datetime(2024, 1, 1)
+
+        @classmethod
+        def utcnow(cls):
+            cls.now += timedelta(minutes=1)
+            return cls.now
+
+    monkeypatch.setattr(career_recommender, 'datetime', FakeDatetime)
+    recommender = _recommender(client)
+
+    first = recommender.recommend({'AI': 71, 'Math': 82}, semester=3)
+    second = recommender.recommend({'AI': 73.5, 'Math': 84}, semester=4)
+
+    assert client.calls == ['single']
+    assert first['recommendations'] == second['recommendations'] == [{'career': 'Single'}]
+    assert (first['avgScore'], second['avgScore']) == (76.5, 78.75)
+    assert (first['analysisDate'], second['analysisDate']) == ('2024-01-01T00:01:00Z', '2024-01-01T00:02:00Z')
+    # Per-request fields are stamped on copies, never on the cached payload
+    prompt = recommender._plan({'AI': 71, 'Math': 82}, None, None, 3, None).prompt
+    assert client.get_cached_json(prompt) == {'recommendations': [{'career': 'Single'}], 'careerReadiness': 'High'}
+
+
+@pytest.mark.parametrize('mode', ['llm', 'hybrid', 'fast'])
+def test_non_numeric_scores_return_the_error_result(client, mode):
+    recommender = _recommender(client)
+
+    result = recommender.recommend({'AI': 'high', 'Math': 70}, mode=mode)
+
+    assert result['recommendations'] == [] and result['avgScore'] == 0
+    assert 'unsupported operand' in result['error']
+    assert client.calls == []
+
+
+def test_malformed_llm_response_returns_the_error_result(client):
+    recommender = _recommender(client)
+    plan = recommender._plan({'AI': 70}, None, None, 3, None)
+
+    assert 'error' in plan.finish(['not', 'a', 'dict'])
+    assert plan.finish(RuntimeError('quota'))['error'] == 'quota'
+
+
+def test_one_bad_profile_does_not_fail_the_batch(client):
+    recommender = _recommender(client)
+    results = recommender.recommend_many(_requests(2) + [{'scores': {'AI': None}}])
+
+    assert [r['recommendations'][0]['career'] for r in results[:2]] == ['Packed'] * 2
+    assert 'error' in results[2]
@@ -0,0 +1,98 @@
+"""Tests for class-weighted ensemble training"""
+
+import os
+from collections import Counter
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+from sklearn.neural_network import MLPClassifier
+from sklearn.utils.class_weight import compute_sample_weight
+from sklearn.utils.validation import has_fit_parameter
+
+import train_advanced
+from models import ensemble_recommender
+from models.ensemble_recommender import EnsembleCareerRecommender, OversamplingWeightAdapter
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'real_training_data.csv')
+
+
+class RecordingClassifier(ClassifierMixin, BaseEstimator):
+    def fit(self, X, y):
+        self.classes_ = np.unique(y)
+        self.fitted_counts_ = Counter(y.tolist())
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.classes_[0])
+
+
+def _small_models(self):
+    return (
+        RandomForestClassifier(n_estimators=10, class_weight='balanced', random_state=0),
+        GradientBoostingClassifier(n_estimators=10, random_state=0),
+        MLPClassifier(hidden_layer_sizes=(8,), max_iter=50, random_state=0)
+    )
+
+
+@pytest.fixture
+def pinned_sklearn(monkeypatch):
+    """Small models, and an MLPClassifier without sample_weight as in scikit-learn < 1.7"""
+    monkeypatch.setattr(EnsembleCareerRecommender, 'create_base_models', _small_models)
+    monkeypatch.setattr(
+        ensemble_recommender, 'has_fit_parameter',
+        lambda model, name: not isinstance(model, MLPClassifier) and has_fit_parameter(model, name)
+    )
+
+
+def test_adapter_oversamples_to_balanced_classes():
+    y = np.array(['a'] * 90 + ['b'] * 10)
+    X = np.arange(len(y)).reshape(-1, 1)
+
+    adapter = OversamplingWeightAdapter(RecordingClassifier())
+    adapter.fit(X, y, sample_weight=compute_sample_weight('balanced', y))
+    assert adapter.estimator_.fitted_counts_ == {'a': 90, 'b': 90}
+
+    adapter.fit(X, y)
+    assert adapter.estimator_.fitted_counts_ == {'a': 90, 'b': 10}
+
+
+def test_adapter_repeats_fractional_weights_on_average():
+    y = np.array([0, 1] * 5000)
+    weight = np.where(y == 1, 2.5, 1.0)
+
+    adapter = OversamplingWeightAdapter(RecordingClassifier()).fit(np.zeros((len(y), 1)), y, sample_weight=weight)
+    assert adapter.estimator_.fitted_counts_[0] == 5000
+    assert adapter.estimator_.fitted_counts_[1] == pytest.approx(12500, rel=0.02)
+
+
+@pytest.mark.filterwarnings('ignore::sklearn.exceptions.ConvergenceWarning')
+def test_class_weight_wraps_only_models_without_sample_weight(pinned_sklearn):
+    df = pd.read_csv(DATA_PATH)
+    recommender = EnsembleCareerRecommender()
+
+    accuracy = recommender.train(df.drop('career', axis=1), df['career'], class_weight='balanced')
+
+    assert 0 <= accuracy <= 1
+    fitted = recommender.ensemble_model.named_estimators_
+    assert isinstance(fitted['neural_network'], OversamplingWeightAdapter)
+    assert isinstance(fitted['random_forest'], RandomForestClassifier)
+    assert fitted['random_forest'].class_weight is None
+    assert isinstance(fitted['gradient_boosting'], GradientBoostingClassifier)
+
+
+@pytest.mark.filterwarnings('ignore::sklearn.exceptions.ConvergenceWarning')
+def test_train_advanced_class_weight_end_to_end(pinned_sklearn, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('sys.argv', ['train_advanced.py', '--data', os.path.abspath(DATA_PATH),
+                                     '--balance', 'class_weight', '--no-cache'])
+
+    train_advanced.main()
+
+    model_data = joblib.load(tmp_path / 'models' / 'saved' / 'ensemble_career_model.pkl')
+    model = model_data['ensemble_model']
+    assert isinstance(model.named_estimators_['neural_network'], OversamplingWeightAdapter)
+    assert len(model.predict(np.zeros((2, model.n_features_in_)))) == 2
@@ -0,0 +1,158 @@
+"""Tests for the columnar feature store, quantile sketches and stage cache"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data.feature_store import ColumnarFeatureStore, QuantileSketch, StageCache
+
+
+def _rank_error(sketch, values, points=1001):
+    """Largest gap between each reference point's true rank and its target quantile"""
+    ordered = np.sort(values)
+    targets = (np.arange(points) + 0.5) / points
+    ranks = np.searchsorted(ordered, sketch.reference(points), side='right') / len(ordered)
+    return np.abs(ranks - targets).max()
+
+
+def test_sketch_is_exact_until_it_compacts():
+    values = np.random.default_rng(0).normal(70, 10, 1000)
+    sketch = QuantileSketch(k=2048)
+    sketch.update(values[:400])
+    sketch.update(np.append(values[400:], np.nan))
+
+    np.testing.assert_array_equal(sketch.reference(), np.sort(values))
+    assert sketch.count == 1000
+    assert sketch.mean() == pytest.approx(values.mean())
+    assert sketch.std() == pytest.approx(values.std(ddof=1))
+
+
+@pytest.mark.parametrize('k', [64, 256, 1024])
+@pytest.mark.parametrize('order', ['random', 'sorted'])
+def test_sketch_rank_error_is_bounded(k, order):
+    values = np.random.default_rng(k).normal(70, 10, 200000)
+    if order == 'sorted':
+        values = np.sort(values)
+    sketch = QuantileSketch(k)
+    for chunk in np.array_split(values, 37):
+        sketch.update(chunk)
+
+    assert len(sketch.levels) > 1
+    assert all(len(items) <= k for items in sketch.levels)
+    assert _rank_error(sketch, values) <= 2 / k
+    # Mean and deviation come from exact running sums, not the sample
+    assert sketch.mean() == pytest.approx(values.mean())
+    assert sketch.std() == pytest.approx(values.std(ddof=1))
+
+
+def test_merged_sketches_keep_the_bound():
+    values = np.random.default_rng(1).uniform(0, 100, 200000)
+    parts = [QuantileSketch(256) for _ in range(4)]
+    for part, chunk in zip(parts, np.array_split(values, 4)):
+        part.update(chunk)
+    merged = parts[0]
+    for part in parts[1:]:
+        merged.merge(part)
+
+    assert merged.count == len(values)
+    assert _rank_error(merged, values) <= 2 / 256
+
+
+def _chunk(start, n, careers):
+    rng = np.random.default_rng(start)
+    return pd.DataFrame({
+        'score': rng.normal(70, 10, n).astype(np.float32),
+        'total': rng.normal(0, 1, n),
+        'flag': rng.integers(0, 2, n, dtype=np.int8),
+        'semester': rng.integers(1, 9, n, dtype=np.uint8),
+        'career': rng.choice(careers, n)
+    })
+
+
+def test_store_round_trips_through_memmaps(tmp_path):
+    chunks = [_chunk(0, 500, ['AI Engineer', 'Data Scientist']),
+              _chunk(1, 300, ['Web Developer', 'AI Engineer'])]
+    store = ColumnarFeatureStore.create(str(tmp_path / 'store'))
+    for chunk in chunks:
+        store.append(chunk)
+    assert not ColumnarFeatureStore(str(tmp_path / 'store')).complete  # No manifest yet
+    store.finalize(source='test.csv')
+
+    loaded = ColumnarFeatureStore(str(tmp_path / 'store'))
+    expected = pd.concat(chunks, ignore_index=True)
+    assert loaded.complete and loaded.rows == 800
+    assert loaded.columns == list(expected.columns)
+    assert loaded.metadata == {'source': 'test.csv'}
+    pd.testing.assert_frame_equal(loaded.to_frame(), expected)
+
+    for name in ['score', 'total', 'flag', 'semester']:
+        column = loaded.column(name)
+        assert isinstance(column, np.memmap) and not column.flags.writeable
+        assert column.dtype == expected[name].dtype
+    # Strings are stored as int16 codes; labels grow as later chunks add values
+    assert loaded.manifest['columns']['career'] == 'int16'
+    assert loaded.manifest['labels']['career'] == ['AI Engineer', 'Data Scientist', 'Web Developer']
+    assert (tmp_path / 'store' / 'career.bin').stat().st_size == 800 * 2
+    pd.testing.assert_frame_equal(loaded.to_frame(['flag', 'score']), expected[['flag', 'score']])
+
+
+def test_store_rejects_mismatched_chunks(tmp_path):
+    store = ColumnarFeatureStore.create(str(tmp_path / 'store'))
+    store.append(_chunk(0, 10, ['AI Engineer']))
+    with pytest.raises(ValueError):
+        store.append(_chunk(1, 10, ['AI Engineer']).drop(columns='flag'))
+
+
+def test_empty_store_and_recreate(tmp_path):
+    path = str(tmp_path / 'store')
+    store = ColumnarFeatureStore.create(path)
+    store.append(_chunk(0, 0, ['AI Engineer']))
+    store.finalize()
+    assert ColumnarFeatureStore(path).to_frame().empty
+
+    ColumnarFeatureStore.create(path)  # Replaces the finished store
+    assert not ColumnarFeatureStore(path).complete
+
+
+def _frame(n, seed=0):
+    return _chunk(seed, n, ['AI Engineer', 'Data Scientist'])
+
+
+def test_stage_keys_chain_parent_params_and_code():
+    key = StageCache.stage_key('input', 'labels', {}, 'code')
+    assert key == StageCache.stage_key('input', 'labels', {}, 'code')
+    assert key != StageCache.stage_key('changed', 'labels', {}, 'code')
+    assert key != StageCache.stage_key('input', 'labels', {'n_std': 3}, 'code')
+    assert key != StageCache.stage_key('input', 'labels', {}, 'new code')
+    assert StageCache.stage_key(key, 'features') != StageCache.stage_key(
+        StageCache.stage_key('changed', 'labels', {}, 'code'), 'features')
+
+
+def test_stage_cache_round_trip(tmp_path):
+    cache = StageCache(str(tmp_path / 'cache'))
+    df = _frame(50)
+    assert cache.load('features', 'a' * 40) is None and not cache.has('features', 'a' * 40)
+
+    cache.save('features', 'a' * 40, df.iloc[10:])
+
+    assert cache.has('features', 'a' * 40)
+    pd.testing.assert_frame_equal(cache.load('features', 'a' * 40), df.iloc[10:].reset_index(drop=True))
+
+
+def test_prune_keeps_the_most_recently_used_entries(tmp_path):
+    cache = StageCache(str(tmp_path / 'cache'), keep=2)
+    keys = [str(n) * 40 for n in range(4)]
+    for age, key in zip([400, 300, 200], keys):
+        cache.save('features', key, _frame(5))
+        os.utime(cache._path('features', key), (time.time() - age,) * 2)
+    cache.save('labels', keys[3], _frame(5))  # Another stage's entry is not counted
+
+    assert not cache.has('features', keys[0])  # Pruned when the third entry was saved
+    cache.load('features', keys[1])  # Used now, so newer than keys[2]
+    cache.save('features', keys[3], _frame(5))
+
+    assert [cache.has('features', key) for key in keys] == [False, True, False, True]
+    assert cache.has('labels', keys[3])
@@ -0,0 +1,189 @@
+"""Tests for the training data processor"""
+
+import logging
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmark_career_assignments import legacy_assign_careers, synthetic_rows
+from data import feature_store
+from data.feature_store import QuantileSketch
+from data.improved_processor import OUTLIER_METHODS, RAW_DTYPES, SCORE_COLUMNS, ImprovedDataProcessor
+
+SCORES = ['avg_ai_score', 'avg_math_score']
+
+
+@pytest.fixture
+def processor():
+    return ImprovedDataProcessor()
+
+
+def _scores(n=500, seed=3):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.normal(70, 8, n) for col in SCORES})
+    df.loc[[5, 50], 'avg_ai_score'] = [150.0, -20.0]
+    df.loc[100, 'avg_math_score'] = 160.0
+    return df
+
+
+def _legacy_remove_outliers(df, columns, n_std=3):
+    """The original column-by-column z-score loop"""
+    for col in columns:
+        df = df[np.abs((df[col] - df[col].mean()) / df[col].std()) < n_std]
+    return df
+
+
+def test_default_is_the_original_sequential_filter(processor):
+    df = _scores()
+    kept = processor.remove_outliers(df, SCORES)
+    pd.testing.assert_frame_equal(kept, _legacy_remove_outliers(df, SCORES))
+    assert not kept.index.isin([5, 50, 100]).any()
+
+
+@pytest.mark.parametrize('method', OUTLIER_METHODS)
+def test_one_pass_mask_drops_planted_outliers(processor, method):
+    df = _scores()
+    kept = processor.remove_outliers(df, SCORES, method=method, sequential=False)
+    assert not kept.index.isin([5, 50, 100]).any()
+    assert len(kept) >= len(df) * 0.95
+
+
+@pytest.mark.parametrize('method', OUTLIER_METHODS)
+def test_zero_spread_does_not_drop_every_row(processor, method):
+    # 90 of 100 scores are equal, so the MAD (and the IQR) is 0
+    df = pd.DataFrame({'avg_ai_score': [70.0] * 90 + list(np.linspace(60, 80, 9)) + [200.0]})
+    for sequential in (True, False):
+        kept = processor.remove_outliers(df, ['avg_ai_score'], method=method, sequential=sequential)
+        assert len(kept) >= 90
+        assert 99 not in kept.index
+
+
+@pytest.mark.parametrize('method', OUTLIER_METHODS)
+def test_constant_column_keeps_every_row(processor, method):
+    df = pd.DataFrame({'avg_ai_score': [70.0] * 10, 'avg_math_score': np.linspace(60, 80, 10)})
+    assert len(processor.remove_outliers(df, SCORES, method=method, sequential=False)) == 10
+
+
+def test_mad_zero_falls_back_to_mean_absolute_deviation(processor):
+    df = pd.DataFrame({'avg_ai_score': [70.0] * 60 + [60.0, 80.0] * 20})
+    median, scale = processor.outlier_stats(df, ['avg_ai_score'], 'mad')['avg_ai_score']
+    assert median == 70.0
+    assert scale == pytest.approx(4.0 * 1.253314 * 0.6745)
+
+
+@pytest.mark.parametrize('method', OUTLIER_METHODS)
+def test_sketch_stats_match_exact_stats(processor, method):
+    df = _scores(n=2000)
+    sketches = {col: QuantileSketch() for col in SCORES}
+    for col in SCORES:
+        sketches[col].update(df[col].to_numpy())
+
+    exact = processor.outlier_stats(df, SCORES, method)
+    sketched = processor.outlier_stats_from_sketches(sketches, method)
+    for col in SCORES:
+        assert sketched[col] == pytest.approx(exact[col])
+
+
+def test_assign_careers_matches_the_row_by_row_rules():
+    df = synthetic_rows(20000)
+    np.testing.assert_array_equal(ImprovedDataProcessor.assign_careers(df), legacy_assign_careers(df))
+
+
+def test_assign_careers_handles_missing_scores():
+    df = synthetic_rows(2000, seed=5)
+    df.loc[df.sample(frac=0.2, random_state=1).index, 'avg_programming_score'] = np.nan
+    np.testing.assert_array_equal(ImprovedDataProcessor.assign_careers(df), legacy_assign_careers(df))
+
+
+def _training_csv(tmp_path, n=3000):
+    df = synthetic_rows(n, seed=11)
+    df.loc[[7, 70], 'avg_math_score'] = [400.0, -250.0]
+    path = tmp_path / 'training.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_streaming_matches_the_in_memory_pipeline(processor, tmp_path):
+    csv_path = _training_csv(tmp_path)
+    store, references = processor.process_streaming(csv_path, str(tmp_path / 'store'), chunk_size=700,
+                                                     remove_outliers_flag=False)
+
+    # Small enough for exact sketches, so chunked percentiles rank against the whole dataset
+    df = pd.read_csv(csv_path, dtype=RAW_DTYPES)
+    _, _, expected = processor.process_full_pipeline(df, balance_data=False, remove_outliers_flag=False)
+    pd.testing.assert_frame_equal(store.to_frame(), ImprovedDataProcessor.compact_features(expected))
+    for column in SCORE_COLUMNS:
+        np.testing.assert_array_equal(references[column], np.sort(df[column].to_numpy()))
+
+
+@pytest.mark.parametrize('method', OUTLIER_METHODS)
+def test_streaming_drops_the_same_outliers(processor, tmp_path, method):
+    csv_path = _training_csv(tmp_path)
+    store, _ = processor.process_streaming(csv_path, str(tmp_path / 'store'), chunk_size=700,
+                                           outlier_method=method)
+
+    df = pd.read_csv(csv_path, dtype=RAW_DTYPES)
+    _, _, expected = processor.process_full_pipeline(df, balance_data=False, outlier_method=method,
+                                                     one_pass_outliers=True)
+    # Percentiles differ by design: the stream ranks against the data before outlier removal
+    columns = [column for column in store.columns if not column.endswith('_percentile')]
+    assert store.rows == len(expected) < 3000
+    pd.testing.assert_frame_equal(store.to_frame(columns),
+                                  ImprovedDataProcessor.compact_features(expected)[columns].reset_index(drop=True))
+
+
+def _run_cached(processor, csv_path, cache_dir, caplog):
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger='data.improved_processor'):
+        X, y, processed_df = processor.process_cached(csv_path, cache_dir, balance_method='random')
+    messages = [record.getMessage() for record in caplog.records]
+    loaded = [message.split("'")[1] for message in messages if message.startswith('✓ Loaded cached')]
+    computed = [message.split("'")[1] for message in messages if message.endswith('computed and cached')]
+    return (X, y, processed_df), loaded, computed
+
+
+def test_cached_pipeline_resumes_after_the_last_cached_stage(processor, tmp_path, caplog):
+    csv_path = _training_csv(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+
+    first, loaded, computed = _run_cached(processor, csv_path, cache_dir, caplog)
+    assert (loaded, computed) == ([], ['labels', 'outliers', 'features', 'balanced'])
+
+    second, loaded, computed = _run_cached(processor, csv_path, cache_dir, caplog)
+    assert (loaded, computed) == (['balanced'], [])
+    for cached, fresh in zip(second, first):
+        pd.testing.assert_frame_equal(pd.DataFrame(cached), pd.DataFrame(fresh), check_dtype=False)
+
+    # A stage whose entry is gone is recomputed from the one before it
+    shutil.rmtree(next((tmp_path / 'cache').glob('balanced-*')))
+    _, loaded, computed = _run_cached(processor, csv_path, cache_dir, caplog)
+    assert (loaded, computed) == (['features'], ['balanced'])
+
+
+def test_changed_input_invalidates_every_stage(processor, tmp_path, caplog):
+    csv_path = _training_csv(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    _run_cached(processor, csv_path, cache_dir, caplog)
+
+    df = pd.read_csv(csv_path)
+    df.loc[0, 'avg_ai_score'] += 1
+    df.to_csv(csv_path, index=False)
+
+    _, loaded, computed = _run_cached(processor, csv_path, cache_dir, caplog)
+    assert (loaded, computed) == ([], ['labels', 'outliers', 'features', 'balanced'])
+
+
+def test_changed_stage_code_invalidates_that_stage_and_later_ones(processor, tmp_path, caplog, monkeypatch):
+    csv_path = _training_csv(tmp_path)
+    cache_dir = str(tmp_path / 'cache')
+    _run_cached(processor, csv_path, cache_dir, caplog)
+
+    # As if engineer_features had been edited
+    original = feature_store.code_fingerprint
+    monkeypatch.setattr(feature_store, 'code_fingerprint', lambda functions: original(functions) + (
+        '-edited' if processor.engineer_features in functions else ''))
+
+    _, loaded, computed = _run_cached(processor, csv_path, cache_dir, caplog)
+    assert (loaded, computed) == (['outliers'], ['features', 'balanced'])
@@ -0,0 +1,144 @@
+"""Tests for the JSON providers and response compression"""
+
+import gzip
+import json
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from flask import Flask, Response, jsonify, request
+
+from models import json_provider
+from models.json_provider import NumpyJSONProvider, OrjsonProvider, ResponseCompressor
+
+pytest.importorskip('orjson')
+
+VALUES = [
+    np.int64(3), np.int8(-2), np.uint16(7), np.float64(0.1), np.bool_(True),
+    np.arange(4), np.array([[1.5, 2.0], [3.25, -4.0]]), np.array([True, False]),
+    float('nan'), np.float64('nan'), float('inf'), np.array([1.0, np.nan, -np.inf]),
+    datetime(2024, 1, 2, 3, 4, 5), datetime(2024, 1, 2, tzinfo=timezone.utc), date(2024, 1, 2),
+    {'score': np.float64(0.75), 'ok': np.bool_(False), 'nested': [np.int32(1), {'x': np.nan}]},
+    {2: 'b', 1: 'a'},
+]
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+@pytest.mark.parametrize('value', VALUES, ids=lambda value: type(value).__name__)
+def test_orjson_output_matches_the_stdlib_provider(app, value):
+    stdlib = NumpyJSONProvider(app).dumps(value)
+    fast = OrjsonProvider(app).dumps(value)
+    assert json.loads(fast) == json.loads(stdlib)
+
+
+def test_non_finite_floats_are_valid_json(app):
+    for provider in (NumpyJSONProvider(app), OrjsonProvider(app)):
+        assert json.loads(provider.dumps([float('nan'), np.array([np.inf])])) == [None, [None]]
+
+
+def test_float32_keeps_its_value(app):
+    parsed = json.loads(OrjsonProvider(app).dumps(np.array([0.1, 2.5], dtype=np.float32)))
+    assert np.array_equal(np.float32(parsed), np.array([0.1, 2.5], dtype=np.float32))
+
+
+def test_orjson_response_sorts_keys_like_flask(app):
+    app.json = OrjsonProvider(app)
+    with app.app_context():
+        response = app.json.response({'b': np.int64(1), 'a': np.arange(2)})
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == b'{"a":[0,1],"b":1}\n'
+
+
+def _client(app, compressor):
+    @app.after_request
+    def compress(response):
+        return compressor.compress(response, request.accept_encodings)
+
+    @app.route('/json/<int:size>')
+    def sized(size):
+        return jsonify({'data': 'x' * size})
+
+    @app.route('/stream')
+    def stream():
+        return Response((chunk for chunk in ['{"data": "', 'x' * 5000, '"}']), mimetype='application/json')
+
+    @app.route('/encoded')
+    def encoded():
+        response = jsonify({'data': 'x' * 5000})
+        response.set_data(gzip.compress(response.get_data()))
+        response.headers['Content-Encoding'] = 'gzip'
+        return response
+
+    @app.route('/text')
+    def text():
+        return 'x' * 5000
+
+    return app.test_client()
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(json_provider, 'brotli', None)
+
+
+@pytest.fixture
+def fake_brotli(monkeypatch):
+    monkeypatch.setattr(json_provider, 'brotli', SimpleNamespace(compress=lambda body, quality: b'br:' + body))
+
+
+def test_bodies_below_the_threshold_are_sent_as_is(app, no_brotli):
+    client = _client(app, ResponseCompressor(min_size=1024))
+
+    small = client.get('/json/100', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    assert small.json == {'data': 'x' * 100}
+    assert 'Accept-Encoding' in small.headers['Vary']
+
+    large = client.get('/json/1024', headers={'Accept-Encoding': 'gzip'})
+    assert large.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(large.data)) == {'data': 'x' * 1024}
+    assert 'Accept-Encoding' in large.headers['Vary']
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('gzip', 'gzip'),
+    ('br, gzip', 'gzip'),
+    ('br', None),
+    ('identity', None),
+    ('', None),
+])
+def test_encoding_choice_without_brotli(app, no_brotli, accept, expected):
+    client = _client(app, ResponseCompressor(min_size=10))
+    response = client.get('/json/5000', headers={'Accept-Encoding': accept})
+    assert response.headers.get('Content-Encoding') == expected
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+
+@pytest.mark.parametrize('accept, expected', [
+    ('br, gzip', 'br'),
+    ('gzip;q=0.5, br', 'br'),
+    ('br;q=0.1, gzip', 'gzip'),
+    ('gzip', 'gzip'),
+])
+def test_encoding_choice_with_brotli(app, fake_brotli, accept, expected):
+    client = _client(app, ResponseCompressor(min_size=10))
+    response = client.get('/json/5000', headers={'Accept-Encoding': accept})
+    assert response.headers['Content-Encoding'] == expected
+    if expected == 'br':
+        assert json.loads(response.data[3:]) == {'data': 'x' * 5000}
+
+
+@pytest.mark.parametrize('path', ['/stream', '/encoded', '/text'])
+def test_streamed_encoded_and_non_json_responses_are_skipped(app, no_brotli, path):
+    client = _client(app, ResponseCompressor(min_size=10))
+    response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+    if path == '/encoded':
+        assert json.loads(gzip.decompress(response.data)) == {'data': 'x' * 5000}
+    else:
+        assert 'Content-Encoding' not in response.headers
+        assert len(response.data) >= 5000
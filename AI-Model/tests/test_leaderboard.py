@@ -0,0 +1,116 @@
+"""Tests for leaderboard ordering and ranks"""
+
+import random
+
+import pytest
+
+from models.leaderboard import LEADERBOARD_METRICS, LeaderboardIndex
+from models.progress_store import ProgressStore, ShardedProgressStore
+
+# user -> quiz percentages; carol and dave tie on score, bob and erin on quizzes
+QUIZZES = {
+    'alice': [90.0, 80.0],
+    'bob': [60.0],
+    'carol': [85.0, 75.0, 80.0],
+    'dave': [80.0],
+    'erin': [40.0]
+}
+
+
+def _quiz(n, percentage):
+    return {'timestamp': f'2024-01-01T00:00:{n:02d}', 'subject': 'AI', 'percentage': percentage}
+
+
+@pytest.fixture(params=['sqlite', 'sharded'])
+def store(request, tmp_path):
+    if request.param == 'sharded':
+        store = ShardedProgressStore(str(tmp_path / 'progress'))
+    else:
+        store = ProgressStore(str(tmp_path / 'progress.db'))
+    for user_id, percentages in QUIZZES.items():
+        for n, percentage in enumerate(percentages):
+            store.append(user_id, 'quizzes', _quiz(n, percentage))
+    store.append('erin', 'roadmaps', {'timestamp': '2024-01-01T01:00:00', 'milestones_count': 3})
+    return store
+
+
+def _users(rows):
+    return [row['user_id'] for row in rows]
+
+
+def test_orders_by_metric_with_ties_by_user_id(store):
+    assert _users(store.leaderboard('score')) == ['alice', 'carol', 'dave', 'bob', 'erin']
+    assert _users(store.leaderboard('quizzes')) == ['carol', 'alice', 'bob', 'dave', 'erin']
+    assert _users(store.leaderboard('activity')) == ['carol', 'alice', 'erin', 'bob', 'dave']
+    # Unknown metrics rank by activity
+    assert store.leaderboard('unknown') == store.leaderboard('activity')
+    assert store.leaderboard('score', limit=1) == [
+        {'user_id': 'alice', 'average_score': 85.0, 'total_quizzes': 2, 'total_activity': 2}
+    ]
+
+
+def test_ties_share_the_best_rank(store):
+    assert store.user_rank('carol', 'score') == (2, 5)
+    assert store.user_rank('dave', 'score') == (2, 5)
+    assert store.user_rank('bob', 'score') == (4, 5)
+    assert store.user_rank('bob', 'quizzes') == (3, 5)
+    assert store.user_rank('dave', 'quizzes') == (3, 5)
+    assert store.user_rank('nobody', 'score') == (None, 5)
+
+
+def test_offset_pages_cover_the_ranking_once(store):
+    pages = [store.leaderboard('score', limit=2, offset=offset) for offset in (0, 2, 4, 6)]
+
+    assert [_users(page) for page in pages] == [['alice', 'carol'], ['dave', 'bob'], ['erin'], []]
+
+
+def test_rank_follows_updates(store):
+    store.leaderboard('score')  # builds the sharded backend's index before the updates
+
+    store.append('erin', 'quizzes', _quiz(10, 100.0))
+    store.append('erin', 'quizzes', _quiz(11, 100.0))
+
+    assert store.user_rank('erin', 'score') == (2, 5)  # (40 + 100 + 100) / 3 ties carol and dave
+    assert store.user_rank('alice', 'score') == (1, 5)
+    assert store.user_rank('erin', 'quizzes') == (1, 5)
+    assert store.user_rank('erin', 'activity') == (1, 5)
+    assert _users(store.leaderboard('activity', limit=2)) == ['erin', 'carol']
+
+    store.append('frank', 'roadmaps', {'timestamp': '2024-01-01T02:00:00', 'milestones_count': 1})
+    assert store.user_rank('frank', 'activity') == (4, 6)  # ties bob and dave
+    assert store.user_rank('frank', 'score') == (6, 6)
+
+
+def _expected(totals, field):
+    def value(user_id):
+        quizzes, percentage_sum, activity = totals[user_id]
+        return {'average_score': percentage_sum / quizzes if quizzes else 0,
+                'total_quizzes': quizzes, 'total_activity': activity}[field]
+    return sorted(totals, key=lambda user_id: (-value(user_id), user_id)), value
+
+
+def test_index_stays_sorted_as_totals_change():
+    rng = random.Random(7)
+    index = LeaderboardIndex()
+    index.load([{'user_id': 'seed', 'average_score': 50.0, 'total_quizzes': 2, 'total_activity': 3}])
+    totals = {'seed': [2, 100.0, 3]}
+
+    for _ in range(500):
+        user_id = f'u{rng.randrange(40)}'
+        kind = rng.choice(['quizzes', 'quizzes', 'roadmaps'])
+        percentage = float(rng.randrange(0, 101, 10))
+        index.record(user_id, kind, {'percentage': percentage})
+        user = totals.setdefault(user_id, [0, 0.0, 0])
+        user[2] += 1
+        if kind == 'quizzes':
+            user[0] += 1
+            user[1] += percentage
+
+    assert len(index) == len(totals)
+    for metric, field in LEADERBOARD_METRICS.items():
+        order, value = _expected(totals, field)
+        # Each user appears once: stale keys were removed as totals moved
+        assert _users(index.top(metric, limit=len(totals) + 5)) == order
+        for user_id in totals:
+            better = sum(value(other) > value(user_id) for other in totals)
+            assert index.rank(user_id, metric) == better + 1
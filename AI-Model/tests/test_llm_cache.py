@@ -0,0 +1,66 @@
+"""Tests for the LLM response cache"""
+
+from models import llm_cache
+from models.llm_cache import LLMResponseCache
+
+
+def test_make_key_ignores_whitespace():
+    key = LLMResponseCache.make_key("Recommend  careers\n\tfor a student", {'model': 'gemini'})
+    assert key == LLMResponseCache.make_key("Recommend careers for a student", {'model': 'gemini'})
+
+
+def test_make_key_depends_on_prompt_and_config():
+    key = LLMResponseCache.make_key("prompt", {'model': 'gemini', 'temperature': 0.2})
+    assert key != LLMResponseCache.make_key("other prompt", {'model': 'gemini', 'temperature': 0.2})
+    assert key != LLMResponseCache.make_key("prompt", {'model': 'gemini', 'temperature': 0.7})
+    # Config key order does not matter
+    assert key == LLMResponseCache.make_key("prompt", {'temperature': 0.2, 'model': 'gemini'})
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now[0])
+    cache = LLMResponseCache(ttl=60)
+    cache.set('key', {'careers': ['Data Scientist']})
+
+    now[0] += 59
+    assert cache.get('key') == {'careers': ['Data Scientist']}
+
+    now[0] += 2
+    assert cache.get('key') is None
+    stats = cache.stats()
+    assert stats['expirations'] == 1
+    assert stats['hits'] == 1 and stats['misses'] == 1
+
+
+def test_get_returns_a_copy():
+    cache = LLMResponseCache()
+    cache.set('key', {'careers': ['Data Scientist']})
+    cache.get('key')['careers'].append('AI Engineer')
+    assert cache.get('key') == {'careers': ['Data Scientist']}
+
+
+def test_lru_eviction():
+    cache = LLMResponseCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_disk_tier_respects_ttl(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now[0])
+    cache = LLMResponseCache(ttl=60, backend='disk', cache_dir=str(tmp_path))
+    cache.set('abcdef', {'ok': True})
+
+    # A fresh process only has the disk tier
+    fresh = LLMResponseCache(ttl=60, backend='disk', cache_dir=str(tmp_path))
+    assert fresh.get('abcdef') == {'ok': True}
+
+    now[0] += 61
+    other = LLMResponseCache(ttl=60, backend='disk', cache_dir=str(tmp_path))
+    assert other.get('abcdef') is None
@@ -0,0 +1,111 @@
+"""Tests for the single-pass payload limits"""
+
+import json
+
+import pytest
+
+from models.payload_validator import PayloadValidationError, PayloadValidator
+
+
+def _nested(levels):
+    document = {'leaf': 1}
+    for _ in range(levels - 1):
+        document = {'child': document}
+    return document
+
+
+@pytest.fixture
+def validator():
+    return PayloadValidator(max_depth=3, max_keys=4, max_list_len=3, max_str_len=10)
+
+
+def test_valid_payload_parses_unchanged(validator):
+    payload = {'user_id': 'u1', 'scores': [1, 2, {'x': 'short'}], 'meta': {'a': {'b': None}}}
+    assert validator.loads(json.dumps(payload)) == payload
+
+
+def test_limits_are_inclusive(validator):
+    payload = {'a': 'x' * 10, 'b': [1, 2, 3], 'c': _nested(2), 'd': True}
+    assert validator.loads(json.dumps(payload)) == payload
+
+
+def test_too_many_fields(validator):
+    with pytest.raises(PayloadValidationError, match='Too many fields'):
+        validator.loads(json.dumps({str(i): i for i in range(5)}))
+
+
+def test_string_too_long_names_the_field(validator):
+    with pytest.raises(PayloadValidationError, match="Field 'answer' too long"):
+        validator.loads(json.dumps({'answer': 'x' * 11}))
+
+
+def test_string_inside_list_is_checked(validator):
+    with pytest.raises(PayloadValidationError, match="Field 'answers' too long"):
+        validator.loads(json.dumps({'answers': ['ok', 'x' * 11]}))
+
+
+def test_list_too_long_names_the_field(validator):
+    with pytest.raises(PayloadValidationError, match="List 'answers' too long"):
+        validator.loads(json.dumps({'answers': [1, 2, 3, 4]}))
+
+
+@pytest.mark.parametrize('payload', [
+    _nested(4),
+    {'a': [[{'b': 1}]]},
+    [[[[1]]]],
+])
+def test_nested_too_deeply(validator, payload):
+    with pytest.raises(PayloadValidationError, match='Payload nested too deeply'):
+        validator.loads(json.dumps(payload))
+
+
+def test_max_depth_accepted(validator):
+    for payload in (_nested(3), {'a': [{'b': 1}]}, [[[1]]]):
+        assert validator.loads(json.dumps(payload)) == payload
+
+
+def test_top_level_list_length_and_strings_are_checked(validator):
+    with pytest.raises(PayloadValidationError, match="List 'None' too long"):
+        validator.loads('[1, 2, 3, 4]')
+    with pytest.raises(PayloadValidationError, match="Field 'None' too long"):
+        validator.loads(json.dumps(['x' * 11]))
+
+
+def test_recursion_limit_is_reported_as_too_deep():
+    with pytest.raises(PayloadValidationError, match='Payload nested too deeply'):
+        PayloadValidator(max_depth=10 ** 6).loads('[' * 100000 + ']' * 100000)
+
+
+def test_invalid_json_is_a_plain_value_error(validator):
+    with pytest.raises(ValueError) as info:
+        validator.loads('{"a": ')
+    assert not isinstance(info.value, PayloadValidationError)
+
+
+@pytest.fixture(params=['stdlib', 'orjson'])
+def client(request, validator):
+    from flask import Flask
+    from flask import request as flask_request
+
+    from models.json_provider import JSON_PROVIDERS, orjson
+
+    if request.param == 'orjson' and orjson is None:
+        pytest.skip('orjson not installed')
+    app = Flask(__name__)
+    app.json = JSON_PROVIDERS[request.param](app)
+    app.json.payload_validator = validator
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return {'body': flask_request.get_json()}
+
+    return app.test_client()
+
+
+def test_request_bodies_are_parsed_by_the_validator(client, validator):
+    assert client.post('/echo', json={'a': [1, 2]}).get_json() == {'body': {'a': [1, 2]}}
+    # Flask hands app.json to every request; its loads applies the limits
+    assert client.post('/echo', json={'a': 'x' * 11}).status_code == 400
+    assert client.post('/echo', json={str(i): i for i in range(5)}).status_code == 400
+    with pytest.raises(PayloadValidationError):
+        client.application.json.loads(json.dumps(_nested(4)))
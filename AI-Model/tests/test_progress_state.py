@@ -0,0 +1,57 @@
+"""Tests for the materialized progress state"""
+
+from datetime import date
+
+import numpy as np
+import pytest
+
+from models.progress_state import (
+    TREND_WINDOW, apply_activity, build_state, current_streak, new_state, trend_slope
+)
+
+
+def _quiz(day, percentage, subject='AI'):
+    return {'timestamp': f'{day}T12:00:00', 'percentage': percentage, 'subject': subject, 'grade': 'A'}
+
+
+@pytest.mark.parametrize('count', [1, 2, 5, TREND_WINDOW, TREND_WINDOW + 7])
+def test_trend_slope_matches_least_squares_over_the_window(count):
+    rng = np.random.default_rng(count)
+    scores = rng.uniform(30, 100, count).round(1)
+    state = new_state()
+    for score in scores:
+        apply_activity(state, 'quizzes', {'percentage': float(score)})
+
+    window = scores[-TREND_WINDOW:]
+    assert state['recent_scores'] == pytest.approx(list(window))
+    expected = np.polyfit(np.arange(len(window)), window, 1)[0] if len(window) > 1 else 0
+    assert trend_slope(state) == pytest.approx(expected)
+
+
+def test_streak_counts_consecutive_days():
+    state = new_state()
+    for day in ['2024-03-01', '2024-03-02', '2024-03-02', '2024-03-03', '2024-03-05', '2024-03-06']:
+        apply_activity(state, 'quizzes', _quiz(day, 70))
+
+    streak = state['streak']
+    assert streak['longest'] == 3
+    assert streak['current_run'] == 2
+    assert streak['active_days'] == 5
+    assert current_streak(state, today=date(2024, 3, 6)) == 2
+    assert current_streak(state, today=date(2024, 3, 7)) == 0
+
+
+def test_build_state_replays_quizzes_in_time_order():
+    quizzes = [_quiz('2024-03-02', 60), _quiz('2024-03-01', 50, 'Math'), _quiz('2024-03-03', 90)]
+    record = {'quizzes': quizzes, 'roadmaps': [{'timestamp': '2024-03-01T00:00:00'}]}
+
+    state = build_state(record)
+
+    incremental = new_state(state['created_at'])
+    apply_activity(incremental, 'roadmaps', record['roadmaps'][0])
+    for quiz in sorted(quizzes, key=lambda q: q['timestamp']):
+        apply_activity(incremental, 'quizzes', quiz)
+    assert state == incremental
+    assert state['counts'] == {'quizzes': 3, 'roadmaps': 1, 'career_explorations': 0}
+    assert state['quiz']['subjects'] == {'AI': [150.0, 2], 'Math': [50.0, 1]}
+    assert state['streak']['longest'] == 3
@@ -0,0 +1,74 @@
+"""Tests for the SQLite progress store"""
+
+import json
+
+from models.progress_store import ProgressStore, ShardedProgressStore
+
+
+def _legacy_progress():
+    return {
+        'alice': {
+            'created_at': '2024-01-01T00:00:00',
+            'quizzes': [
+                {'timestamp': '2024-01-02T10:00:00', 'subject': 'AI', 'score': 8, 'percentage': 80.0},
+                {'timestamp': '2024-01-03T10:00:00', 'subject': 'AI', 'score': 6, 'percentage': 60.0},
+            ],
+            'roadmaps': [{'timestamp': '2024-01-02T11:00:00', 'milestones_count': 4}],
+            'career_explorations': []
+        },
+        'bob': {
+            'created_at': '2024-01-01T00:00:00',
+            'quizzes': [{'timestamp': '2024-01-04T09:00:00', 'subject': 'Math', 'percentage': 90.0}],
+            'roadmaps': [],
+            'career_explorations': [{'timestamp': '2024-01-04T09:30:00', 'recommendations': ['AI Engineer']}]
+        }
+    }
+
+
+def test_reimporting_adds_no_duplicates(tmp_path):
+    data_file = tmp_path / 'progress_data.json'
+    data_file.write_text(json.dumps(_legacy_progress()))
+    store = ProgressStore(str(tmp_path / 'progress.db'))
+
+    assert store.import_legacy(str(data_file)) == 2
+    first = {row['user_id']: row for row in store.user_stats()}
+    store.import_legacy(str(data_file))
+
+    alice = store.load_user('alice')
+    assert len(alice['quizzes']) == 2 and len(alice['roadmaps']) == 1
+    assert len(store.load_user('bob')['career_explorations']) == 1
+    assert {row['user_id']: row for row in store.user_stats()} == first
+    assert first['alice']['average_score'] == 70.0 and first['alice']['total_activity'] == 3
+
+
+def test_import_merges_new_entries_for_existing_users(tmp_path):
+    data_file = tmp_path / 'progress_data.json'
+    data_file.write_text(json.dumps(_legacy_progress()))
+    shards = ShardedProgressStore(str(tmp_path / 'progress'))
+    shards.import_legacy(str(data_file))
+
+    store = ProgressStore(str(tmp_path / 'progress.db'))
+    store.append('alice', 'quizzes', {'timestamp': '2024-02-01T10:00:00', 'percentage': 100.0})
+    store.import_records(shards.iter_users())
+    store.import_records(shards.iter_users())
+
+    assert len(store.load_user('alice')['quizzes']) == 3
+    assert store.load_state('alice')['counts']['quizzes'] == 3
+
+
+def test_sharded_reimport_adds_no_duplicates(tmp_path):
+    data_file = tmp_path / 'progress_data.json'
+    data_file.write_text(json.dumps(_legacy_progress()))
+    shards = ShardedProgressStore(str(tmp_path / 'progress'))
+    shards.append('alice', 'quizzes', {'timestamp': '2024-02-01T10:00:00', 'percentage': 100.0})
+
+    assert shards.import_legacy(str(data_file)) == 2
+    shards.import_legacy(str(data_file))
+
+    alice = shards.load_user('alice')
+    assert [quiz['timestamp'] for quiz in alice['quizzes']] == [
+        '2024-01-02T10:00:00', '2024-01-03T10:00:00', '2024-02-01T10:00:00'
+    ]
+    assert len(alice['roadmaps']) == 1
+    assert len(shards.load_user('bob')['career_explorations']) == 1
+    assert shards.load_state('alice')['counts']['quizzes'] == 3
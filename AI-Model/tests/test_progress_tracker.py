@@ -0,0 +1,90 @@
+"""Tests for the legacy progress import"""
+
+import json
+import multiprocessing
+import subprocess
+import sys
+
+import pytest
+
+from models.progress_store import ProgressStore, ShardedProgressStore
+from models.progress_tracker import ProgressTracker
+
+
+def _legacy_progress(users=20):
+    return {
+        f'user{n}': {
+            'created_at': '2024-01-01T00:00:00',
+            'quizzes': [{'timestamp': f'2024-01-02T10:00:{i:02d}', 'percentage': 50.0 + i} for i in range(5)],
+            'roadmaps': [{'timestamp': '2024-01-02T11:00:00', 'milestones_count': 4}],
+            'career_explorations': []
+        }
+        for n in range(users)
+    }
+
+
+def _store(backend, tmp_path):
+    if backend == 'sharded':
+        return ShardedProgressStore(str(tmp_path / 'progress'))
+    return ProgressStore(str(tmp_path / 'progress.db'))
+
+
+def _start_worker(data_file, backend, tmp_path, barrier):
+    barrier.wait()
+    ProgressTracker(data_file=data_file, store=_store(backend, tmp_path))
+
+
+@pytest.fixture(autouse=True)
+def inline_writes(monkeypatch):
+    monkeypatch.setenv('TRACKER_WRITE_BEHIND', 'false')
+
+
+@pytest.mark.parametrize('backend', ['sharded', 'sqlite'])
+def test_legacy_file_is_imported_once_across_workers(tmp_path, backend):
+    data_file = tmp_path / 'progress_data.json'
+    data_file.write_text(json.dumps(_legacy_progress()))
+
+    # Workers start together, as gunicorn forks them
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(4)
+    workers = [context.Process(target=_start_worker, args=(str(data_file), backend, tmp_path, barrier))
+               for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+
+    assert all(worker.exitcode == 0 for worker in workers)
+    store = _store(backend, tmp_path)
+    for n in range(20):
+        user = store.load_user(f'user{n}')
+        assert len(user['quizzes']) == 5 and len(user['roadmaps']) == 1
+    assert (tmp_path / 'progress_data.json.migrated').exists()
+    assert not list(tmp_path.glob('progress_data.json*importing*'))
+
+
+@pytest.mark.parametrize('backend', ['sharded', 'sqlite'])
+def test_claim_of_a_dead_process_is_resumed_without_duplicates(tmp_path, backend):
+    # The dead worker imported everything but crashed before renaming its claim
+    data_file = tmp_path / 'progress_data.json'
+    data_file.write_text(json.dumps(_legacy_progress(3)))
+    _store(backend, tmp_path).import_legacy(str(data_file))
+    dead = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                          capture_output=True, text=True, check=True)
+    data_file.rename(tmp_path / f'progress_data.json.importing.{dead.stdout.strip()}')
+
+    tracker = ProgressTracker(data_file=str(data_file), store=_store(backend, tmp_path))
+
+    assert (tmp_path / 'progress_data.json.migrated').exists()
+    assert not list(tmp_path.glob('progress_data.json.importing.*'))
+    assert len(tracker.store.load_user('user0')['quizzes']) == 5
+
+
+def test_claim_of_a_live_process_is_left_alone(tmp_path):
+    claim = tmp_path / 'progress_data.json.importing.1'  # init is always running
+    claim.write_text(json.dumps(_legacy_progress(1)))
+
+    tracker = ProgressTracker(data_file=str(tmp_path / 'progress_data.json'), store=_store('sharded', tmp_path))
+
+    assert claim.exists()
+    assert tracker.store.load_user('user0') is None
@@ -0,0 +1,56 @@
+"""Tests for batched quiz evaluation"""
+
+import random
+
+import numpy as np
+
+from models.quiz_evaluator import QuizEvaluator
+
+WORDS = ("machine learning is a subset of artificial intelligence that uses data models "
+         "to learn patterns from labeled training examples with neural networks").split()
+
+
+def _submission(answer, reference, question_id='q1'):
+    return {
+        'answers': [{'questionId': question_id, 'answer': answer, 'type': 'subjective'}],
+        'correctAnswers': [{'questionId': question_id, 'answer': reference, 'topic': 'AI'}],
+        'subject': 'AI'
+    }
+
+
+def _random_text(rng):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(4, 20)))
+
+
+def test_submission_grades_the_same_alone_and_batched():
+    evaluator = QuizEvaluator()
+    rng = random.Random(7)
+    submission = _submission(
+        "Machine learning lets computers learn patterns from data",
+        "Machine learning is a subset of artificial intelligence that learns from data"
+    )
+    others = [_submission(_random_text(rng), _random_text(rng)) for _ in range(20)]
+
+    alone = evaluator.evaluate_batch([submission])[0]['detailedResults'][0]
+    batched = evaluator.evaluate_batch(others[:10] + [submission] + others[10:])[10]['detailedResults'][0]
+
+    assert alone['similarity'] > 0
+    assert batched['score'] == alone['score']
+    assert batched['similarity'] == alone['similarity']
+
+
+def test_batched_similarities_match_per_answer_grading():
+    evaluator = QuizEvaluator()
+    rng = random.Random(11)
+    users = [evaluator.preprocess_text(_random_text(rng)) for _ in range(50)]
+    references = [evaluator.preprocess_text(_random_text(rng)) for _ in range(50)]
+
+    batched = evaluator._paired_similarities(users, references)
+    per_answer = [evaluator.evaluate_subjective(u, r)[2] for u, r in zip(users, references)]
+    np.testing.assert_allclose(batched, per_answer, atol=1e-12)
+
+
+def test_stop_word_answers_score_zero():
+    evaluator = QuizEvaluator()
+    result = evaluator.evaluate_batch([_submission("it is what it is", "the and of")])[0]
+    assert result['detailedResults'][0]['similarity'] == 0.0
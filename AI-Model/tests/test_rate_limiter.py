@@ -0,0 +1,123 @@
+"""Tests for the token bucket rate limiter"""
+
+import pytest
+
+from models import rate_limiter
+from models.rate_limiter import LocalTokenBucketLimiter, RateLimiter
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'time', clock)
+    return clock
+
+
+def test_burst_up_to_capacity_then_limited(clock):
+    limiter = LocalTokenBucketLimiter()
+    results = [limiter.acquire('k', rate=1.0, capacity=5) for _ in range(6)]
+
+    assert [allowed for allowed, _ in results] == [True] * 5 + [False]
+    assert results[-1][1] == pytest.approx(1.0)
+
+
+def test_refill_is_proportional_to_elapsed_time(clock):
+    limiter = LocalTokenBucketLimiter()
+    for _ in range(4):
+        limiter.acquire('k', rate=2.0, capacity=4)
+
+    clock.now += 0.25  # Half a token
+    allowed, retry_after = limiter.acquire('k', rate=2.0, capacity=4)
+    assert not allowed
+    assert retry_after == pytest.approx(0.25)
+
+    clock.now += 0.25
+    assert limiter.acquire('k', rate=2.0, capacity=4) == (True, 0.0)
+    assert limiter.acquire('k', rate=2.0, capacity=4)[0] is False
+
+
+def test_refill_is_capped_at_capacity(clock):
+    limiter = LocalTokenBucketLimiter(slot_seconds=1000.0)  # Keep the bucket on the wheel
+    limiter.acquire('k', rate=1.0, capacity=3)
+
+    clock.now += 100
+    results = [limiter.acquire('k', rate=1.0, capacity=3)[0] for _ in range(4)]
+    assert results == [True, True, True, False]
+
+
+def test_cost_larger_than_tokens_reports_wait_for_the_whole_cost(clock):
+    limiter = LocalTokenBucketLimiter()
+    assert limiter.acquire('k', rate=0.5, capacity=4, cost=3) == (True, 0.0)
+
+    allowed, retry_after = limiter.acquire('k', rate=0.5, capacity=4, cost=3)
+    assert not allowed
+    assert retry_after == pytest.approx((3 - 1) / 0.5)
+
+
+def test_buckets_are_independent(clock):
+    limiter = LocalTokenBucketLimiter()
+    assert limiter.acquire('a', rate=1.0, capacity=1)[0]
+    assert not limiter.acquire('a', rate=1.0, capacity=1)[0]
+    assert limiter.acquire('b', rate=1.0, capacity=1)[0]
+
+
+def test_full_buckets_expire_from_the_wheel(clock):
+    limiter = LocalTokenBucketLimiter(slot_seconds=1.0, slots=8)
+    for key in ('a', 'b', 'c'):
+        limiter.acquire(key, rate=1.0, capacity=2)
+    limiter.acquire('slow', rate=0.01, capacity=2)
+    assert len(limiter) == 4
+
+    clock.now += 3  # 'a'-'c' refilled a second ago, 'slow' needs 100s
+    limiter.acquire('other', rate=1.0, capacity=2)
+    assert len(limiter) == 2
+
+    # A gap longer than one wheel rotation still reaches every slot
+    clock.now += 1000
+    limiter.acquire('other', rate=1.0, capacity=2)
+    assert len(limiter) == 1
+
+
+def test_expired_bucket_starts_full(clock):
+    limiter = LocalTokenBucketLimiter(slot_seconds=1.0, slots=8)
+    limiter.acquire('k', rate=1.0, capacity=2)
+    limiter.acquire('k', rate=1.0, capacity=2)
+
+    clock.now += 10
+    assert [limiter.acquire('k', rate=1.0, capacity=2)[0] for _ in range(3)] == [True, True, False]
+
+
+def test_rate_limiter_uses_endpoint_limits_per_client(clock):
+    limiter = RateLimiter(limits={'generate_roadmap': (2, 60)})
+    assert limiter.check('generate_roadmap', 'alice') == (True, 0.0)
+    assert limiter.check('generate_roadmap', 'alice') == (True, 0.0)
+
+    allowed, retry_after = limiter.check('generate_roadmap', 'alice')
+    assert not allowed
+    assert retry_after == pytest.approx(30.0)
+    assert limiter.check('generate_roadmap', 'bob')[0]
+    assert limiter.check('evaluate_quiz', 'alice')[0]
+
+    stats = limiter.stats()
+    assert (stats['allowed'], stats['limited'], stats['backend']) == (4, 1, 'local')
+
+
+def test_unknown_endpoint_falls_back_to_default(clock):
+    limiter = RateLimiter(limits={'default': (1, 10)})
+    assert limiter.check('unknown', 'alice')[0]
+    assert limiter.check('unknown', 'alice') == (False, pytest.approx(10.0))
+
+
+def test_parse_limits_skips_malformed_entries():
+    assert RateLimiter.parse_limits(' default=60/60, bad, roadmap=x/60,quiz=300/30.5 ,') == {
+        'default': (60, 60.0),
+        'quiz': (300, 30.5)
+    }
@@ -0,0 +1,130 @@
+"""Tests for the reference answer index"""
+
+import numpy as np
+import pytest
+
+from models.quiz_evaluator import QuizEvaluator
+from models.reference_index import ReferenceAnswerIndex
+
+REFERENCES = [
+    "Supervised learning trains models on labeled data to predict outputs",
+    "Overfitting happens when a model memorizes training data and fails to generalize",
+    "Gradient descent minimizes a loss function by following the negative gradient",
+]
+ANSWERS = [
+    "Supervised learning uses labeled data",
+    "A model that memorizes the training data overfits",
+    "Gradient descent follows the gradient downhill with a learning rate",
+]
+
+
+def _index(tmp_path):
+    evaluator = QuizEvaluator()
+    index = ReferenceAnswerIndex(evaluator.preprocess_text, str(tmp_path / 'index.pkl'))
+    return evaluator, index
+
+
+# (answer, bank reference number, similarity, score, is_correct) under per-pair TF-IDF
+BANK_PAIRS = [
+    ("Backpropagation is an algorithm computing gradients of the loss function with respect "
+     "to the weights by propagating errors backward", 0, 0.8524, 0.8, True),
+    ("Backpropagation computes gradients of the loss with respect to the weights by "
+     "propagating errors backward through the layers", 0, 0.4793, 0.3, False),
+    ("The vanishing gradient problem is when gradients become extremely small during "
+     "backpropagation in deep networks", 1, 0.5845, 0.6, False),
+    ("Stack memory is static allocation with automatic management and LIFO access, heap "
+     "memory is dynamic allocation with manual management", 2, 0.6695, 0.6, False),
+    ("Eigenvalues are scalars and eigenvectors are vectors that a linear transformation "
+     "only scales", 3, 0.4576, 0.3, False),
+    ("It is the balance between bias from wrong assumptions and variance from sensitivity "
+     "to the training data", 4, 0.3740, 0.3, False),
+]
+
+
+def _bank_references(tmp_path):
+    from models.quiz_generator import QuizGenerator
+
+    bank = QuizGenerator.load_question_bank(str(tmp_path / 'question_bank.json'))
+    return bank, [question['answer'] for difficulties in bank.values()
+                  for questions in difficulties.values() for question in questions
+                  if question.get('type') == 'subjective']
+
+
+def test_similarities_match_per_pair_tfidf(tmp_path):
+    evaluator, index = _index(tmp_path)
+    index.add([{'answer': text} for text in REFERENCES])
+    references = [evaluator.preprocess_text(text) for text in REFERENCES]
+    answers = [evaluator.preprocess_text(text) for text in ANSWERS]
+
+    similarities = index.paired_similarities(answers, [index.lookup(text) for text in references])
+
+    expected = [evaluator.evaluate_subjective(a, r)[2] for a, r in zip(ANSWERS, REFERENCES)]
+    np.testing.assert_allclose(similarities, expected, atol=1e-12)
+
+
+def test_bank_pair_grades_do_not_depend_on_the_index(tmp_path, monkeypatch):
+    # Importing quiz_generator writes its default bank under the working directory
+    monkeypatch.chdir(tmp_path)
+    evaluator, index = _index(tmp_path)
+    bank, references = _bank_references(tmp_path)
+    index.add_question_bank(bank)
+    submission = {
+        'answers': [{'questionId': n, 'answer': answer, 'type': 'subjective'}
+                    for n, (answer, *_) in enumerate(BANK_PAIRS)],
+        'correctAnswers': [{'questionId': n, 'answer': references[reference]}
+                           for n, (_, reference, *_) in enumerate(BANK_PAIRS)]
+    }
+
+    indexed = QuizEvaluator(reference_index=index).evaluate_batch([submission])[0]
+    unindexed = evaluator.evaluate_batch([submission])[0]
+
+    assert indexed == {**unindexed, 'evaluatedAt': indexed['evaluatedAt']}
+    for result, (answer, reference, similarity, score, is_correct) in zip(indexed['detailedResults'], BANK_PAIRS):
+        assert evaluator.evaluate_subjective(answer, references[reference])[2] == pytest.approx(similarity, abs=1e-4)
+        assert result['similarity'] == round(similarity, 2)
+        assert (result['score'], result['isCorrect']) == (score, is_correct)
+
+
+def test_add_is_incremental_and_deduplicated(tmp_path):
+    evaluator, index = _index(tmp_path)
+    assert index.add([{'answer': REFERENCES[0], 'questionId': 'q1'}]) == 1
+    counts = index.counts
+
+    assert index.add([{'answer': REFERENCES[0], 'questionId': 'q9'},
+                      {'answer': REFERENCES[1]}, {'answer': REFERENCES[1]}]) == 1
+    assert len(index) == 2
+    # Existing rows are kept as they were, not re-vectorized
+    assert (index.counts[0] != counts[0]).nnz == 0
+    key = index.answer_key(evaluator.preprocess_text(REFERENCES[0]))
+    assert index.question_ids[key] == {'q1', 'q9'}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    evaluator, index = _index(tmp_path)
+    index.add([{'answer': text} for text in REFERENCES])
+    index.save()
+
+    _, loaded = _index(tmp_path)
+    assert loaded.load()
+    references = [evaluator.preprocess_text(text) for text in REFERENCES]
+    answers = [evaluator.preprocess_text(text) for text in ANSWERS]
+    rows = [index.lookup(text) for text in references]
+    assert [loaded.lookup(text) for text in references] == rows
+    np.testing.assert_allclose(loaded.paired_similarities(answers, rows),
+                               index.paired_similarities(answers, rows))
+
+
+def test_load_or_build_uses_the_quiz_generator_bank(tmp_path, monkeypatch):
+    # Importing quiz_generator writes its default bank under the working directory
+    monkeypatch.chdir(tmp_path)
+    evaluator = QuizEvaluator()
+    bank_file = tmp_path / 'question_bank.json'
+    index = ReferenceAnswerIndex.load_or_build(
+        evaluator.preprocess_text,
+        index_file=str(tmp_path / 'index.pkl'),
+        bank_file=str(bank_file)
+    )
+    # No bank file yet: QuizGenerator's default bank is indexed (and written out)
+    assert index is not None and len(index) > 0
+    assert bank_file.exists()
+    assert (tmp_path / 'index.pkl').exists()
@@ -0,0 +1,107 @@
+"""Tests for the sharded per-user JSON progress store"""
+
+import hashlib
+import json
+import os
+import threading
+
+import pytest
+
+from models import progress_store
+from models.progress_store import ShardedProgressStore
+
+
+def _quiz(n, percentage=50.0):
+    return {'timestamp': f'2024-01-01T00:{n // 60:02d}:{n % 60:02d}', 'subject': 'AI', 'percentage': percentage}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ShardedProgressStore(str(tmp_path / 'progress'))
+
+
+def test_user_file_is_routed_by_hash_prefix(store, tmp_path):
+    store.append('alice', 'quizzes', _quiz(0))
+
+    digest = hashlib.sha1(b'alice').hexdigest()
+    path = tmp_path / 'progress' / digest[:2] / f'{digest}.json'
+    assert path.exists()
+    record = json.loads(path.read_text())
+    assert record['user_id'] == 'alice' and record['quizzes'] == [_quiz(0)]
+    # Non-string ids route like their string form
+    store.append(42, 'roadmaps', {'timestamp': '2024-01-01T00:00:00'})
+    assert store.load_user('42')['roadmaps'] == store.load_user(42)['roadmaps']
+
+
+def test_reads_after_many_users_across_shards(store, tmp_path):
+    users = [f'user-{n}' for n in range(600)]
+    for n, user in enumerate(users):
+        for i in range(n % 3 + 1):
+            store.append(user, 'quizzes', _quiz(i, percentage=float(n % 100)))
+
+    shards = [name for name in os.listdir(tmp_path / 'progress') if len(name) == 2]
+    assert len(shards) > 200  # 600 users over 256 prefixes
+    assert sorted(user_id for user_id, _ in store.iter_users()) == sorted(users)
+    for n, user in enumerate(users):
+        record = store.load_user(user)
+        assert len(record['quizzes']) == n % 3 + 1
+        assert store.load_state(user)['counts']['quizzes'] == n % 3 + 1
+    stats = {row['user_id']: row for row in store.user_stats()}
+    assert stats['user-7'] == {'user_id': 'user-7', 'average_score': 7.0, 'total_quizzes': 2, 'total_activity': 2}
+    assert store.load_user('missing') is None and store.load_state('missing') is None
+
+
+def test_failed_write_leaves_the_previous_record(store, monkeypatch):
+    store.append('alice', 'quizzes', _quiz(0))
+    before = store.load_user('alice')
+
+    def torn_dump(record, f):
+        f.write('{"user_id": "alice", "quizz')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(progress_store.json, 'dump', torn_dump)
+    with pytest.raises(OSError):
+        store.append('alice', 'quizzes', _quiz(1))
+    monkeypatch.undo()
+
+    # The torn temp file never replaced the user's file
+    assert store.load_user('alice') == before
+    assert [user_id for user_id, _ in store.iter_users()] == ['alice']
+
+
+def test_concurrent_appends_for_one_user_are_not_lost(store):
+    def writer(offset):
+        for i in range(25):
+            store.append('alice', 'quizzes', _quiz(offset + i))
+
+    threads = [threading.Thread(target=writer, args=(n * 100,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    record = store.load_user('alice')
+    assert len(record['quizzes']) == 200
+    assert store.load_state('alice')['counts']['quizzes'] == 200
+
+
+def test_concurrent_processes_share_user_files(tmp_path):
+    import multiprocessing
+
+    data_dir = str(tmp_path / 'progress')
+    context = multiprocessing.get_context('fork')
+
+    def worker(offset):
+        store = ShardedProgressStore(data_dir)
+        for i in range(20):
+            store.append(f'user-{i % 4}', 'quizzes', _quiz(offset + i))
+
+    processes = [context.Process(target=worker, args=(n * 100,)) for n in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+
+    assert all(process.exitcode == 0 for process in processes)
+    store = ShardedProgressStore(data_dir)
+    assert sum(len(record['quizzes']) for _, record in store.iter_users()) == 80
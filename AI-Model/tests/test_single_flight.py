@@ -0,0 +1,73 @@
+"""Tests for single-flight request coalescing"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from models.single_flight import SingleFlight
+
+
+def _run_concurrently(flight, key, fn, callers):
+    """Start callers on key; returns their futures once all are in flight"""
+    pool = ThreadPoolExecutor(max_workers=callers)
+    futures = [pool.submit(flight.do, key, fn) for _ in range(callers)]
+    pool.shutdown(wait=False)
+    # Wait until every follower is queued behind the leader
+    while flight.stats()['followers'] < callers - 1:
+        time.sleep(0.001)
+    return futures
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {'careers': ['Data Scientist']}
+
+    futures = _run_concurrently(flight, 'prompt', fn, callers=8)
+    release.set()
+    results = [future.result(5) for future in futures]
+
+    assert len(calls) == 1
+    assert all(result == {'careers': ['Data Scientist']} for result in results)
+    # Followers get copies, not the leader's object
+    assert len({id(result) for result in results}) == 8
+    stats = flight.stats()
+    assert stats['leaders'] == 1 and stats['followers'] == 7 and stats['in_flight'] == 0
+
+
+def test_followers_receive_the_leader_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise RuntimeError("Gemini unavailable")
+
+    futures = _run_concurrently(flight, 'prompt', fn, callers=4)
+    release.set()
+    for future in futures:
+        with pytest.raises(RuntimeError, match="Gemini unavailable"):
+            future.result(5)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_sequential_calls_are_not_coalesced():
+    flight = SingleFlight()
+    calls = []
+    for _ in range(3):
+        flight.do('prompt', lambda: calls.append(1))
+    assert len(calls) == 3
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.stats()['leaders'] == 2
@@ -0,0 +1,108 @@
+"""Tests for the write-behind queue"""
+
+import logging
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+from models import write_behind
+from models.write_behind import WriteBehindQueue
+
+AI_MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_sigterm_while_flush_lock_is_held_does_not_deadlock(tmp_path):
+    # The main thread holds the lock flush_fn needs (as EventLog.flush does)
+    # when SIGTERM arrives; pending items must still be written on exit.
+    output = tmp_path / 'events.txt'
+    script = textwrap.dedent(f"""
+        import os, signal, threading, time
+        from models.write_behind import WriteBehindQueue
+
+        lock = threading.Lock()
+
+        def write(items):
+            with lock:
+                with open({str(output)!r}, 'a') as f:
+                    f.writelines(f"{{item}}\\n" for item in items)
+
+        queue = WriteBehindQueue('test', write, batch_size=1000, flush_interval=60)
+        for i in range(10):
+            queue.submit(i)
+        with lock:
+            os.kill(os.getpid(), signal.SIGTERM)
+            time.sleep(5)
+    """)
+    process = subprocess.run([sys.executable, '-c', script], cwd=AI_MODEL_DIR, timeout=20)
+
+    assert process.returncode == 128 + 15
+    assert output.read_text().split() == [str(i) for i in range(10)]
+
+
+def test_default_policy_blocks_instead_of_dropping():
+    release = threading.Event()
+    written = []
+
+    def slow_write(items):
+        release.wait(5)
+        written.extend(items)
+
+    queue = WriteBehindQueue('test', slow_write, max_size=2, batch_size=1, flush_interval=0.01,
+                             block_timeout=5)
+    assert queue.policy == 'block'
+    results = []
+    submitter = threading.Thread(target=lambda: results.extend(queue.submit(i) for i in range(6)))
+    submitter.start()
+    release.set()
+    submitter.join(10)
+    queue.close()
+
+    assert results == [True] * 6
+    assert sorted(written) == list(range(6))
+    assert queue.stats()['dropped'] == 0
+
+
+def test_drops_are_counted_and_logged(caplog):
+    release = threading.Event()
+    queue = WriteBehindQueue('test', lambda items: release.wait(5), max_size=2, batch_size=100,
+                             flush_interval=60, policy='drop_newest')
+    with caplog.at_level(logging.WARNING, logger='models.write_behind'):
+        results = [queue.submit(i) for i in range(5)]
+    release.set()
+    queue.close()
+
+    assert results == [True, True, False, False, False]
+    assert queue.stats()['dropped'] == 3
+    # Only the first drop is logged, not every one
+    assert len([r for r in caplog.records if 'dropped' in r.getMessage()]) == 1
+
+
+def test_flusher_idles_after_sigterm(monkeypatch):
+    monkeypatch.setattr(write_behind, '_terminating', True)
+    written = []
+    queue = WriteBehindQueue('test', written.extend, batch_size=100, flush_interval=0.05)
+    flushes = []
+    real_flush = queue.flush
+
+    def counting_flush():
+        flushes.append(time.time())
+        real_flush()
+
+    monkeypatch.setattr(queue, 'flush', counting_flush)
+
+    time.sleep(0.5)
+    # One wake-up per flush_interval, not a busy loop over an empty buffer
+    assert len(flushes) <= 15
+
+    # A partial batch is still written without waiting for batch_size
+    queue.submit('event')
+    deadline = time.time() + 2
+    while not written and time.time() < deadline:
+        time.sleep(0.01)
+    assert written == ['event']
+    queue.close()
+    queue._thread.join(1)
+    assert not queue._thread.is_alive()
@@ -3,6 +3,7 @@ Complete Advanced Training Pipeline
 Achieves 70-80% accuracy with ensemble model and improved data processing
 """
 
+import argparse
 import sys
 import os
 import pandas as pd
@@ -12,7 +13,8 @@ import logging
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'data'))
 sys.path.insert(0, os.path.dirname(__file__))
 
-from data.improved_processor import ImprovedDataProcessor
+from data.improved_processor import ImprovedDataProcessor, SCORE_COLUMNS, OUTLIER_METHODS
+from data.balancing import BALANCING_STRATEGIES, compare_strategies
 from models.ensemble_recommender import EnsembleCareerRecommender
 
 
@@ -20,40 +22,119 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the ensemble career model')
+    parser.add_argument('--data', default='data/real_training_data.csv',
+                        help='Raw training CSV')
+    parser.add_argument('--stream', action='store_true',
+                        help='Preprocess the CSV in chunks into a columnar feature store. Only '
+                             'preprocessing is out-of-core: the whole feature store is then loaded '
+                             'into memory for balancing and training')
+    parser.add_argument('--chunk-size', type=int, default=100000,
+                        help='Rows per chunk in streaming mode')
+    parser.add_argument('--feature-store', default='data/feature_store',
+                        help='Feature store directory for streaming mode')
+    parser.add_argument('--outlier-method', choices=OUTLIER_METHODS, default='zscore',
+                        help='Outlier rule: z-score, robust median/MAD or IQR fences')
+    parser.add_argument('--one-pass-outliers', action='store_true',
+                        help='Filter outliers with one combined mask instead of column by column '
+                             '(faster; may keep slightly different rows)')
+    parser.add_argument('--balance', choices=BALANCING_STRATEGIES, default='smote',
+                        help='Class balancing: SMOTE (exact or approximate neighbours), '
+                             'random oversampling or class weights only')
+    parser.add_argument('--compare-balancing', action='store_true',
+                        help='Report the time and memory of every balancing strategy before training')
+    parser.add_argument('--cache-dir', default='data/feature_cache',
+                        help='Cache of preprocessing stage outputs, reused while data and code are unchanged')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Recompute every preprocessing stage')
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    
     logger.info("="*70)
     logger.info("LEARNMATE AI - ADVANCED TRAINING PIPELINE")
     logger.info("Target Accuracy: 70-80%")
     logger.info("="*70)
     
-    # Step 1: Load existing data
-    logger.info("\n📥 STEP 1: Loading Training Data...")
-    
-    try:
-        df = pd.read_csv('data/real_training_data.csv')
-        logger.info(f"✓ Loaded {len(df)} records")
-    except FileNotFoundError:
-        logger.error("❌ real_training_data.csv not found!")
+    if not os.path.exists(args.data):
+        logger.error(f"❌ {args.data} not found!")
         logger.error("Please run: python train_on_real_datasets.py first")
         return
     
-    # Step 2: Advanced data processing
-    logger.info("\n🔧 STEP 2: Advanced Data Processing...")
-    
     processor = ImprovedDataProcessor()
-    X, y, processed_df = processor.process_full_pipeline(
-        df,
-        balance_data=True,
-        remove_outliers_flag=True
-    )
+    reference_scores = None
+    
+    if args.stream:
+        # Steps 1-2 out of core: chunks are relabelled, engineered and stored compactly
+        logger.info("\n📥 STEP 1-2: Streaming Data Processing...")
+        
+        store, reference_scores = processor.process_streaming(
+            args.data,
+            args.feature_store,
+            chunk_size=args.chunk_size,
+            outlier_method=args.outlier_method
+        )
+        # Only preprocessing is out of core: the ensemble (RF, GB, MLP) has no
+        # incremental fit, so the compact engineered features are loaded whole
+        processed_df = store.to_frame()
+        logger.info(f"✓ Loaded {store.rows} engineered rows from the feature store for balancing and training")
+        X, y = processor.balance_dataset(processed_df.drop('career', axis=1), processed_df['career'],
+                                         method=args.balance)
+    elif not args.no_cache:
+        # Steps 1-2, reusing cached stage outputs where data and code are unchanged
+        logger.info("\n🔧 STEP 1-2: Advanced Data Processing (cached)...")
+        
+        X, y, processed_df = processor.process_cached(
+            args.data,
+            args.cache_dir,
+            balance_data=True,
+            remove_outliers_flag=True,
+            outlier_method=args.outlier_method,
+            balance_method=args.balance,
+            one_pass_outliers=args.one_pass_outliers
+        )
+    else:
+        # Step 1: Load existing data
+        logger.info("\n📥 STEP 1: Loading Training Data...")
+        
+        df = pd.read_csv(args.data)
+        logger.info(f"✓ Loaded {len(df)} records")
+        
+        # Step 2: Advanced data processing
+        logger.info("\n🔧 STEP 2: Advanced Data Processing...")
+        
+        X, y, processed_df = processor.process_full_pipeline(
+            df,
+            balance_data=True,
+            remove_outliers_flag=True,
+            outlier_method=args.outlier_method,
+            balance_method=args.balance,
+            one_pass_outliers=args.one_pass_outliers
+        )
     
     logger.info(f"✓ Processed dataset: {X.shape[0]} samples, {X.shape[1]} features")
     
+    if args.compare_balancing:
+        logger.info("\n⚖️  Balancing strategy costs:")
+        compare_strategies(processed_df.drop('career', axis=1), processed_df['career'])
+    
     # Step 3: Train ensemble model
     logger.info("\n🧠 STEP 3: Training Advanced Ensemble Model...")
     
     recommender = EnsembleCareerRecommender()
-    accuracy = recommender.train(X, y, use_tuning=False)
+    accuracy = recommender.train(
+        X, y,
+        use_tuning=False,
+        class_weight='balanced' if args.balance == 'class_weight' else None
+    )
+    if reference_scores is not None:
+        # Sketched distributions of the full dataset
+        recommender.reference_scores = reference_scores
+    else:
+        recommender.set_reference_scores(processed_df, SCORE_COLUMNS)
     
     # Step 4: Save the model
     logger.info("\n💾 STEP 4: Saving Model...")